@@ -0,0 +1,208 @@
+import collections
+import functools
+import hashlib
+import re
+
+# Addresses arrive as "street, city, ST zip" from every scraper, but each source
+# spells the street differently ("123 North Main Street Apt 4" on Realtor,
+# "123 N Main St #4" on Redfin). canonicalize() maps them all to one form.
+
+# Constants
+MEMO_SIZE = 65536  # Addresses kept in the canonicalize() memo
+
+# USPS street suffix abbreviations (common subset)
+STREET_SUFFIXES = {
+    "alley": "aly", "avenue": "ave", "av": "ave", "bend": "bnd", "boulevard": "blvd",
+    "branch": "br", "bridge": "brg", "brook": "brk", "bypass": "byp", "causeway": "cswy",
+    "center": "ctr", "circle": "cir", "cove": "cv", "creek": "crk", "crescent": "cres",
+    "crossing": "xing", "court": "ct", "drive": "dr", "estates": "ests", "expressway": "expy",
+    "extension": "ext", "freeway": "fwy", "garden": "gdn", "gardens": "gdns", "glen": "gln",
+    "green": "grn", "grove": "grv", "harbor": "hbr", "heights": "hts", "highway": "hwy",
+    "hill": "hl", "hills": "hls", "hollow": "holw", "junction": "jct", "lake": "lk",
+    "landing": "lndg", "lane": "ln", "loop": "loop", "manor": "mnr", "meadow": "mdw",
+    "meadows": "mdws", "mount": "mt", "mountain": "mtn", "parkway": "pkwy", "pike": "pike",
+    "pines": "pnes", "place": "pl", "plaza": "plz", "point": "pt", "ridge": "rdg",
+    "road": "rd", "route": "rte", "run": "run", "square": "sq", "station": "sta",
+    "street": "st", "str": "st", "summit": "smt", "terrace": "ter", "trace": "trce",
+    "trail": "trl", "turnpike": "tpke", "valley": "vly", "view": "vw", "village": "vlg",
+    "vista": "vis", "walk": "walk", "way": "way", "woods": "wds"
+}
+
+# Directional abbreviations
+DIRECTIONALS = {
+    "north": "n", "south": "s", "east": "e", "west": "w",
+    "northeast": "ne", "northwest": "nw", "southeast": "se", "southwest": "sw"
+}
+
+# Full state names, mapped to their USPS codes
+STATE_NAMES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca",
+    "colorado": "co", "connecticut": "ct", "delaware": "de", "district of columbia": "dc",
+    "florida": "fl", "georgia": "ga", "hawaii": "hi", "idaho": "id", "illinois": "il",
+    "indiana": "in", "iowa": "ia", "kansas": "ks", "kentucky": "ky", "louisiana": "la",
+    "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi", "minnesota": "mn",
+    "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny",
+    "north carolina": "nc", "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or",
+    "pennsylvania": "pa", "rhode island": "ri", "south carolina": "sc", "south dakota": "sd",
+    "tennessee": "tn", "texas": "tx", "utah": "ut", "vermont": "vt", "virginia": "va",
+    "washington": "wa", "west virginia": "wv", "wisconsin": "wi", "wyoming": "wy"
+}
+
+# Last words of the state names, which can come right before the ZIP
+STATE_NAME_ENDINGS = frozenset(name.rsplit(" ", 1)[-1] for name in STATE_NAMES)
+
+# Street lines scrapers fill in when a listing has no address, canonicalized
+# to an empty street ("None" is what Realtor's f-string makes of a null line)
+STREET_PLACEHOLDERS = frozenset([
+    "none", "null", "n a", "na", "unknown", "undisclosed", "undisclosed address",
+    "address not disclosed", "address not available", "address withheld"
+])
+
+# Secondary unit designators, all collapse to "unit"
+UNIT_DESIGNATORS = frozenset([
+    "apt", "apartment", "unit", "ste", "suite", "#", "bldg", "building",
+    "fl", "floor", "rm", "room", "lot", "spc", "space", "trlr", "lowr", "uppr"
+])
+
+# Designators that are also street names ("Suite Rd", "Lot Ln"), only a unit
+# right after the street suffix, as in "100 Main St Suite 200"
+AMBIGUOUS_UNIT_DESIGNATORS = frozenset([
+    "ste", "suite", "bldg", "building", "fl", "floor", "rm", "room", "lot", "spc", "space"
+])
+
+# Abbreviated directionals, skipped when looking for the suffix in "123 Main St N"
+DIRECTIONAL_CODES = frozenset(DIRECTIONALS.values())
+
+# Street suffixes in full and abbreviated form
+SUFFIX_WORDS = frozenset(STREET_SUFFIXES) | frozenset(STREET_SUFFIXES.values())
+
+# Words, commas and "#", everything else is dropped. Only used for addresses
+# with unusual punctuation, the rest are split with plain string methods.
+_TOKEN_RE = re.compile(r"[^\W_]+|[,#]")
+# Unit number glued to its designator, e.g. "apt4b"
+_GLUED_UNIT_RE = re.compile(r"(?:apt|unit|ste)(\d\w*)")
+
+# Parsed address, canonical is the join key text and key its 64-bit hash
+CanonicalAddress = collections.namedtuple(
+    "CanonicalAddress", ["street", "unit", "city", "state", "zip_code", "canonical", "key"]
+)
+# Builds a CanonicalAddress from a tuple without the Python-level __new__
+_make_canonical = functools.partial(tuple.__new__, CanonicalAddress)
+
+def _is_unit_designator(words, i):
+    """Return True if words[i] starts the unit rather than being part of the street name.
+
+    The street name has to come first, so "1 Suite Rd" and "5 Lot Ln" keep
+    their names. Designators that double as street names also need the street
+    suffix (and any post-directional) right before them.
+    """
+    word = words[i]
+    if word not in UNIT_DESIGNATORS:
+        return False
+    # Skip the house number, at least one name word must precede the unit
+    start = 1 if words[0][0].isdigit() else 0
+    if i - start < 1:
+        return False
+    if word in AMBIGUOUS_UNIT_DESIGNATORS:
+        if i + 1 >= len(words):
+            return False
+        j = i - 1
+        while j > start and (words[j] in DIRECTIONALS or words[j] in DIRECTIONAL_CODES):
+            j -= 1
+        return j > start and words[j] in SUFFIX_WORDS
+    return True
+
+def _split_street(words):
+    """Abbreviate street words and pull out the unit, returns (street, unit).
+
+    Directionals are abbreviated anywhere, the suffix only when it is the last
+    word before any post-directional, so "West Lake Dr" keeps its "lake".
+    """
+    unit = ""
+    if len(words) > 1 and words[-1][0] in "aus":
+        glued = _GLUED_UNIT_RE.fullmatch(words[-1])
+        if glued:
+            words = words[:-1] + ["#", glued.group(1)]
+    if not UNIT_DESIGNATORS.isdisjoint(words):
+        for i in range(1, len(words)):
+            if _is_unit_designator(words, i):
+                # Everything after the designator is the unit number ("apt 4 b" -> "4b")
+                unit = "".join([w for w in words[i + 1:] if w not in UNIT_DESIGNATORS])
+                words = words[:i]
+                break
+
+    words = [DIRECTIONALS.get(word, word) for word in words]
+    j = len(words) - 1
+    while j > 0 and words[j] in DIRECTIONAL_CODES:
+        j -= 1
+    if j > 0:
+        words[j] = STREET_SUFFIXES.get(words[j], words[j])
+    return " ".join(words), unit
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def canonicalize(address):
+    """Parse an address into a CanonicalAddress.
+
+    Expects the "street, city, ST zip" form the scrapers build, and falls back
+    to treating the whole string as the street when it has no commas.
+    Results are memoized, so repeat addresses cost one dict lookup.
+    """
+    text = (address or "").lower().replace(",", " , ").replace("#", " # ").replace(".", " ").replace("-", " ")
+    if text.replace(" ", "").replace(",", "").replace("#", "").isalnum() or not text.strip():
+        tokens = text.split()
+    else:
+        tokens = _TOKEN_RE.findall(text)
+    state, zip_code = "", ""
+
+    # ZIP or ZIP+4 ("43215", "43215-1234", "432151234"), only 5 digits are kept
+    if tokens and tokens[-1].isdigit():
+        if len(tokens) > 1 and len(tokens[-1]) == 4 and len(tokens[-2]) == 5 and tokens[-2].isdigit():
+            tokens.pop()
+        if len(tokens[-1]) in (5, 9) and len(tokens) > 1 and (tokens[-2] == "," or len(tokens[-2]) == 2 or tokens[-2] in STATE_NAME_ENDINGS):
+            zip_code = tokens.pop()[:5]
+    # State code or name, trusted without a ZIP only in the full "street, city, ST" form
+    if tokens and tokens[-1].isalpha() and (zip_code or tokens.count(",") >= 2):
+        if len(tokens[-1]) == 2:
+            state = tokens.pop()
+        else:
+            # Longest name first, so "West Virginia" isn't read as "Virginia"
+            for words in (3, 2, 1):
+                name = " ".join(tokens[-words:])
+                if len(tokens) > words and name in STATE_NAMES:
+                    state = STATE_NAMES[name]
+                    del tokens[-words:]
+                    break
+    while tokens and tokens[-1] == ",":
+        tokens.pop()
+
+    city = ""
+    if "," in tokens:
+        comma = len(tokens) - 1 - tokens[::-1].index(",")
+        city = " ".join(tokens[comma + 1:])
+        tokens = tokens[:comma]
+        if "," in tokens:
+            tokens = [token for token in tokens if token != ","]
+    street, unit = _split_street(tokens) if tokens else ("", "")
+    if street in STREET_PLACEHOLDERS:
+        street, unit = "", ""
+
+    canonical = f"{street} unit {unit}" if unit else street
+    canonical = f"{canonical}|{city}|{state}|{zip_code}"
+    return _make_canonical((street, unit, city, state, zip_code, canonical, hash_key(canonical)))
+
+def hash_key(canonical):
+    """Return the unsigned 64-bit key of a canonical address string."""
+    return int.from_bytes(hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).digest(), "big")
+
+def canonical_address(address):
+    """Return the canonical string of an address."""
+    return canonicalize(address).canonical
+
+def address_key(address):
+    """Return the unsigned 64-bit key of an address, for BIGINT UNSIGNED columns."""
+    return canonicalize(address).key
+
+def clear_memo():
+    """Empty the canonicalize() memo (used by the benchmark)."""
+    canonicalize.cache_clear()
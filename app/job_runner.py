@@ -0,0 +1,178 @@
+import importlib
+import logging
+import multiprocessing
+import threading
+import progress_events
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress event flushes from a worker to the web process
+EVENT_FLUSH_INTERVAL = 0.5
+
+class ReportingStatus(dict):
+    """Status dict used inside a worker process.
+
+    Every assignment is mirrored to the parent process over the job queue, so
+    job code can keep updating its status dict the way it always has. Pending
+    progress events are flushed first so they can't overwrite a newer value.
+    """
+
+    def __init__(self, queue, job_name, initial, flush_events=None):
+        super().__init__(initial)
+        self._queue = queue
+        self._job_name = job_name
+        self._flush_events = flush_events
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        if self._flush_events:
+            self._flush_events()
+        self._queue.put((self._job_name, 'status', {key: value}))
+
+def _run_job(job_name, target, args, queue, initial_status):
+    """Entry point of a worker process.
+
+    target is a "module:function" path. The function is called with a
+    ReportingStatus as its first argument followed by args.
+    """
+    # Collect progress events locally and forward them in aggregated batches
+    events = progress_events.EventBuffer()
+    progress_events.set_sink(events)
+    finished = threading.Event()
+    flush_lock = threading.Lock()
+    
+    def flush_events():
+        with flush_lock:
+            summary = events.drain()
+            if summary:
+                queue.put((job_name, 'events', summary))
+    
+    status = ReportingStatus(queue, job_name, initial_status, flush_events)
+    
+    def flush_periodically():
+        while not finished.wait(EVENT_FLUSH_INTERVAL):
+            flush_events()
+    
+    flusher = threading.Thread(target=flush_periodically, name='progress-flusher', daemon=True)
+    flusher.start()
+    
+    try:
+        module_name, function_name = target.split(':')
+        function = getattr(importlib.import_module(module_name), function_name)
+        function(status, *args)
+    except Exception as e:
+        logger.error(f"Job {job_name} failed: {e}")
+        queue.put((job_name, 'status', {'message': f'Error: {str(e)}'}))
+    finally:
+        finished.set()
+        flusher.join()
+        flush_events()
+        queue.put((job_name, 'done', None))
+
+class JobRunner:
+    """Runs scraper and checker jobs in separate worker processes.
+
+    Each job gets its own process (started with "spawn" so it doesn't inherit
+    the web process's database connection or threads). Workers send status
+    updates and aggregated progress events back over a shared queue, and a
+    listener thread applies them to the status dict the routes serve.
+    """
+
+    def __init__(self):
+        self._context = multiprocessing.get_context('spawn')
+        self._queue = None
+        self._processes = {}
+        self._statuses = {}
+        self._aggregators = {}
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def _ensure_listener(self):
+        if self._listener is None:
+            self._queue = self._context.Queue()
+            self._listener = threading.Thread(target=self._listen, name='job-runner-listener', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                job_name, kind, payload = self._queue.get()
+            except (EOFError, OSError):
+                break
+
+            with self._lock:
+                status = self._statuses.get(job_name)
+                aggregator = self._aggregators.get(job_name)
+            if status is None:
+                continue
+
+            if kind == 'status':
+                status.update(payload)
+            elif kind == 'events':
+                aggregator.apply(payload)
+            elif kind == 'done':
+                status['running'] = False
+
+    def start(self, job_name, target, args, status, counters=()):
+        """Start a job in a worker process.
+
+        status is the parent-side dict that mirrors the worker's status and
+        counters lists the progress event counters it reports (see
+        progress_events.ProgressAggregator). Returns False if a job with this
+        name is still running.
+        """
+        with self._lock:
+            self._ensure_listener()
+            process = self._processes.get(job_name)
+            if process is not None and process.is_alive():
+                return False
+
+            status['running'] = True
+            self._statuses[job_name] = status
+            self._aggregators[job_name] = progress_events.ProgressAggregator(status, counters)
+            process = self._context.Process(
+                target=_run_job,
+                args=(job_name, target, args, self._queue, dict(status)),
+                name=f'job-{job_name}',
+                daemon=True
+            )
+            self._processes[job_name] = process
+            process.start()
+            logger.info(f"Started job {job_name} in worker process {process.pid}")
+            return True
+
+    def metrics(self, job_name):
+        """Return the metrics.JobMetrics of a job's latest run, or None if it never ran."""
+        with self._lock:
+            aggregator = self._aggregators.get(job_name)
+        return aggregator.metrics if aggregator else None
+
+    def is_running(self, job_name):
+        """Return True if the job's worker process is alive."""
+        self.refresh()
+        with self._lock:
+            process = self._processes.get(job_name)
+            return process is not None and process.is_alive()
+
+    def stop(self, job_name):
+        """Terminate a job's worker process."""
+        with self._lock:
+            process = self._processes.get(job_name)
+        if process is not None and process.is_alive():
+            process.terminate()
+            process.join(5)
+            logger.info(f"Stopped job {job_name}")
+        self.refresh()
+
+    def refresh(self):
+        """Mark jobs whose worker exited without reporting as no longer running."""
+        with self._lock:
+            for job_name, process in self._processes.items():
+                status = self._statuses[job_name]
+                if not process.is_alive() and status.get('running'):
+                    status['running'] = False
+                    if process.exitcode:
+                        status['message'] = f'Worker exited unexpectedly (exit code {process.exitcode})'
+
+# Shared runner for the web application
+job_runner = JobRunner()
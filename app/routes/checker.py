@@ -1,15 +1,17 @@
-from flask import Blueprint, render_template, request, jsonify, send_file
+from flask import Blueprint, Response, render_template, request, jsonify, send_file
 import os
-import sys
-import threading
 import time
 import io
 import csv
 import mysql.connector
 import pandas as pd
+import circuit_breaker
 import db_connector
 import sfr3_checker
-import random
+import verification_rules
+import progress_events
+import metrics
+from app.job_runner import job_runner
 
 checker_bp = Blueprint('checker', __name__)
 
@@ -28,113 +30,111 @@ checker_status = {
     'server_overload': False
 }
 
-def run_checker_thread(batch_size=50, source=None, include_failed=True, total_properties=None, api_delay=1):
-    """Run the property checker in a background thread with progress tracking"""
+# Progress event counters reported by the checker (see progress_events), the
+# failure reason counters are named after verification_rules.failure_counter
+CHECKER_COUNTERS = ('verified', 'failed', 'api_error', 'not_interested') + verification_rules.LOCAL_COUNTERS
+
+def run_checker_thread(batch_size=50, source=None, total_properties=None, api_delay=1):
+    """Run the property checker with progress tracking.
+    
+    Progress, counts and messages are reported as progress events, which the
+    job runner aggregates into checker_status.
+    """
     global checker_status
     
+    # Results are written in bulk, flushed by batch size or age
+    writer = sfr3_checker.VerificationResultWriter()
+    
+    def report_circuit_state(old_state, new_state, breaker):
+        # Checks wait while the circuit is open and resume by themselves once the API recovers
+        checker_status['server_overload'] = new_state != circuit_breaker.CLOSED
+        if new_state == circuit_breaker.OPEN:
+            progress_events.message(f'⏸️ SFR3 API keeps failing, verification paused for {breaker.cool_down:.0f}s')
+        elif new_state == circuit_breaker.CLOSED:
+            progress_events.message('▶️ SFR3 API recovered, verification resumed')
+    
+    sfr3_checker.api_circuit_breaker.reset()
+    sfr3_checker.api_circuit_breaker.add_listener(report_circuit_state)
+    
     try:
         checker_status['running'] = True
-        checker_status['verified_count'] = 0
-        checker_status['failed_count'] = 0
-        checker_status['api_error_count'] = 0
-        checker_status['square_footage_count'] = 0
-        checker_status['not_interested_count'] = 0
-        checker_status['no_address_count'] = 0
-        checker_status['progress'] = 0
-        checker_status['message'] = 'Starting property verification...'
         checker_status['server_overload'] = False
+        progress_events.message('Starting property verification...')
+        
+        # Link listings inserted before duplicate detection to their canonical property
+        db_connector.backfill_address_keys()
+        
+        # Fail properties that need no API call up front, in set-based UPDATEs
+        pre_verified = sfr3_checker.pre_verify_local_rules(source)
+        for counter, count in pre_verified.items():
+            if count:
+                progress_events.emit(counter, count)
+                progress_events.emit('failed', count)
+        
+        # Listings that failed for missing data hand the verification to a duplicate
+        db_connector.relink_failed_canonicals()
         
         # Get total properties to verify upfront for accurate progress tracking
-        if total_properties:
-            checker_status['total'] = total_properties
-        else:
+        if not total_properties:
             # Get actual count of properties to verify from database
-            total_count = sfr3_checker.get_total_properties_to_verify(source, include_failed)
-            checker_status['total'] = total_count
-        
-        checker_status['message'] = f'Found {checker_status["total"]} properties to verify'
+            total_properties = sfr3_checker.get_total_properties_to_verify(source)
+        progress_events.set_total(total_properties)
+        progress_events.message(f'Found {total_properties} properties to verify')
         
-        # Process properties one by one for real-time updates
+        # Process properties one by one for real-time updates, walking the queue once
         properties_verified = 0
-        max_properties = total_properties if total_properties else checker_status['total']
+        max_properties = total_properties
         
-        while properties_verified < max_properties:
-            # Get a small batch of properties (adjust for responsiveness)
-            current_batch_size = min(batch_size, max_properties - properties_verified)
+        for properties in sfr3_checker.iter_properties_to_verify(batch_size, source, limit=max_properties):
+            # Keep the claimed rows leased however long their API checks take
+            writer.hold(prop['property_id'] for prop in properties)
             
-            # Get a batch of properties
-            properties = sfr3_checker.get_properties_to_verify(current_batch_size, source, include_failed)
+            # Run the local rules over the whole batch, only survivors need the API
+            survivors, rejected = sfr3_checker.rule_pipeline.reject_locally(properties)
+            for prop, failure_reason in rejected:
+                writer.add(prop['property_id'], False, failure_reason)
+                progress_events.advance()
+                progress_events.emit('failed')
+                progress_events.emit(verification_rules.failure_counter(failure_reason))
+            if rejected:
+                progress_events.message(f'✗ {len(rejected)} properties failed the local rules')
             
-            if not properties:
-                checker_status['message'] = 'No more properties found to verify'
-                break
-        
-            # Process each property individually with real-time updates
-            for idx, prop in enumerate(properties):
-                current_property_index = properties_verified + idx + 1
-                checker_status['progress'] = current_property_index
+            # Process each remaining property individually with real-time updates
+            for idx, prop in enumerate(survivors):
+                current_property_index = properties_verified + len(rejected) + idx + 1
+                progress_events.advance()
                 property_id = prop['property_id']
                 
-                checker_status['message'] = f'Checking property {property_id} ({current_property_index}/{max_properties})'
-                
-                # Skip properties with permanent failure reasons
-                if prop.get('failure_reason') and prop.get('failure_reason') != 'API_ERROR':
-                    checker_status['message'] = f'Skipping property {property_id} with permanent failure reason: {prop.get("failure_reason")} ({current_property_index}/{max_properties})'
-                    time.sleep(0.1)  # Short delay for user interface
-                    continue
-                    
-                # Get detailed property information
-                property_details = sfr3_checker.get_property_details(property_id)
-                
-                if not property_details:
-                    checker_status['message'] = f'Error: Could not retrieve details for property {property_id} ({current_property_index}/{max_properties})'
-                    checker_status['failed_count'] += 1
-                    time.sleep(0.1)
-                    continue
-                    
-                # Verify the property
-                is_verified, failure_reason = sfr3_checker.verify_property(property_details)
+                progress_events.message(f'Checking property {property_id} ({current_property_index}/{max_properties})')
                 
-                # Update the status in the database immediately
-                success = sfr3_checker.update_verification_status(property_id, is_verified, failure_reason)
+                # Verify the property with the API (the batch rows carry every column the rules read)
+                is_verified, failure_reason = sfr3_checker.verify_property(prop, check_local=False)
                 
-                if not success:
-                    checker_status['message'] = f'Error updating verification status for property {property_id} ({current_property_index}/{max_properties})'
-                    time.sleep(0.1)
-                    continue
+                # Queue the status update for the next bulk write
+                writer.add(property_id, is_verified, failure_reason)
                     
                 # Update counts immediately
                 if is_verified:
-                    checker_status['verified_count'] += 1
-                    checker_status['message'] = f'✓ Verified property {property_id} ({current_property_index}/{max_properties})'
+                    progress_events.emit('verified')
+                    progress_events.message(f'✓ Verified property {property_id} ({current_property_index}/{max_properties})')
                 else:
-                    checker_status['failed_count'] += 1
-                    checker_status['message'] = f'✗ Failed property {property_id}: {failure_reason} ({current_property_index}/{max_properties})'
+                    progress_events.emit('failed')
+                    progress_events.message(f'✗ Failed property {property_id}: {failure_reason} ({current_property_index}/{max_properties})')
                     
-                    if failure_reason == 'API_ERROR':
-                        checker_status['api_error_count'] += 1
-                    elif failure_reason == 'SQUARE_FOOTAGE':
-                        checker_status['square_footage_count'] += 1
-                    elif failure_reason == 'NOT_INTERESTED':
-                        checker_status['not_interested_count'] += 1
-                    elif failure_reason == 'NO_ADDRESS':
-                        checker_status['no_address_count'] += 1
+                    counter = verification_rules.failure_counter(failure_reason)
+                    if counter in CHECKER_COUNTERS:
+                        progress_events.emit(counter)
                         
                 # Add the configured API delay
-                time.sleep(api_delay)
+                with progress_events.timed('pacing_sleep'):
+                    time.sleep(api_delay)
             
             # Update properties_verified count
             properties_verified += len(properties)
-            
-            # Check if we've reached the limit
-            if properties_verified >= max_properties:
-                checker_status['message'] = f'Completed verification of {properties_verified} properties (limit reached)'
-                break
-                
-            # Get next batch if there are more properties to process and we haven't reached the limit
-            if len(properties) < current_batch_size:
-                checker_status['message'] = f'Completed verification of {properties_verified} properties (no more properties)'
-                break
+        
+        # Queued listings this run verified no longer need the streaming verifier
+        writer.flush()
+        db_connector.prune_verification_outbox()
         
         if properties_verified == 0:
             checker_status['message'] = 'No properties found to verify'
@@ -144,8 +144,21 @@ def run_checker_thread(batch_size=50, source=None, include_failed=True, total_pr
     except Exception as e:
         checker_status['message'] = f'Error: {str(e)}'
     finally:
+        sfr3_checker.api_circuit_breaker.remove_listener(report_circuit_state)
+        # Write the remaining results, including those checked before an error
+        writer.flush()
+        if writer.failed:
+            checker_status['message'] += f' ({writer.failed} status updates failed)'
         checker_status['running'] = False
 
+def checker_worker(status, *args):
+    """Entry point for running the checker in a job runner worker process."""
+    global checker_status
+    
+    # Within the worker, progress updates go to the job's reporting status
+    checker_status = status
+    run_checker_thread(*args)
+
 @checker_bp.route('/')
 def index():
     """Display checker dashboard and status"""
@@ -222,13 +235,11 @@ def index():
 @checker_bp.route('/start', methods=['POST'])
 def start_checker():
     """Start the property checker"""
-    if checker_status['running']:
+    if checker_status['running'] or job_runner.is_running('checker'):
         return jsonify({'success': False, 'message': 'Property checker is already running'})
     
     # Get parameters from the form
-    max_threads = int(request.form.get('max_threads', 10))
     source = request.form.get('source', None)
-    include_failed = request.form.get('include_failed', 'true').lower() == 'true'
     total_properties = request.form.get('total_properties', None)
     api_delay = request.form.get('api_delay', '1')
     
@@ -247,150 +258,46 @@ def start_checker():
         total_properties = None
         api_delay = 1  # Default to 1 second
     
-    # Start the SFR3 checker in a background thread with real-time updates
-    thread = threading.Thread(
-        target=run_checker_thread, 
-        args=(50, source, include_failed, total_properties, api_delay)  # batch_size=50 for responsive updates
+    # Start the SFR3 checker in its own worker process with real-time updates
+    checker_status['message'] = 'Starting property verification...'
+    started = job_runner.start(
+        'checker',
+        'app.routes.checker:checker_worker',
+        (50, source, total_properties, api_delay),  # batch_size=50 for responsive updates
+        checker_status,
+        CHECKER_COUNTERS
     )
-    thread.daemon = True
-    thread.start()
+    if not started:
+        return jsonify({'success': False, 'message': 'Property checker is already running'})
     
     return jsonify({'success': True, 'message': 'Started property verification'})
 
-def run_checker_with_threading(source=None, include_failed=True, total_properties=None, max_threads=10, api_delay=1):
-    """Run the property checker using the new threaded implementation"""
-    global checker_status
-    
-    try:
-        checker_status['running'] = True
-        checker_status['verified_count'] = 0
-        checker_status['failed_count'] = 0
-        checker_status['api_error_count'] = 0
-        checker_status['square_footage_count'] = 0
-        checker_status['not_interested_count'] = 0
-        checker_status['no_address_count'] = 0
-        checker_status['progress'] = 0
-        checker_status['message'] = 'Starting property verification...'
-        checker_status['server_overload'] = False
-        
-        # Store the original sleep function to restore it later
-        original_sleep = time.sleep
-        
-        # Wrap the time.sleep function to enforce our API delay
-        def custom_sleep(seconds):
-            # Only apply our custom delay for very short sleeps that are likely random delays
-            if seconds < 0.5:  # If it's the small random delay in verify_property
-                # Add a random component between 0 and 2 seconds to the api_delay
-                random_delay = api_delay + random.uniform(0, 2)
-                return original_sleep(random_delay)  # Use our configured delay instead
-            return original_sleep(seconds)  # Otherwise use the original delay
-            
-        # Override the sleep function during verification
-        time.sleep = custom_sleep
-        
-        # Prepare arguments for the sfr3_checker.py script
-        args = []
-        
-        if max_threads:
-            args.extend(['--threads', str(max_threads)])
-        
-        if source:
-            args.extend(['--source', source])
-        
-        if total_properties:
-            args.extend(['--limit', str(total_properties)])
-            
-        if not include_failed:
-            args.append('--skip-failed')
-        
-        # Create command line arguments from the list
-        cmd_args = sys.argv.copy()
-        cmd_args[1:] = args  # Replace any existing args
-        sys.argv = cmd_args
-        
-        # Set up tracking variables
-        start_time = time.time()
-        last_progress = 0
-        
-        # Create a status update function to track progress
-        def update_status(batch_counts, properties_verified, total):
-            nonlocal last_progress
-            
-            # Check if verification was stopped due to too many API errors
-            if batch_counts.get('server_overload', False):
-                error_message = batch_counts.get('stop_message', "Too many consecutive API errors")
-                checker_status['message'] = f"⚠️ STOPPED: {error_message}. Properties processed before stopping are saved."
-                checker_status['server_overload'] = True
-                return
-            
-            # Check if we crossed a 100-property boundary
-            crossed_hundred_mark = (last_progress // 100) < (properties_verified // 100)
-            
-            checker_status['verified_count'] += batch_counts['verified']
-            checker_status['failed_count'] += batch_counts['failed']
-            checker_status['api_error_count'] += batch_counts['api_error']
-            checker_status['square_footage_count'] += batch_counts['square_footage']
-            checker_status['not_interested_count'] += batch_counts['not_interested']
-            checker_status['no_address_count'] += batch_counts['no_address']
-            checker_status['progress'] = properties_verified
-            
-            if total:
-                checker_status['total'] = total
-                percentage = (properties_verified / total) * 100
-                checker_status['message'] = f'Processing... {percentage:.1f}% complete ({properties_verified}/{total})'
-            else:
-                checker_status['message'] = f'Processing... {properties_verified} properties checked'
-                
-            # If we crossed a 100-property mark, pause for 5 seconds
-            if crossed_hundred_mark and properties_verified >= 100:
-                checker_status['message'] = f'Pausing for 5 seconds after processing {properties_verified} properties...'
-                time.sleep(5)
-                
-            last_progress = properties_verified
-        
-        # Hook into the main verification function
-        original_process_batch = sfr3_checker.process_verification_batch
-        
-        def process_batch_with_updates(*args, **kwargs):
-            result = original_process_batch(*args, **kwargs)
-            # Update status after each batch
-            update_status(result, checker_status['progress'] + len(args[0]), checker_status['total'])
-            return result
-        
-        # Replace the function with our tracking version
-        sfr3_checker.process_verification_batch = process_batch_with_updates
-        
-        # Run the main function
-        checker_status['message'] = f'Starting verification process with {api_delay}s API delay...'
-        if total_properties:
-            checker_status['total'] = total_properties
-            
-        sfr3_checker.main()
-        
-        # Restore the original function and sleep
-        sfr3_checker.process_verification_batch = original_process_batch
-        time.sleep = original_sleep
-        
-        # Calculate time taken
-        time_taken = time.time() - start_time
-        checker_status['message'] = f'Completed verification of {checker_status["progress"]} properties in {time_taken:.1f} seconds'
-        
-    except Exception as e:
-        checker_status['message'] = f'Error: {str(e)}'
-        # Make sure we restore the original sleep function
-        if 'original_sleep' in locals():
-            time.sleep = original_sleep
-    finally:
-        checker_status['running'] = False
-        # One more safety check to restore original sleep function
-        if 'original_sleep' in locals():
-            time.sleep = original_sleep
-
 @checker_bp.route('/status')
 def get_status():
     """Get current status of the checker"""
+    job_runner.refresh()
     return jsonify(checker_status)
 
+@checker_bp.route('/metrics')
+def get_metrics():
+    """Get SFR3 latency, DB timings, wait time and throughput of the current or last checker run.
+    
+    Returns JSON, or the Prometheus text format for ?format=prometheus or a
+    scraper's text/plain Accept header.
+    """
+    job_runner.refresh()
+    job_metrics = job_runner.metrics('checker')
+    if job_metrics is None:
+        # No run yet, report empty metrics in the same shape
+        job_metrics = metrics.JobMetrics()
+    
+    wants_text = request.args.get('format') == 'prometheus' or (
+        request.args.get('format') != 'json' and 'text/plain' in request.headers.get('Accept', '')
+    )
+    if wants_text:
+        return Response(job_metrics.prometheus(checker_status, 'checker'), content_type='text/plain; version=0.0.4; charset=utf-8')
+    return jsonify(job_metrics.snapshot(checker_status))
+
 @checker_bp.route('/download')
 def download_verified():
     """Download verified properties as CSV"""
@@ -403,7 +310,7 @@ def download_verified():
                square_footage, bedrooms, bathrooms, year_built, 
                after_repair_value, url, source
         FROM properties
-        WHERE is_verified = TRUE
+        WHERE is_verified = TRUE AND canonical_id IS NULL
         """
         
         df = pd.read_sql(query, connection)
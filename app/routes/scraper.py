@@ -7,6 +7,7 @@ import json
 import importlib
 import db_connector
 import mysql.connector
+from app.job_runner import job_runner
 
 # Import the scraper modules
 import zillow_db
@@ -22,11 +23,17 @@ scraper_status = {
     'redfin': {'running': False, 'progress': 0, 'total': 0, 'message': 'Idle'}
 }
 
+# Progress event counters reported by the scrapers (see progress_events)
+SCRAPER_COUNTERS = ('pages', 'inserted', 'skipped', 'duplicates', 'errors')
+
 def run_scraper_thread(scraper_name, states=None):
-    """Run a scraper in a background thread with progress tracking"""
+    """Run a scraper with progress tracking.
+    
+    Progress, counters and messages arrive as progress events emitted by the
+    scraper and database modules, so nothing here needs to parse output.
+    """
     try:
         scraper_status[scraper_name]['running'] = True
-        scraper_status[scraper_name]['progress'] = 0
         scraper_status[scraper_name]['message'] = 'Starting...'
         
         # Get the appropriate scraper module
@@ -41,52 +48,26 @@ def run_scraper_thread(scraper_name, states=None):
             scraper_status[scraper_name]['running'] = False
             return
         
-        # Run the scraper's main function
-        # We'll monkey patch the scraper's progress reporting
-        import builtins
-        original_print = builtins.print
-        
-        def custom_print(*args, **kwargs):
-            message = ' '.join(str(arg) for arg in args)
-            scraper_status[scraper_name]['message'] = message
-            original_print(*args, **kwargs)
-            
-            # Try to parse progress information from the message
-            if "Processing" in message and "of" in message:
-                try:
-                    parts = message.split()
-                    current_idx = parts.index("Processing") + 1
-                    total_idx = parts.index("of") + 1
-                    
-                    current = int(parts[current_idx])
-                    total = int(parts[total_idx])
-                    
-                    scraper_status[scraper_name]['progress'] = current
-                    scraper_status[scraper_name]['total'] = total
-                except (ValueError, IndexError):
-                    pass
-        
-        # Replace print function temporarily for progress tracking
-        builtins.print = custom_print
-        
         # Run the scraper with selected states
-        original_print(f"Starting {scraper_name} scraper with states: {states if states else 'All'}")
+        print(f"Starting {scraper_name} scraper with states: {states if states else 'All'}")
         if states:
             scraper_module.main(states)
         else:
             scraper_module.main()
+        
+        scraper_status[scraper_name]['message'] = 'Completed'
             
     except Exception as e:
-        import builtins
-        builtins.print(f"Scraper error: {str(e)}")
+        print(f"Scraper error: {str(e)}")
         scraper_status[scraper_name]['message'] = f'Error: {str(e)}'
     finally:
         scraper_status[scraper_name]['running'] = False
-        scraper_status[scraper_name]['message'] = 'Completed'
-        
-        # Restore original print
-        import builtins
-        builtins.print = original_print
+
+def scraper_worker(status, scraper_name, states=None):
+    """Entry point for running a scraper in a job runner worker process."""
+    # Within the worker, progress updates go to the job's reporting status
+    scraper_status[scraper_name] = status
+    run_scraper_thread(scraper_name, states)
 
 @scraper_bp.route('/')
 def index():
@@ -139,22 +120,28 @@ def start_scraper():
     if scraper_name not in scraper_status:
         return jsonify({'success': False, 'message': f'Unknown scraper: {scraper_name}'})
     
-    if scraper_status[scraper_name]['running']:
+    if scraper_status[scraper_name]['running'] or job_runner.is_running(scraper_name):
         return jsonify({'success': False, 'message': f'{scraper_name} scraper is already running'})
     
-    # Start the scraper in a background thread
-    thread = threading.Thread(
-        target=run_scraper_thread, 
-        args=(scraper_name, states if states else None)
+    # Start the scraper in its own worker process
+    scraper_status[scraper_name]['progress'] = 0
+    scraper_status[scraper_name]['message'] = 'Starting...'
+    started = job_runner.start(
+        scraper_name,
+        'app.routes.scraper:scraper_worker',
+        (scraper_name, states if states else None),
+        scraper_status[scraper_name],
+        SCRAPER_COUNTERS
     )
-    thread.daemon = True
-    thread.start()
+    if not started:
+        return jsonify({'success': False, 'message': f'{scraper_name} scraper is already running'})
     
     return jsonify({'success': True, 'message': f'Started {scraper_name} scraper'})
 
 @scraper_bp.route('/status')
 def get_status():
     """Get current status of all scrapers"""
+    job_runner.refresh()
     return jsonify(scraper_status)
 
 @scraper_bp.route('/status/<scraper_name>')
@@ -163,4 +150,5 @@ def get_scraper_status(scraper_name):
     if scraper_name not in scraper_status:
         return jsonify({'success': False, 'message': f'Unknown scraper: {scraper_name}'})
     
+    job_runner.refresh()
     return jsonify(scraper_status[scraper_name]) 
\ No newline at end of file
@@ -0,0 +1,182 @@
+"""Load test for the SFR3 checker against the local stand-in API.
+
+Seeds --properties synthetic rows (source "loadtest") into the database
+named by --database, starts benchmarks/sfr3_standin.py in-process and runs
+each checker mode over them:
+  - cli: sfr3_checker.main(), the concurrent command line checker
+  - web: app.routes.checker.run_checker_thread(), what the web UI runs
+Each run starts from freshly seeded rows and an empty verification cache,
+and reports properties/s, SFR3 calls, wasted calls (throttled, failed or
+repeated), how often the circuit breaker paused verification and whether
+any rows were left unchecked.
+
+Only rows with source "loadtest" and their cache entries are touched, but
+point --database at a scratch database anyway.
+
+    python benchmarks/checker_load_test.py --database sfr3_loadtest [--properties 500] [--modes cli,web]
+        [--checker-threads 4] [--checker-rate 2.0] [--rate 5] [--error-rate 0.05] ...
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sfr3_standin
+
+SOURCE = "loadtest"  # Source of the seeded rows, also the checker's --source filter
+STREET = "Loadtest Ave"  # Street of every seeded address, used to clear their cache entries
+
+def seed_properties(db_connector, count, small_ratio, no_address_ratio, seed):
+    """Replace the loadtest rows with count fresh ones, returns how many were inserted."""
+    clear_properties(db_connector)
+    rng = random.Random(seed)
+    properties = []
+    for i in range(count):
+        roll = rng.random()
+        properties.append({
+            "property_id": f"{SOURCE}-{i}",
+            "State": "Ohio",
+            "Formatted Property Type": "Single_Family",
+            "Occupied/Vacant": "Unknown",
+            "Address": "" if roll < no_address_ratio else f"{i} {STREET}, Columbus, OH 43215",
+            "Zip Code": "43215",
+            "Square Footage": 600 if roll > 1 - small_ratio else rng.randint(900, 2500),
+            "Rooms (Beds)": rng.randint(2, 5),
+            "Bathrooms": rng.choice([1, 1.5, 2, 2.5]),
+            "Year Built": rng.randint(1920, 2015),
+            "After Repair Value": rng.randint(90000, 400000),
+            "URL": f"https://example.com/{SOURCE}/{i}"
+        })
+    inserted, _ = db_connector.batch_insert_properties(properties, SOURCE)
+    return inserted
+
+def clear_properties(db_connector):
+    """Delete the loadtest rows and their verification cache entries."""
+    connection = db_connector.get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM properties WHERE source = %s", (SOURCE,))
+        cursor.execute("DELETE FROM verification_cache WHERE address LIKE %s", (f"%{STREET}%",))
+        connection.commit()
+    finally:
+        cursor.close()
+
+def outcome_counts(db_connector):
+    """Return {'verified': n, '<FAILURE_REASON>': n, 'unchecked': n} for the loadtest rows."""
+    connection = db_connector.get_db_connection()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT is_verified, failure_reason, COUNT(*)
+            FROM properties
+            WHERE source = %s
+            GROUP BY is_verified, failure_reason
+            """, (SOURCE,))
+        counts = {}
+        for is_verified, failure_reason, count in cursor.fetchall():
+            key = "verified" if is_verified else (failure_reason or "unchecked")
+            counts[key] = counts.get(key, 0) + count
+        return counts
+    finally:
+        cursor.close()
+
+def server_stats(server):
+    with urllib.request.urlopen(server.check_url.replace(sfr3_standin.CHECK_PATH, "/stats")) as response:
+        return json.load(response)
+
+def reset_checker(sfr3_checker, verification_cache, rate):
+    """Give a run the state of a freshly started checker."""
+    with verification_cache.lock:
+        verification_cache.lru.clear()
+    sfr3_checker.api_rate_limiter = sfr3_checker.ApiRateLimiter(rate)
+    sfr3_checker.api_circuit_breaker.reset()
+
+def run_cli(sfr3_checker, args):
+    sys.argv = [
+        "sfr3_checker.py", "--source", SOURCE,
+        "--threads", str(args.checker_threads),
+        "--rate", str(args.checker_rate),
+        "--batch-size", str(args.batch_size)
+    ]
+    sfr3_checker.main()
+
+def run_web(sfr3_checker, args):
+    # Imported late, it needs Flask and a configured app package
+    from app.routes import checker as web_checker
+    web_checker.run_checker_thread(args.batch_size, SOURCE, None, args.web_delay)
+
+MODES = {"cli": run_cli, "web": run_web}
+
+def main():
+    parser = argparse.ArgumentParser(description="SFR3 checker load test against the local stand-in API")
+    parser.add_argument("--database", required=True, help="Scratch MySQL database to seed (overrides DB_NAME)")
+    parser.add_argument("--properties", type=int, default=500, help="Rows to seed per run (default: 500)")
+    parser.add_argument("--small-ratio", type=float, default=0.1, help="Share of rows below the square footage minimum (default: 0.1)")
+    parser.add_argument("--no-address-ratio", type=float, default=0.02, help="Share of rows without an address (default: 0.02)")
+    parser.add_argument("--modes", default="cli,web", help="Checker modes to run, comma separated: cli, web (default: cli,web)")
+    parser.add_argument("--checker-threads", type=int, default=4, help="--threads for the CLI checker (default: 4)")
+    parser.add_argument("--checker-rate", type=float, default=2.0, help="Starting SFR3 request rate of the checker (default: 2.0)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Checker batch size (default: 100)")
+    parser.add_argument("--web-delay", type=float, default=0.1, help="API delay of the web checker, the UI's minimum is 0.1 (default: 0.1)")
+    sfr3_standin.add_config_arguments(parser)
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(unknown)}")
+
+    # Both are read when the checker modules are imported
+    server = sfr3_standin.start_in_thread(sfr3_standin.config_from_args(args))
+    os.environ["DB_NAME"] = args.database
+    os.environ["SFR3_CHECK_URL"] = server.check_url
+    print(f"SFR3 stand-in on {server.check_url} ({args.rate} req/s, {args.latency_ms} ms median, "
+          f"{args.error_rate:.0%} errors, {args.hang_rate:.0%} hangs)")
+
+    import db_connector
+    import sfr3_checker
+    import verification_cache
+
+    results = []
+    for mode in modes:
+        seeded = seed_properties(db_connector, args.properties, args.small_ratio, args.no_address_ratio, args.seed)
+        server.state.reset()
+        reset_checker(sfr3_checker, verification_cache, args.checker_rate)
+        print(f"\n=== {mode}: {seeded} properties ===")
+
+        start = time.perf_counter()
+        MODES[mode](sfr3_checker, args)
+        elapsed = time.perf_counter() - start
+
+        outcomes = outcome_counts(db_connector)
+        stats = server_stats(server)
+        checked = seeded - outcomes.get("unchecked", 0)
+        results.append({
+            "mode": mode,
+            "elapsed_seconds": round(elapsed, 2),
+            "properties_per_second": round(checked / elapsed, 2) if elapsed else None,
+            "checked": checked,
+            "stopped_early": outcomes.get("unchecked", 0) > 0,
+            "circuit_pauses": sfr3_checker.api_circuit_breaker.snapshot()["times_opened"],
+            "outcomes": outcomes,
+            "server": stats
+        })
+
+    clear_properties(db_connector)
+
+    print("\nmode  elapsed(s)  props/s  checked  calls  wasted  throttled  errors  pauses  stopped")
+    for result in results:
+        stats = result["server"]
+        print(f"{result['mode']:<6}{result['elapsed_seconds']:>10}{result['properties_per_second']:>9}"
+              f"{result['checked']:>9}{stats['calls']:>7}{stats['wasted_calls']:>8}"
+              f"{stats['by_status'].get('400', 0):>11}{stats['by_status'].get('500', 0):>8}{result['circuit_pauses']:>8}"
+              f"{'  yes' if result['stopped_early'] else '   no':>9}")
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Micro-benchmark for json_decoder against the stdlib path the scrapers used.
+
+Builds a synthetic Redfin-style "{}&&"-prefixed body and times:
+  - stdlib: json.loads(response.text[4:])  (decode bytes to str, slice, parse)
+  - decoder: json_decoder.decode_response(response, b"{}&&")
+
+    python benchmarks/json_decode.py [--homes 50000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import json_decoder
+
+class FakeResponse:
+    """Just enough of requests.Response for the decoders."""
+    def __init__(self, content):
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8")
+
+def build_body(num_homes):
+    homes = []
+    for i in range(num_homes):
+        homes.append({
+            "propertyId": 100000 + i,
+            "propertyType": 6 if i % 3 else 4,
+            "streetLine": {"value": f"{i} Main St", "level": 1},
+            "city": "Columbus",
+            "state": "OH",
+            "zip": "43215",
+            "sqFt": {"value": 1200 + i % 900, "level": 1},
+            "beds": 3,
+            "baths": 2.5,
+            "yearBuilt": {"value": 1970 + i % 50, "level": 1},
+            "price": {"value": 150000 + i, "level": 1},
+            "url": f"/OH/Columbus/{i}-Main-St-43215/home/{100000 + i}",
+            "listingRemarks": "Charming home close to schools and parks. " * 4
+        })
+    return b"{}&&" + json.dumps({"payload": {"homes": homes}}).encode("utf-8")
+
+def bench(label, fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<28}{elapsed * 1000:>10.1f} ms")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON decoding micro-benchmark")
+    parser.add_argument("--homes", type=int, default=50000, help="Homes in the synthetic body (default: 50000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions per decoder (default: 5)")
+    args = parser.parse_args()
+
+    response = FakeResponse(build_body(args.homes))
+    print(f"Body size: {len(response.content) / 1e6:.1f} MB, decoder: {json_decoder.DECODER_NAME}")
+
+    baseline = bench("json.loads(text[4:])", lambda: json.loads(response.text[4:]), args.repeat)
+    fast = bench("decode_response(prefix)", lambda: json_decoder.decode_response(response, b"{}&&"), args.repeat)
+    print(f"Speed-up: {baseline / fast:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare response sizes and JSON parse times for the "full" and "minimal"
+payload profiles of each scraper.
+
+Sends one live request per source and profile, so run it sparingly:
+
+    python benchmarks/payload_size.py [--state Ohio] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import realtor_db
+import redfin_db
+import zillow_db
+
+PROFILES = ["full", "minimal"]
+
+def fetch_realtor(state, profile):
+    payload = realtor_db.create_payload(state, "single_family", profile)
+    response = requests.post(realtor_db.BASE_URL, headers=realtor_db.headers, json=payload, timeout=60)
+    return response.content, 0
+
+def fetch_zillow(state, profile):
+    payload = zillow_db.create_payload(state, "single_family", 1, profile)
+    response = requests.put("https://www.zillow.com/async-create-search-page-state",
+                            headers=zillow_db.headers, json=payload, timeout=60)
+    return response.content, 0
+
+def fetch_redfin(state, profile):
+    params = redfin_db.create_params(redfin_db.states_config[state], profile)
+    response = requests.get(redfin_db.url, headers=redfin_db.headers, params=params, timeout=60)
+    return response.content, 4  # Skip the "{}&&" prefix
+
+SOURCES = {
+    "realtor": fetch_realtor,
+    "zillow": fetch_zillow,
+    "redfin": fetch_redfin
+}
+
+def time_parse(body, prefix_len, repeat):
+    text = body.decode("utf-8")[prefix_len:]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        json.loads(text)
+    return (time.perf_counter() - start) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="Payload profile size benchmark")
+    parser.add_argument("--state", default="Ohio", help="State to request (default: Ohio)")
+    parser.add_argument("--repeat", type=int, default=20, help="JSON parse repetitions per response (default: 20)")
+    parser.add_argument("--source", choices=list(SOURCES), help="Only benchmark this source")
+    args = parser.parse_args()
+
+    sources = [args.source] if args.source else list(SOURCES)
+
+    print(f"{'source':<10}{'profile':<10}{'bytes':>14}{'parse ms':>12}")
+    for source in sources:
+        for profile in PROFILES:
+            try:
+                body, prefix_len = SOURCES[source](args.state, profile)
+                parse_time = time_parse(body, prefix_len, args.repeat)
+                print(f"{source:<10}{profile:<10}{len(body):>14,}{parse_time * 1000:>12.2f}")
+            except Exception as e:
+                print(f"{source:<10}{profile:<10} failed: {e}")
+            time.sleep(3)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""Local stand-in for the SFR3 check-address API.
+
+Serves GET /sfr3/offmarket/check-address?address=... with the real API's
+contract:
+  - 200 {"interested": true|false, "reason": "..."}, decided by a hash of
+    the address so repeat runs get the same answers
+  - 400 {"message": "Too many requests"} above --rate requests per second
+    (token bucket of --burst requests)
+  - 500 for --error-rate of requests, and --hang-rate of requests that
+    sleep --hang-seconds before answering (longer than the checker's timeout)
+Latency is drawn from a log-normal distribution around --latency-ms.
+
+GET /stats returns call counts (including repeat calls for an address) and
+POST /reset clears them. Point the checker at it with:
+
+    python benchmarks/sfr3_standin.py [--port 8099] [--rate 5] [--latency-ms 120]
+    SFR3_CHECK_URL=http://127.0.0.1:8099/sfr3/offmarket/check-address python sfr3_checker.py
+"""
+import argparse
+import collections
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CHECK_PATH = "/sfr3/offmarket/check-address"
+
+class StandinConfig:
+    """Behaviour of the stand-in, every field settable from the command line."""
+
+    def __init__(self, rate=5.0, burst=5, latency_ms=120.0, latency_sigma=0.4, interested_ratio=0.3,
+                 error_rate=0.0, hang_rate=0.0, hang_seconds=12.0, retry_after=None, seed=1):
+        self.rate = rate
+        self.burst = burst
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.interested_ratio = interested_ratio
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.retry_after = retry_after
+        self.seed = seed
+
+class StandinState:
+    """Token bucket, random source and call statistics shared by all handler threads."""
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.random = random.Random(config.seed)
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.tokens = float(self.config.burst)
+            self.last_refill = time.monotonic()
+            self.by_status = collections.Counter()
+            self.calls_by_address = collections.Counter()
+            self.answered = set()
+            self.started = time.time()
+
+    def take_token(self):
+        """Return True if a request fits under the rate limit."""
+        if not self.config.rate:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.config.burst, self.tokens + (now - self.last_refill) * self.config.rate)
+            self.last_refill = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def draw(self):
+        """Return (latency seconds, fault) for one request, fault being None, 'error' or 'hang'."""
+        config = self.config
+        with self.lock:
+            latency = config.latency_ms / 1000.0
+            if config.latency_sigma:
+                latency *= math.exp(self.random.gauss(0, config.latency_sigma))
+            roll = self.random.random()
+        if roll < config.error_rate:
+            return latency, 'error'
+        if roll < config.error_rate + config.hang_rate:
+            return latency, 'hang'
+        return latency, None
+
+    def record(self, address, status):
+        with self.lock:
+            self.by_status[status] += 1
+            self.calls_by_address[address] += 1
+            if status == 200:
+                self.answered.add(address)
+
+    def stats(self):
+        with self.lock:
+            calls = sum(self.by_status.values())
+            return {
+                'calls': calls,
+                'by_status': {str(status): count for status, count in sorted(self.by_status.items())},
+                'unique_addresses': len(self.calls_by_address),
+                'answered_addresses': len(self.answered),
+                # Every call beyond one successful answer per address was wasted
+                'wasted_calls': calls - len(self.answered),
+                'repeat_calls': sum(count - 1 for count in self.calls_by_address.values()),
+                'elapsed_seconds': round(time.time() - self.started, 3)
+            }
+
+def is_interested(address, ratio):
+    """Deterministic SFR3 answer for an address."""
+    digest = hashlib.blake2b(address.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2.0 ** 64 < ratio
+
+class StandinHandler(BaseHTTPRequestHandler):
+    state = None  # StandinState, set by make_server
+
+    def log_message(self, format, *args):
+        # Keep load tests quiet, /stats has the numbers
+        pass
+
+    def send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            return self.send_json(200, self.state.stats())
+        if url.path != CHECK_PATH:
+            return self.send_json(404, {"message": "Not found"})
+
+        address = parse_qs(url.query).get("address", [""])[0]
+        config = self.state.config
+
+        if not self.state.take_token():
+            self.state.record(address, 400)
+            headers = {"Retry-After": str(config.retry_after)} if config.retry_after else None
+            return self.send_json(400, {"message": "Too many requests"}, headers)
+
+        latency, fault = self.state.draw()
+        if fault == 'hang':
+            time.sleep(config.hang_seconds)
+        else:
+            time.sleep(latency)
+
+        if fault == 'error':
+            self.state.record(address, 500)
+            return self.send_json(500, {"message": "Internal server error"})
+
+        interested = is_interested(address, config.interested_ratio)
+        self.state.record(address, 200)
+        reason = "Matches the buy box" if interested else "Outside the buy box"
+        self.send_json(200, {"interested": interested, "reason": reason})
+
+    def do_POST(self):
+        if urlparse(self.path).path == "/reset":
+            self.state.reset()
+            return self.send_json(200, {"reset": True})
+        self.send_json(404, {"message": "Not found"})
+
+def make_server(config, host="127.0.0.1", port=0):
+    """Create a stand-in server (port 0 picks a free port); call serve_forever() to run it."""
+    handler = type("BoundStandinHandler", (StandinHandler,), {"state": StandinState(config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = handler.state
+    server.check_url = f"http://{host}:{server.server_address[1]}{CHECK_PATH}"
+    return server
+
+def start_in_thread(config, host="127.0.0.1", port=0):
+    """Start a stand-in server on a daemon thread and return it."""
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, name="sfr3-standin", daemon=True).start()
+    return server
+
+def add_config_arguments(parser):
+    """Add the stand-in's behaviour options to an argument parser."""
+    parser.add_argument("--rate", type=float, default=5.0, help="Requests per second before answering 400 Too many requests, 0 for no limit (default: 5)")
+    parser.add_argument("--burst", type=int, default=5, help="Requests allowed at once above the rate (default: 5)")
+    parser.add_argument("--latency-ms", type=float, default=120.0, help="Median response latency (default: 120)")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Log-normal spread of the latency, 0 for fixed (default: 0.4)")
+    parser.add_argument("--interested-ratio", type=float, default=0.3, help="Share of addresses SFR3 is interested in (default: 0.3)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500 (default: 0)")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Share of requests that hang for --hang-seconds (default: 0)")
+    parser.add_argument("--hang-seconds", type=float, default=12.0, help="How long hanging requests take (default: 12)")
+    parser.add_argument("--retry-after", type=int, help="Send this Retry-After with 400 Too many requests")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for latencies and faults (default: 1)")
+
+def config_from_args(args):
+    return StandinConfig(
+        rate=args.rate, burst=args.burst, latency_ms=args.latency_ms, latency_sigma=args.latency_sigma,
+        interested_ratio=args.interested_ratio, error_rate=args.error_rate, hang_rate=args.hang_rate,
+        hang_seconds=args.hang_seconds, retry_after=args.retry_after, seed=args.seed
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the SFR3 check-address API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8099, help="Port to listen on (default: 8099)")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = make_server(config_from_args(args), args.host, args.port)
+    print(f"SFR3 stand-in listening on {server.check_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger("circuit_breaker")
+
+# States
+CLOSED = "closed"  # Calls go through, consecutive failures are counted
+OPEN = "open"  # Calls wait for the cool-down to pass
+HALF_OPEN = "half_open"  # A few probe calls test whether the service recovered
+
+class CircuitBreaker:
+    """Circuit breaker shared by any number of threads calling one service.
+
+    After failure_threshold consecutive failures the circuit opens and
+    acquire() blocks callers for cool_down seconds. Then it goes half-open
+    and lets up to half_open_probes calls through at a time. Once
+    probe_successes of them succeed it closes again. A failed probe reopens
+    it, and each reopening doubles the cool-down up to max_cool_down. The
+    cool-down goes back to cool_down once the circuit closes.
+
+    Callers acquire() before each call and report the outcome with
+    record_success() or record_failure() from the same thread. Listeners
+    are called with (old_state, new_state, breaker) after every transition,
+    outside the lock.
+    """
+
+    def __init__(self, failure_threshold=20, cool_down=30.0, max_cool_down=300.0, half_open_probes=1, probe_successes=2):
+        self.failure_threshold = failure_threshold
+        self.base_cool_down = cool_down
+        self.max_cool_down = max_cool_down
+        self.half_open_probes = half_open_probes
+        self.probe_successes = probe_successes
+        self.condition = threading.Condition()
+        self.listeners = []
+        # Whether the current thread holds a half-open probe slot
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        """Close the circuit and forget all failures."""
+        with self.condition:
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self.cool_down = self.base_cool_down
+            self.opened_at = None
+            self.probes_in_flight = 0
+            self.probe_success_count = 0
+            self.times_opened = 0
+            self.condition.notify_all()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def acquire(self):
+        """Block until a call may go through, returns the seconds spent waiting."""
+        start = time.monotonic()
+        transition = None
+        with self.condition:
+            while True:
+                if self.state == CLOSED:
+                    break
+                if self.state == OPEN:
+                    remaining = self.opened_at + self.cool_down - time.monotonic()
+                    if remaining > 0:
+                        self.condition.wait(remaining)
+                        continue
+                    transition = self._transition(HALF_OPEN)
+                if self.probes_in_flight < self.half_open_probes:
+                    self.probes_in_flight += 1
+                    self._local.probe = True
+                    break
+                # Every probe slot is taken, wait for a probe to finish
+                self.condition.wait()
+        self._notify(transition)
+        return time.monotonic() - start
+
+    def record_success(self):
+        transition = None
+        with self.condition:
+            probe = self._release_probe()
+            self.consecutive_failures = 0
+            if self.state == HALF_OPEN and probe:
+                self.probe_success_count += 1
+                if self.probe_success_count >= self.probe_successes:
+                    self.cool_down = self.base_cool_down
+                    transition = self._transition(CLOSED)
+        self._notify(transition)
+
+    def record_failure(self):
+        transition = None
+        with self.condition:
+            self._release_probe()
+            if self.state == HALF_OPEN:
+                self.cool_down = min(self.cool_down * 2, self.max_cool_down)
+                transition = self._transition(OPEN)
+            elif self.state == CLOSED:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= self.failure_threshold:
+                    transition = self._transition(OPEN)
+            # Failures of calls started before the circuit opened don't extend the cool-down
+        self._notify(transition)
+
+    def snapshot(self):
+        with self.condition:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(self.opened_at + self.cool_down - time.monotonic(), 0.0), 1)
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'cool_down_seconds': self.cool_down,
+                'retry_in_seconds': retry_in,
+                'times_opened': self.times_opened
+            }
+
+    def _release_probe(self):
+        """Free the current thread's probe slot, returns True if it held one."""
+        if not getattr(self._local, 'probe', False):
+            return False
+        self._local.probe = False
+        self.probes_in_flight = max(self.probes_in_flight - 1, 0)
+        self.condition.notify_all()
+        return True
+
+    def _transition(self, state):
+        """Switch to state, the caller holds the lock and passes the result to _notify."""
+        old_state = self.state
+        self.state = state
+        self.probe_success_count = 0
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+        elif state == CLOSED:
+            self.consecutive_failures = 0
+        self.condition.notify_all()
+        return old_state, state
+
+    def _notify(self, transition):
+        if transition is None:
+            return
+        old_state, new_state = transition
+        for listener in list(self.listeners):
+            try:
+                listener(old_state, new_state, self)
+            except Exception as e:
+                logger.error(f"Circuit breaker listener failed: {e}")
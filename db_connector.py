@@ -4,6 +4,8 @@ from dotenv import load_dotenv
 import logging
 from mysql.connector import pooling
 import time
+import address_normalizer
+import progress_events
 
 # Configure logging
 logging.basicConfig(
@@ -31,6 +33,11 @@ db_config = {
 global_connection = None
 connection_pool = None
 
+NO_STREET_KEY = 0  # address_key of properties without a house number and street, never linked as duplicates
+# Failure reasons that don't come from the listing's own columns; any other
+# failure_reason means the listing failed a local rule on its data
+NON_LOCAL_FAILURE_REASONS = ('NOT_INTERESTED', 'API_ERROR', 'DEAD_LETTER')
+
 def initialize_db():
     """Initialize the global database connection when the app starts.
     
@@ -190,10 +197,89 @@ def _initialize_tables():
                 is_verified BOOLEAN DEFAULT FALSE,
                 failure_reason VARCHAR(50) NULL,
                 source VARCHAR(50),
+                date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                claimed_by VARCHAR(100) NULL,
+                lease_until DATETIME NULL,
+                attempt_count INT NOT NULL DEFAULT 0,
+                next_attempt_at DATETIME NULL,
+                address_key BIGINT UNSIGNED NULL,
+                canonical_id INT NULL,
+                INDEX idx_properties_address_key (address_key)
+            )
+            """)
+        
+        # Create failed_requests table (ledger of scraper pages that exhausted their retries)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS failed_requests (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                source VARCHAR(50),
+                state VARCHAR(100),
+                property_type VARCHAR(100) DEFAULT '',
+                page_key INT DEFAULT 0,
+                error_class VARCHAR(100),
+                error_message TEXT,
+                attempts INT DEFAULT 1,
+                resolved BOOLEAN DEFAULT FALSE,
+                date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_attempt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                UNIQUE KEY uniq_failed_request (source, state, property_type, page_key)
+            )
+            """)
+        
+        # Create verification_cache table (SFR3 results keyed by normalized address)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS verification_cache (
+                address_key CHAR(16) PRIMARY KEY,
+                address TEXT,
+                outcome VARCHAR(50),
+                checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                expires_at DATETIME,
+                INDEX idx_verification_cache_expires (expires_at)
+            )
+            """)
+        
+        # Cache keys are the 16 hex digits of the 64-bit address key. Tables
+        # created with 40 character keys only hold entries no lookup matches.
+        cursor.execute("""
+            SELECT CHARACTER_MAXIMUM_LENGTH FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'verification_cache' AND COLUMN_NAME = 'address_key'
+            """)
+        row = cursor.fetchone()
+        if row and row[0] != 16:
+            cursor.execute("DELETE FROM verification_cache WHERE CHAR_LENGTH(address_key) <> 16")
+            cursor.execute("ALTER TABLE verification_cache MODIFY address_key CHAR(16)")
+            logger.info("Resized verification_cache address_key to CHAR(16)")
+        
+        # Create verification_outbox table (new listings waiting for the streaming verifier)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS verification_outbox (
+                id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                property_row_id INT NOT NULL,
                 date_added TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
             """)
         
+        # Add the checker's work lease and retry columns and the duplicate
+        # detection columns to tables created before they existed
+        added_columns = (
+            ("claimed_by", "VARCHAR(100) NULL"),
+            ("lease_until", "DATETIME NULL"),
+            ("attempt_count", "INT NOT NULL DEFAULT 0"),
+            ("next_attempt_at", "DATETIME NULL"),
+            ("address_key", "BIGINT UNSIGNED NULL"),
+            ("canonical_id", "INT NULL")
+        )
+        for column, definition in added_columns:
+            cursor.execute(f"SHOW COLUMNS FROM properties LIKE '{column}'")
+            if cursor.fetchone() is None:
+                cursor.execute(f"ALTER TABLE properties ADD COLUMN {column} {definition}")
+                logger.info(f"Added {column} column to properties table")
+        
+        cursor.execute("SHOW INDEX FROM properties WHERE Key_name = 'idx_properties_address_key'")
+        if not cursor.fetchall():
+            cursor.execute("CREATE INDEX idx_properties_address_key ON properties (address_key)")
+            logger.info("Added address_key index to properties table")
+        
         # Ensure bathrooms column is DOUBLE type
         try:
             cursor.execute("ALTER TABLE properties MODIFY bathrooms DOUBLE")
@@ -266,6 +352,212 @@ def property_exists(property_id, connection=None):
         if close_connection and connection and hasattr(connection, 'is_connected') and connection.is_connected():
             connection.close()
 
+def property_address_key(address):
+    """Return the address_key of a property address.
+    
+    Only addresses whose street starts with a house number are keyed. A
+    placeholder ("None, Columbus, OH 43215") or a bare street name ("Main St")
+    doesn't identify one house, so it gets NO_STREET_KEY and is never linked.
+    """
+    if not address:
+        return NO_STREET_KEY
+    canonical = address_normalizer.canonicalize(address)
+    return canonical.key if canonical.street[:1].isdigit() else NO_STREET_KEY
+
+def link_duplicate_properties(cursor, address_keys):
+    """Group properties that share one of address_keys under a canonical listing.
+    
+    The canonical listing of an address_key keeps canonical_id NULL and every
+    other row gets canonical_id set to its id. It is picked, in order, as:
+    a row SFR3 already answered (verified or NOT_INTERESTED), a row that
+    hasn't failed a local rule, a row with a square footage, the oldest row. A listing missing data therefore
+    doesn't hide a complete one of the same house, and when the canonical
+    listing fails a local rule, relinking the key promotes a duplicate into
+    the queue. Only canonical rows enter the verification queue and the
+    export, so the same house scraped from several sources is verified
+    once. The caller commits. Returns the number of rows whose canonical
+    listing changed.
+    """
+    keys = list({key for key in address_keys if key})
+    non_local = ', '.join(['%s'] * len(NON_LOCAL_FAILURE_REASONS))
+    linked = 0
+    batch_size = 1000
+    for i in range(0, len(keys), batch_size):
+        batch = keys[i:i+batch_size]
+        placeholders = ', '.join(['%s'] * len(batch))
+        cursor.execute(f"""
+            UPDATE properties p
+            JOIN (
+                SELECT id, IF(canonical_id = id, NULL, canonical_id) AS canonical_id
+                FROM (
+                    SELECT id, FIRST_VALUE(id) OVER (
+                        PARTITION BY address_key
+                        ORDER BY (is_verified OR COALESCE(failure_reason = 'NOT_INTERESTED', FALSE)) DESC,
+                            (failure_reason IS NOT NULL AND failure_reason NOT IN ({non_local})) ASC,
+                            COALESCE(square_footage, 0) > 0 DESC,
+                            id ASC
+                    ) AS canonical_id
+                    FROM properties
+                    WHERE address_key IN ({placeholders})
+                ) ranked
+            ) c ON p.id = c.id
+            SET p.canonical_id = c.canonical_id
+            WHERE NOT (p.canonical_id <=> c.canonical_id)
+            """, list(NON_LOCAL_FAILURE_REASONS) + batch)
+        linked += cursor.rowcount
+    return linked
+
+def relink_failed_canonicals():
+    """Relink addresses whose canonical listing failed a local rule but have duplicates.
+    
+    Run after the local rules, so a complete duplicate of a listing that
+    failed for missing data gets verified in its place. Returns the number
+    of rows whose canonical listing changed.
+    """
+    connection = get_db_connection()
+    if not connection:
+        logger.error("Cannot relink duplicates: No database connection")
+        return 0
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        non_local = ', '.join(['%s'] * len(NON_LOCAL_FAILURE_REASONS))
+        cursor.execute(f"""
+            SELECT DISTINCT c.address_key
+            FROM properties c
+            JOIN properties d ON d.canonical_id = c.id
+            WHERE c.canonical_id IS NULL AND c.is_verified = FALSE
+                AND c.failure_reason IS NOT NULL AND c.failure_reason NOT IN ({non_local})
+                AND (d.failure_reason IS NULL OR d.failure_reason IN ({non_local}))
+            """, list(NON_LOCAL_FAILURE_REASONS) * 2)
+        keys = [row[0] for row in cursor.fetchall()]
+        relinked = link_duplicate_properties(cursor, keys)
+        connection.commit()
+        if relinked:
+            logger.info(f"Promoted duplicates of {len(keys)} listings that failed a local rule")
+        return relinked
+        
+    except mysql.connector.Error as err:
+        logger.error(f"Error relinking duplicates: {err}")
+        connection.rollback()
+        return 0
+    finally:
+        if cursor:
+            cursor.close()
+
+def enqueue_for_verification(cursor, property_ids, first_row_id):
+    """Add just inserted properties to verification_outbox for the streaming verifier.
+    
+    property_ids are the ids sent in one INSERT IGNORE statement and
+    first_row_id is its cursor.lastrowid, the row id of the first row it
+    inserted. A multi-row INSERT gets a consecutive block of row ids, so
+    rows with an id below first_row_id or past the block already existed or
+    were inserted by another scraper, and are left out.
+    
+    Runs in the inserting transaction, so a listing is queued if and only if
+    its insert commits. Listings linked to a canonical listing are left out,
+    like they are from the checker's queue. The caller commits. Returns the
+    number of properties queued.
+    """
+    property_ids = [property_id for property_id in property_ids if property_id]
+    if not property_ids or not first_row_id:
+        return 0
+    last_row_id = first_row_id + len(property_ids) - 1
+    queued = 0
+    batch_size = 1000
+    for i in range(0, len(property_ids), batch_size):
+        batch = property_ids[i:i+batch_size]
+        placeholders = ', '.join(['%s'] * len(batch))
+        cursor.execute(f"""
+            INSERT INTO verification_outbox (property_row_id)
+            SELECT id FROM properties
+            WHERE property_id IN ({placeholders}) AND id BETWEEN %s AND %s
+                AND is_verified = FALSE AND failure_reason IS NULL AND canonical_id IS NULL
+            """, batch + [first_row_id, last_row_id])
+        queued += cursor.rowcount
+    return queued
+
+def prune_verification_outbox():
+    """Delete outbox entries of properties that no longer need verifying.
+    
+    Called after batch checker runs, which verify queued listings too, so
+    the outbox doesn't grow while no streaming verifier is running.
+    Returns the number of entries deleted.
+    """
+    connection = get_db_connection()
+    if not connection:
+        logger.error("Cannot prune verification outbox: No database connection")
+        return 0
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+            DELETE o FROM verification_outbox o
+            LEFT JOIN properties p ON p.id = o.property_row_id
+            WHERE p.id IS NULL OR p.is_verified = TRUE OR p.failure_reason IS NOT NULL OR p.canonical_id IS NOT NULL
+            """)
+        pruned = cursor.rowcount
+        connection.commit()
+        if pruned:
+            logger.info(f"Pruned {pruned} handled entries from the verification outbox")
+        return pruned
+        
+    except mysql.connector.Error as err:
+        logger.error(f"Error pruning verification outbox: {err}")
+        connection.rollback()
+        return 0
+    finally:
+        if cursor:
+            cursor.close()
+
+def backfill_address_keys(batch_size=1000):
+    """Set address_key on properties inserted before it existed and link their duplicates.
+    
+    Walks rows without an address_key in primary key order. Rows whose
+    address has no house number and street to key on get NO_STREET_KEY, so later runs skip
+    them. Returns the number of rows newly linked to a canonical listing.
+    """
+    connection = get_db_connection()
+    if not connection:
+        logger.error("Cannot backfill address keys: No database connection")
+        return 0
+    
+    cursor = None
+    linked = 0
+    last_id = 0
+    try:
+        cursor = connection.cursor()
+        while True:
+            cursor.execute("""
+                SELECT id, address FROM properties
+                WHERE address_key IS NULL AND id > %s
+                ORDER BY id
+                LIMIT %s
+                """, (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            
+            keyed = [(property_address_key(address), row_id) for row_id, address in rows]
+            cursor.executemany("UPDATE properties SET address_key = %s WHERE id = %s", keyed)
+            linked += link_duplicate_properties(cursor, [key for key, _ in keyed])
+            connection.commit()
+        
+        if linked:
+            logger.info(f"Backfilled address keys, linked {linked} duplicate properties")
+        return linked
+        
+    except mysql.connector.Error as err:
+        logger.error(f"Error backfilling address keys: {err}")
+        connection.rollback()
+        return linked
+    finally:
+        if cursor:
+            cursor.close()
+
 def insert_property(property_data, source):
     """Insert a new property into the database if it doesn't already exist."""
     # Format property data to match database schema
@@ -283,7 +575,8 @@ def insert_property(property_data, source):
         'after_repair_value': property_data.get('After Repair Value', 0),
         'url': property_data.get('URL', ''),
         'is_verified': False,
-        'source': source.split('-')[0] if '-' in source else source  # Simplify source name
+        'source': source.split('-')[0] if '-' in source else source,  # Simplify source name
+        'address_key': property_address_key(property_data.get('Address', ''))
     }
     
     # Skip if property_id is empty
@@ -308,14 +601,18 @@ def insert_property(property_data, source):
         insert_query = """
         INSERT IGNORE INTO properties
         (property_id, state, property_type, occupancy_status, address, zip_code, 
-        square_footage, bedrooms, bathrooms, year_built, after_repair_value, url, is_verified, source)
+        square_footage, bedrooms, bathrooms, year_built, after_repair_value, url, is_verified, source, address_key)
         VALUES
         (%(property_id)s, %(state)s, %(property_type)s, %(occupancy_status)s, %(address)s, %(zip_code)s,
-        %(square_footage)s, %(bedrooms)s, %(bathrooms)s, %(year_built)s, %(after_repair_value)s, %(url)s, %(is_verified)s, %(source)s)
+        %(square_footage)s, %(bedrooms)s, %(bathrooms)s, %(year_built)s, %(after_repair_value)s, %(url)s, %(is_verified)s, %(source)s, %(address_key)s)
         """
 
         
         cursor.execute(insert_query, formatted_data)
+        if cursor.rowcount:
+            row_id = cursor.lastrowid
+            link_duplicate_properties(cursor, [formatted_data['address_key']])
+            enqueue_for_verification(cursor, [formatted_data['property_id']], row_id)
         connection.commit()
         logger.info(f"Successfully inserted property {formatted_data['property_id']} from {formatted_data['source']}")
         return True
@@ -389,13 +686,16 @@ def batch_insert_properties(properties_list, source):
                 'after_repair_value': property_data.get('After Repair Value', 0),
                 'url': property_data.get('URL', ''),
                 'is_verified': False,
-                'source': simplified_source
+                'source': simplified_source,
+                'address_key': property_address_key(property_data.get('Address', ''))
             }
             
             insert_data.append(formatted_data)
         
         # Use bulk insert
         inserted_count = 0
+        duplicate_count = 0
+        queued_count = 0
         if insert_data:
             # Increase batch size to 1000 or even higher since these are small records
             batch_size = 1000
@@ -407,19 +707,27 @@ def batch_insert_properties(properties_list, source):
                 insert_query = """
                 INSERT IGNORE INTO properties
                 (property_id, state, property_type, occupancy_status, address, zip_code, 
-                square_footage, bedrooms, bathrooms, year_built, after_repair_value, url, is_verified, source)
+                square_footage, bedrooms, bathrooms, year_built, after_repair_value, url, is_verified, source, address_key)
                 VALUES
                 (%(property_id)s, %(state)s, %(property_type)s, %(occupancy_status)s, %(address)s, %(zip_code)s,
-                %(square_footage)s, %(bedrooms)s, %(bathrooms)s, %(year_built)s, %(after_repair_value)s, %(url)s, %(is_verified)s, %(source)s)
+                %(square_footage)s, %(bedrooms)s, %(bathrooms)s, %(year_built)s, %(after_repair_value)s, %(url)s, %(is_verified)s, %(source)s, %(address_key)s)
 """
 
                 
                 try:
-                    # Execute batch insert
+                    # Execute batch insert, sent as one multi-row INSERT
                     cursor.executemany(insert_query, batch)
                     batch_count = cursor.rowcount
+                    first_row_id = cursor.lastrowid
                     inserted_count += batch_count
                     
+                    # Link the new rows to listings of the same house from other sources
+                    duplicate_count += link_duplicate_properties(cursor, [row['address_key'] for row in batch])
+                    
+                    # Queue the rows this INSERT added for the streaming verifier
+                    if batch_count:
+                        queued_count += enqueue_for_verification(cursor, [row['property_id'] for row in batch], first_row_id)
+                    
                     # Commit each batch 
                     connection.commit()
                     logger.info(f"Committed batch of {batch_count} properties from {simplified_source}, total so far: {inserted_count}")
@@ -428,7 +736,10 @@ def batch_insert_properties(properties_list, source):
                     logger.error(f"Error in batch: {err}")
                     connection.rollback()
         
-        logger.info(f"Batch insert complete: {inserted_count} inserted, {skipped_count} skipped from {simplified_source}")
+        logger.info(f"Batch insert complete: {inserted_count} inserted ({duplicate_count} duplicates of other listings, {queued_count} queued for verification), {skipped_count} skipped from {simplified_source}")
+        progress_events.emit('inserted', inserted_count)
+        progress_events.emit('skipped', skipped_count)
+        progress_events.emit('duplicates', duplicate_count)
         return inserted_count, skipped_count
         
     except mysql.connector.Error as err:
@@ -469,6 +780,176 @@ def update_verification_status(property_id, is_verified=True):
             cursor.close()
         # Don't close the connection since we're using a singleton pattern
 
+def record_failed_request(source, state, property_type='', page_key=0, error_class=None, error_message=None):
+    """Record a scraper request that failed after all retries.
+    
+    page_key is the page number for Zillow (a negative tile code for a map
+    tile, see zillow_db.tile_page_key), the offset for Realtor and 0 for
+    Redfin's whole-state request. Recording the same page again bumps its
+    attempt count and marks it unresolved.
+    """
+    progress_events.emit('errors')
+    
+    # Scrapers call this from worker threads, so use a pooled connection
+    # rather than the shared global one
+    connection = get_new_connection_from_pool()
+    if not connection:
+        logger.error(f"Cannot record failed request for {source} {state} {property_type} {page_key}: No database connection")
+        return False
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        query = """
+        INSERT INTO failed_requests
+        (source, state, property_type, page_key, error_class, error_message)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            attempts = attempts + 1,
+            error_class = VALUES(error_class),
+            error_message = VALUES(error_message),
+            resolved = FALSE
+        """
+        cursor.execute(query, (source, state, property_type or '', page_key or 0, error_class, error_message))
+        connection.commit()
+        logger.info(f"Recorded failed request: {source} {state} {property_type} page/offset {page_key} ({error_class})")
+        return True
+        
+    except mysql.connector.Error as err:
+        logger.error(f"Error recording failed request: {err}")
+        connection.rollback()
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+        # Return the pooled connection
+        connection.close()
+
+def get_failed_requests(source=None, max_attempts=None, limit=None):
+    """Get unresolved failed requests from the ledger, oldest first."""
+    connection = get_db_connection()
+    if not connection:
+        logger.error("Cannot get failed requests: No database connection")
+        return []
+    
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        conditions = ["resolved = FALSE"]
+        params = []
+        if source:
+            conditions.append("source = %s")
+            params.append(source)
+        if max_attempts:
+            conditions.append("attempts < %s")
+            params.append(max_attempts)
+        
+        query = f"""
+        SELECT id, source, state, property_type, page_key, error_class, error_message, attempts
+        FROM failed_requests
+        WHERE {' AND '.join(conditions)}
+        ORDER BY last_attempt ASC
+        """
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        
+        cursor.execute(query, params)
+        return cursor.fetchall()
+        
+    except mysql.connector.Error as err:
+        logger.error(f"Error getting failed requests: {err}")
+        return []
+    finally:
+        if cursor:
+            cursor.close()
+        # Don't close the connection since we're using a singleton pattern
+
+def resolve_failed_request(request_id):
+    """Mark a failed request as recovered."""
+    connection = get_db_connection()
+    if not connection:
+        logger.error(f"Cannot resolve failed request {request_id}: No database connection")
+        return False
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        cursor.execute("UPDATE failed_requests SET resolved = TRUE WHERE id = %s", (request_id,))
+        connection.commit()
+        return cursor.rowcount > 0
+        
+    except mysql.connector.Error as err:
+        logger.error(f"Error resolving failed request {request_id}: {err}")
+        connection.rollback()
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+        # Don't close the connection since we're using a singleton pattern
+
+def get_cached_verification(address_key):
+    """Return (outcome, seconds_left) of an unexpired verification_cache entry, or None."""
+    # The checker looks addresses up from its worker threads, so use a pooled connection
+    connection = get_new_connection_from_pool()
+    if not connection:
+        logger.error(f"Cannot read verification cache for {address_key}: No database connection")
+        return None
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        query = """
+        SELECT outcome, TIMESTAMPDIFF(SECOND, NOW(), expires_at)
+        FROM verification_cache
+        WHERE address_key = %s AND expires_at > NOW()
+        """
+        cursor.execute(query, (address_key,))
+        row = cursor.fetchone()
+        return (row[0], row[1]) if row else None
+        
+    except mysql.connector.Error as err:
+        logger.error(f"Error reading verification cache: {err}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        # Return the pooled connection
+        connection.close()
+
+def save_cached_verification(address_key, address, outcome, ttl_seconds):
+    """Store an SFR3 outcome for a normalized address, valid for ttl_seconds."""
+    connection = get_new_connection_from_pool()
+    if not connection:
+        logger.error(f"Cannot write verification cache for {address_key}: No database connection")
+        return False
+    
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        query = """
+        INSERT INTO verification_cache (address_key, address, outcome, expires_at)
+        VALUES (%s, %s, %s, NOW() + INTERVAL %s SECOND)
+        ON DUPLICATE KEY UPDATE
+            address = VALUES(address),
+            outcome = VALUES(outcome),
+            expires_at = VALUES(expires_at)
+        """
+        cursor.execute(query, (address_key, address, outcome, int(ttl_seconds)))
+        connection.commit()
+        return True
+        
+    except mysql.connector.Error as err:
+        logger.error(f"Error writing verification cache: {err}")
+        connection.rollback()
+        return False
+    finally:
+        if cursor:
+            cursor.close()
+        # Return the pooled connection
+        connection.close()
+
 # Function for scrapers to call for table creation
 def create_tables():
     """
@@ -0,0 +1,33 @@
+import json
+
+# Use orjson when it's installed, it decodes large listing responses several times faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Name of the active decoder, useful for logging and benchmarks
+DECODER_NAME = "orjson" if orjson else "json"
+
+def loads(data):
+    """Decode JSON from str, bytes or a memoryview using the fastest available decoder."""
+    if orjson:
+        return orjson.loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+def decode_response(response, prefix=b""):
+    """Decode a requests response body straight from its bytes.
+
+    If prefix is given (e.g. Redfin's b"{}&&"), it is skipped through a
+    memoryview so the body isn't copied before decoding. Raises ValueError if
+    the body doesn't start with the prefix.
+    """
+    content = response.content
+    if not prefix:
+        return loads(content)
+
+    if not content.startswith(prefix):
+        raise ValueError(f"Response body does not start with {prefix!r}")
+    return loads(memoryview(content)[len(prefix):])
@@ -0,0 +1,202 @@
+import bisect
+import collections
+import threading
+import time
+
+# Constants
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)  # Histogram upper bounds in seconds
+THROUGHPUT_WINDOW = 60  # Seconds covered by the rolling rates
+
+# What each timing measures and where its time goes, for the time breakdown
+# and the Prometheus HELP lines. Timings not listed here count as "other".
+TIMINGS = {
+    'sfr3_request': ('api', 'SFR3 check-address request latency'),
+    'rate_limit_wait': ('sleep', 'Time waiting for a slot from the adaptive SFR3 rate limiter, including Retry-After pauses'),
+    'pacing_sleep': ('sleep', 'Configured delay between properties in the web checker'),
+    'circuit_open_wait': ('sleep', 'Time SFR3 checks waited while the circuit breaker had verification paused'),
+    'db_claim': ('db', 'Claiming a batch of properties to verify'),
+    'db_write': ('db', 'Writing a batch of verification results'),
+    'db_pre_verify': ('db', 'Set-based local rule UPDATEs before a run'),
+    'db_cache_lookup': ('db', 'Verification cache table lookups')
+}
+
+class Histogram:
+    """Latency histogram with fixed buckets, mergeable across processes.
+
+    counts[i] is the number of observations in (buckets[i-1], buckets[i]],
+    with a last slot for values above the largest bucket.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.sum += other.sum
+
+    def cumulative(self):
+        """Return [(upper bound, observations <= bound)], ending with +Inf."""
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + [float('inf')], self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket, like Prometheus does."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        lower = 0.0
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            if seen + count >= rank and count:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        # In the overflow bucket, the largest bound is the best estimate
+        return self.buckets[-1]
+
+    def to_dict(self):
+        mean = self.sum / self.count if self.count else None
+        return {
+            'count': self.count,
+            'sum_seconds': round(self.sum, 6),
+            'mean_seconds': round(mean, 6) if mean is not None else None,
+            'p50_seconds': _round(self.quantile(0.5)),
+            'p90_seconds': _round(self.quantile(0.9)),
+            'p99_seconds': _round(self.quantile(0.99)),
+            'buckets': {_format_bound(bound): count for bound, count in self.cumulative()}
+        }
+
+class RollingRate:
+    """Events per minute over the last THROUGHPUT_WINDOW seconds."""
+
+    def __init__(self, window=THROUGHPUT_WINDOW):
+        self.window = window
+        self.entries = collections.deque()
+        self.total = 0
+
+    def add(self, count, now=None):
+        if count:
+            self.entries.append((now or time.time(), count))
+            self.total += count
+
+    def per_minute(self, now=None, started=None):
+        now = now or time.time()
+        while self.entries and self.entries[0][0] < now - self.window:
+            self.total -= self.entries.popleft()[1]
+        # Early in a job, divide by the time it has actually been running
+        span = self.window if started is None else min(self.window, max(now - started, 1.0))
+        return self.total * 60.0 / span
+
+class JobMetrics:
+    """Timing histograms and rolling throughput of one job.
+
+    Fed with progress_events summaries by ProgressAggregator, read by the
+    metrics endpoints while the job runs.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.histograms = {}
+        self.progress_rate = RollingRate()
+        self.call_rates = {}
+
+    def apply(self, summary):
+        now = time.time()
+        with self.lock:
+            self.progress_rate.add(summary['progress'], now)
+            for name, histogram in summary.get('timings', {}).items():
+                if name not in self.histograms:
+                    self.histograms[name] = Histogram(histogram.buckets)
+                    self.call_rates[name] = RollingRate()
+                self.histograms[name].merge(histogram)
+                self.call_rates[name].add(histogram.count, now)
+
+    def time_breakdown(self):
+        """Seconds spent per category (api, sleep, db, other), summed over all threads."""
+        breakdown = {'api': 0.0, 'sleep': 0.0, 'db': 0.0, 'other': 0.0}
+        for name, histogram in self.histograms.items():
+            category = TIMINGS.get(name, ('other', ''))[0]
+            breakdown[category] += histogram.sum
+        return {category: round(seconds, 3) for category, seconds in breakdown.items()}
+
+    def snapshot(self, status):
+        """Return the metrics as a JSON-ready dict, with the job's status counters."""
+        now = time.time()
+        with self.lock:
+            return {
+                'running': bool(status.get('running')),
+                'elapsed_seconds': round(now - self.started, 1),
+                'progress': status.get('progress', 0),
+                'total': status.get('total', 0),
+                'eta_seconds': status.get('eta_seconds'),
+                'counters': {key[:-len('_count')]: value for key, value in status.items() if key.endswith('_count')},
+                'throughput': {
+                    'properties_per_minute': round(self.progress_rate.per_minute(now, self.started), 2),
+                    'calls_per_minute': {
+                        name: round(rate.per_minute(now, self.started), 2) for name, rate in self.call_rates.items()
+                    }
+                },
+                'time_breakdown_seconds': self.time_breakdown(),
+                'timings': {name: histogram.to_dict() for name, histogram in self.histograms.items()}
+            }
+
+    def prometheus(self, status, prefix):
+        """Return the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot(status)
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{labels} {_format_value(value)}")
+
+        metric('running', 'gauge', 'Whether the job is running', [('', int(snapshot['running']))])
+        metric('progress', 'gauge', 'Work units finished', [('', snapshot['progress'])])
+        metric('total', 'gauge', 'Work units in the job', [('', snapshot['total'] or 0)])
+        if snapshot['eta_seconds'] is not None:
+            metric('eta_seconds', 'gauge', 'Estimated seconds until the job finishes', [('', snapshot['eta_seconds'])])
+        metric('results_total', 'counter', 'Results by counter',
+               [(f'{{counter="{counter}"}}', value) for counter, value in sorted(snapshot['counters'].items())])
+        metric('throughput_per_minute', 'gauge', f'Work units finished per minute over the last {THROUGHPUT_WINDOW}s',
+               [('', snapshot['throughput']['properties_per_minute'])])
+        metric('time_seconds_total', 'counter', 'Seconds spent per category, summed over threads',
+               [(f'{{category="{category}"}}', seconds) for category, seconds in snapshot['time_breakdown_seconds'].items()])
+
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            for name, histogram in histograms:
+                help_text = TIMINGS.get(name, ('other', name))[1]
+                samples = [(f'_bucket{{le="{_format_bound(bound)}"}}', count) for bound, count in histogram.cumulative()]
+                samples.append(('_sum', histogram.sum))
+                samples.append(('_count', histogram.count))
+                lines.append(f"# HELP {prefix}_{name}_seconds {help_text}")
+                lines.append(f"# TYPE {prefix}_{name}_seconds histogram")
+                for suffix, value in samples:
+                    lines.append(f"{prefix}_{name}_seconds{suffix} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+def _round(value):
+    return round(value, 6) if value is not None else None
+
+def _format_bound(bound):
+    return "+Inf" if bound == float('inf') else repr(float(bound))
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,147 @@
+import collections
+import contextlib
+import time
+import metrics
+
+# A single progress event. kind is one of:
+#   'total'    - value is the number of work units in the job
+#   'progress' - count work units finished
+#   'message'  - value is a human readable status line
+#   'timing'   - value is (name, seconds), see metrics.TIMINGS for the names
+#   anything else is a named counter (e.g. 'pages', 'inserted', 'verified')
+#   incremented by count
+ProgressEvent = collections.namedtuple('ProgressEvent', ['kind', 'count', 'value', 'timestamp'])
+
+# Where events go. None (the default, e.g. for command line runs) drops them.
+_sink = None
+
+def set_sink(sink):
+    """Install a callable that receives every ProgressEvent, or None to drop events."""
+    global _sink
+    _sink = sink
+
+def emit(kind, count=1, value=None):
+    """Emit a progress event. Cheap no-op when no sink is installed."""
+    sink = _sink
+    if sink is not None:
+        sink(ProgressEvent(kind, count, value, time.time()))
+
+def set_total(total):
+    """Report the number of work units in the current job."""
+    emit('total', 0, total)
+
+def advance(count=1):
+    """Report finished work units."""
+    emit('progress', count)
+
+def message(text):
+    """Report a human readable status line."""
+    emit('message', 0, text)
+
+def timing(name, seconds):
+    """Report how long one operation took."""
+    emit('timing', 0, (name, seconds))
+
+@contextlib.contextmanager
+def timed(name):
+    """Report the duration of a with block as a timing, even if it raises."""
+    if _sink is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing(name, time.perf_counter() - start)
+
+def summarize(events):
+    """Aggregate a sequence of events into one summary dict.
+
+    Counters and progress are summed, total and message keep the most
+    recent value and timings are collected into a metrics.Histogram per
+    name. The summary is what crosses the process boundary, so one message
+    is sent per flush instead of one per event.
+    """
+    summary = {'progress': 0, 'total': None, 'message': None, 'counters': {}, 'timings': {}}
+    counters = summary['counters']
+    timings = summary['timings']
+    for event in events:
+        if event.kind == 'progress':
+            summary['progress'] += event.count
+        elif event.kind == 'total':
+            summary['total'] = event.value
+        elif event.kind == 'message':
+            summary['message'] = event.value
+        elif event.kind == 'timing':
+            name, seconds = event.value
+            if name not in timings:
+                timings[name] = metrics.Histogram()
+            timings[name].observe(seconds)
+        else:
+            counters[event.kind] = counters.get(event.kind, 0) + event.count
+    return summary
+
+class EventBuffer:
+    """Sink that collects events from any number of threads.
+
+    Emitting threads only append to a deque, which is atomic in CPython, so
+    they never wait on a lock. A consumer periodically calls drain() to take
+    everything collected so far as one aggregated summary.
+    """
+
+    def __init__(self):
+        self._events = collections.deque()
+
+    def __call__(self, event):
+        self._events.append(event)
+
+    def drain(self):
+        """Remove all buffered events and return their summary, or None if there were none."""
+        events = []
+        try:
+            while True:
+                events.append(self._events.popleft())
+        except IndexError:
+            pass
+        return summarize(events) if events else None
+
+class ProgressAggregator:
+    """Applies event summaries to a job's status dict.
+
+    Maintains 'progress', 'total', 'message', a '<counter>_count' key per
+    counter, and 'eta_seconds' estimated from the rate of progress so far.
+    Timings and throughput go to a metrics.JobMetrics.
+    """
+
+    def __init__(self, status, counters=()):
+        self.status = status
+        self.counters = counters
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.metrics = metrics.JobMetrics()
+        self.status['progress'] = 0
+        self.status['eta_seconds'] = None
+        for counter in self.counters:
+            self.status[f'{counter}_count'] = 0
+
+    def apply(self, summary):
+        self.metrics.apply(summary)
+        status = self.status
+        if summary['total'] is not None:
+            status['total'] = summary['total']
+        if summary['progress']:
+            status['progress'] = status.get('progress', 0) + summary['progress']
+        if summary['message'] is not None:
+            status['message'] = summary['message']
+        for counter, count in summary['counters'].items():
+            key = f'{counter}_count'
+            status[key] = status.get(key, 0) + count
+
+        # Estimate time remaining from the average rate so far
+        progress = status.get('progress', 0)
+        total = status.get('total') or 0
+        elapsed = time.time() - self.started
+        if progress and total and elapsed > 0:
+            status['eta_seconds'] = round(max(total - progress, 0) * elapsed / progress, 1)
@@ -7,6 +7,8 @@ import queue
 import random
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import db_connector
+import progress_events
+import json_decoder
 
 # Constants
 BASE_URL = "https://www.realtor.com/frontdoor/graphql"
@@ -15,6 +17,9 @@ MAX_OFFSET = 10000
 MAX_WORKERS = 5  # Max number of threads
 EXISTING_THRESHOLD = 1000  # If we find this many existing properties, stop scraping
 SOURCE_NAME = "realtor"  # Source name for database records
+ALIAS_BATCH_SIZE = 5  # Number of offsets requested per HTTP call in alias batching mode
+USE_ALIAS_BATCHING = True  # Combine several offsets into one aliased GraphQL request
+PAYLOAD_PROFILE = "minimal"  # "minimal" requests only consumed fields, "full" is the original selection
 
 # List of states to process
 STATES = [
@@ -34,6 +39,10 @@ all_properties = []
 # Set to track property IDs we've already seen
 existing_property_ids = set()
 
+# Switched off for the rest of the run if the server rejects an aliased query
+alias_batching_supported = True
+alias_batching_lock = threading.Lock()
+
 # Headers
 headers = {
     "Content-Type": "application/json",
@@ -46,19 +55,10 @@ headers = {
     "rdc-client-version": "3.x.x"
 }
 
-# GraphQL query string
-graphql_query = """query ConsumerSearchQuery($query: HomeSearchCriteria!, $limit: Int, $offset: Int, $search_promotion: SearchPromotionInput, $sort: [SearchAPISort], $sort_type: SearchSortType, $client_data: JSON, $bucket: SearchAPIBucket, $mortgage_params: MortgageParamsInput) {
-  home_search: home_search(
-    query: $query
-    sort: $sort
-    limit: $limit
-    offset: $offset
-    sort_type: $sort_type
-    client_data: $client_data
-    bucket: $bucket
-    search_promotion: $search_promotion
-    mortgage_params: $mortgage_params
-  ) {
+# Fields requested for each home_search result set, per payload profile.
+# "minimal" only asks for what transform_property_data and get_total_count read.
+home_search_selections = {
+    "full": """{
     count
     total
     properties: results {
@@ -82,9 +82,52 @@ graphql_query = """query ConsumerSearchQuery($query: HomeSearchCriteria!, $limit
         }
       }
     }
-  }
+  }""",
+    "minimal": """{
+    total
+    properties: results {
+      property_id
+      list_price
+      permalink
+      description {
+        beds
+        baths_consolidated
+        sqft
+        type
+        year_built
+      }
+      location {
+        address {
+          line
+          city
+          state_code
+          postal_code
+        }
+      }
+    }
+  }"""
+}
+
+# Function to build the GraphQL query string for a payload profile
+def build_graphql_query(profile=None):
+    selection = home_search_selections[profile or PAYLOAD_PROFILE]
+    return """query ConsumerSearchQuery($query: HomeSearchCriteria!, $limit: Int, $offset: Int, $search_promotion: SearchPromotionInput, $sort: [SearchAPISort], $sort_type: SearchSortType, $client_data: JSON, $bucket: SearchAPIBucket, $mortgage_params: MortgageParamsInput) {
+  home_search: home_search(
+    query: $query
+    sort: $sort
+    limit: $limit
+    offset: $offset
+    sort_type: $sort_type
+    client_data: $client_data
+    bucket: $bucket
+    search_promotion: $search_promotion
+    mortgage_params: $mortgage_params
+  ) """ + selection + """
 }"""
 
+# GraphQL query string
+graphql_query = build_graphql_query()
+
 # Load existing properties if the file exists
 def load_existing_properties():
     global all_properties, existing_property_ids
@@ -96,7 +139,7 @@ def load_existing_properties():
     print(f"✅ Initialized empty property tracking")
 
 # Function to create base payload for a specific state and property type
-def create_payload(state, property_type):
+def create_payload(state, property_type, profile=None):
     return {
         "operationName": "ConsumerSearchQuery",
         "variables": {
@@ -118,9 +161,42 @@ def create_payload(state, property_type):
                 {"field": "photo_count", "direction": "desc"}
             ]
         },
-        "query": graphql_query
+        "query": build_graphql_query(profile) if profile else graphql_query
     }
 
+# Function to build one GraphQL request covering several offsets via aliased home_search fields
+def create_batched_payload(state, property_type, offsets, profile=None):
+    payload = create_payload(state, property_type, profile)
+    selection = home_search_selections[profile or PAYLOAD_PROFILE]
+    
+    # Offsets are inlined per alias, so $offset is no longer a declared variable
+    del payload["variables"]["offset"]
+    
+    aliased_fields = []
+    for offset in offsets:
+        aliased_fields.append(f"""  {offset_alias(offset)}: home_search(
+    query: $query
+    sort: $sort
+    limit: $limit
+    offset: {int(offset)}
+    sort_type: $sort_type
+    client_data: $client_data
+    bucket: $bucket
+    search_promotion: $search_promotion
+    mortgage_params: $mortgage_params
+  ) """ + selection)
+    
+    payload["query"] = (
+        "query ConsumerSearchQuery($query: HomeSearchCriteria!, $limit: Int, $search_promotion: SearchPromotionInput, "
+        "$sort: [SearchAPISort], $sort_type: SearchSortType, $client_data: JSON, $bucket: SearchAPIBucket, "
+        "$mortgage_params: MortgageParamsInput) {\n" + "\n".join(aliased_fields) + "\n}"
+    )
+    return payload
+
+# Alias name used for a given offset in a batched query
+def offset_alias(offset):
+    return f"offset_{int(offset)}"
+
 # Function to map property types to formatted types
 def format_property_type(prop_type):
     mapping = {
@@ -178,6 +254,27 @@ def transform_property_data(property_data, full_state_name):
         print(f"❌ Error transforming property data: {str(e)}")
         return None
 
+# Function to transform a page of raw results, skipping properties we've already seen
+def transform_search_results(properties, state):
+    transformed_properties = []
+    existing_count = 0
+    
+    for prop in properties:
+        property_id = prop.get("property_id", "")
+        
+        # Check if we've already seen this property
+        if property_id in existing_property_ids:
+            existing_count += 1
+            continue
+        
+        # Transform and add the new property
+        transformed = transform_property_data(prop, state)
+        if transformed:
+            transformed_properties.append(transformed)
+            existing_property_ids.add(property_id)  # Mark as seen
+    
+    return transformed_properties, existing_count
+
 # Function to fetch properties for a specific state, property type, and offset
 def fetch_properties(state, property_type, offset):
     property_key = f"{state}_{property_type}_offset_{offset}"
@@ -192,49 +289,113 @@ def fetch_properties(state, property_type, offset):
     
     # Send request with retry logic
     max_retries = 3
+    error_class, error_message = None, None
     for attempt in range(max_retries):
         try:
             print(f"➡️ Fetching {state} {property_type} offset {offset} to {offset + LIMIT}... (Attempt {attempt+1})")
             resp = requests.post(BASE_URL, headers=headers, json=payload, timeout=30)
             
             if resp.status_code == 200:
-                data = resp.json()
+                data = json_decoder.decode_response(resp)
                 properties = data["data"]["home_search"]["properties"]
                 
                 # Transform properties
-                transformed_properties = []
-                existing_count = 0
-                new_count = 0
-                
-                for prop in properties:
-                    property_id = prop.get("property_id", "")
-                    
-                    # Check if we've already seen this property
-                    if property_id in existing_property_ids:
-                        existing_count += 1
-                        continue
-                    
-                    # Transform and add the new property
-                    transformed = transform_property_data(prop, state)
-                    if transformed:
-                        transformed_properties.append(transformed)
-                        existing_property_ids.add(property_id)  # Mark as seen
-                        new_count += 1
+                transformed_properties, existing_count = transform_search_results(properties, state)
                 
-                print(f"💾 Retrieved {new_count} new and skipped {existing_count} existing {property_type} properties for {state} at offset {offset}")
+                print(f"💾 Retrieved {len(transformed_properties)} new and skipped {existing_count} existing {property_type} properties for {state} at offset {offset}")
+                progress_events.emit('pages')
                 
                 # Return both the transformed properties and the count of existing ones we found
                 return transformed_properties, existing_count, 0
             else:
                 print(f"⚠️ Failed at {state} {property_type} offset {offset}: HTTP {resp.status_code}")
+                error_class, error_message = f"HTTP_{resp.status_code}", resp.text[:500]
                 time.sleep(2 * (attempt + 1))  # Exponential backoff
         except Exception as e:
             print(f"❌ Error at {state} {property_type} offset {offset}: {str(e)}")
+            error_class, error_message = type(e).__name__, str(e)
             time.sleep(2 * (attempt + 1))  # Exponential backoff
     
     print(f"❌ All attempts failed for {state} {property_type} offset {offset}")
+    db_connector.record_failed_request(SOURCE_NAME, state, property_type, offset, error_class, error_message)
     return [], 0, 1
 
+# Function to fetch several offsets with a single aliased GraphQL request
+# Returns a dict of offset -> (properties, existing_count, failed_count), or None
+# if the server rejected the aliased query and the caller should fall back.
+def fetch_properties_batched(state, property_type, offsets):
+    global alias_batching_supported
+    
+    # Add random sleep between requests (2-4 seconds), once for the whole batch
+    sleep_time = random.uniform(2, 4)
+    time.sleep(sleep_time)
+    
+    payload = create_batched_payload(state, property_type, offsets)
+    offset_range = f"offsets {offsets[0]} to {offsets[-1] + LIMIT}"
+    
+    max_retries = 3
+    error_class, error_message = None, None
+    for attempt in range(max_retries):
+        try:
+            print(f"➡️ Fetching {state} {property_type} {offset_range} in one request... (Attempt {attempt+1})")
+            resp = requests.post(BASE_URL, headers=headers, json=payload, timeout=60)
+            
+            # A 400 or a GraphQL error without data means the server won't accept aliases
+            if resp.status_code == 400:
+                print(f"⚠️ Aliased query rejected for {state} {property_type}: HTTP 400, falling back to single offsets")
+                with alias_batching_lock:
+                    alias_batching_supported = False
+                return None
+            
+            if resp.status_code == 200:
+                data = json_decoder.decode_response(resp)
+                result_data = data.get("data") or {}
+                if data.get("errors") and not any(result_data.get(offset_alias(o)) for o in offsets):
+                    print(f"⚠️ Aliased query rejected for {state} {property_type}: {data['errors'][0].get('message', 'GraphQL error')}, falling back to single offsets")
+                    with alias_batching_lock:
+                        alias_batching_supported = False
+                    return None
+                
+                # Split the combined response back into per-offset batches
+                results = {}
+                for offset in offsets:
+                    search = result_data.get(offset_alias(offset))
+                    if not search:
+                        print(f"⚠️ Missing results for {state} {property_type} offset {offset} in batched response")
+                        db_connector.record_failed_request(SOURCE_NAME, state, property_type, offset, "MISSING_ALIAS", None)
+                        results[offset] = ([], 0, 1)
+                        continue
+                    
+                    transformed_properties, existing_count = transform_search_results(search.get("properties") or [], state)
+                    print(f"💾 Retrieved {len(transformed_properties)} new and skipped {existing_count} existing {property_type} properties for {state} at offset {offset}")
+                    results[offset] = (transformed_properties, existing_count, 0)
+                    progress_events.emit('pages')
+                
+                return results
+            else:
+                print(f"⚠️ Failed at {state} {property_type} {offset_range}: HTTP {resp.status_code}")
+                error_class, error_message = f"HTTP_{resp.status_code}", resp.text[:500]
+                time.sleep(2 * (attempt + 1))  # Exponential backoff
+        except Exception as e:
+            print(f"❌ Error at {state} {property_type} {offset_range}: {str(e)}")
+            error_class, error_message = type(e).__name__, str(e)
+            time.sleep(2 * (attempt + 1))  # Exponential backoff
+    
+    print(f"❌ All attempts failed for {state} {property_type} {offset_range}")
+    for offset in offsets:
+        db_connector.record_failed_request(SOURCE_NAME, state, property_type, offset, error_class, error_message)
+    return {offset: ([], 0, 1) for offset in offsets}
+
+# Function to fetch a group of offsets, batched into one request when the server allows it
+def fetch_offset_group(state, property_type, offsets):
+    if USE_ALIAS_BATCHING and alias_batching_supported and len(offsets) > 1:
+        results = fetch_properties_batched(state, property_type, offsets)
+        if results is not None:
+            return [results[offset] for offset in offsets]
+    
+    # Fall back to one request per offset
+    return [fetch_properties(state, property_type, offset) for offset in offsets]
+
 # Function to get total count for a state and property type
 def get_total_count(state, property_type):
     payload = create_payload(state, property_type)
@@ -244,9 +405,10 @@ def get_total_count(state, property_type):
         response = requests.post(BASE_URL, headers=headers, json=payload, timeout=30)
         
         if response.status_code == 200:
-            data = response.json()
+            data = json_decoder.decode_response(response)
             total = data["data"]["home_search"]["total"]
             total_pages = (total + LIMIT - 1) // LIMIT  # Calculate total pages
+            progress_events.emit('pages')
             
             # Transform first batch of properties
             properties = data["data"]["home_search"]["properties"]
@@ -318,11 +480,13 @@ def process_state_and_property_type(state, property_type):
         
         # Process offsets in smaller batches
         if offsets:
-            # Process in smaller batches based on thread count
-            batch_size = MAX_WORKERS
             should_break = False  # Flag to track if we need to break out of the main loop
             processed_offsets = 0
             
+            # Each worker handles a group of offsets (several per request when alias batching is on)
+            group_size = ALIAS_BATCH_SIZE if USE_ALIAS_BATCHING and alias_batching_supported else 1
+            batch_size = MAX_WORKERS * group_size
+            
             for i in range(0, len(offsets), batch_size):
                 # Check again if threshold reached before starting a new batch
                 if total_existing_count >= EXISTING_THRESHOLD:
@@ -331,45 +495,47 @@ def process_state_and_property_type(state, property_type):
                 
                 # Process the next batch of offsets
                 batch_offsets = offsets[i:i+batch_size]
+                offset_groups = [batch_offsets[j:j+group_size] for j in range(0, len(batch_offsets), group_size)]
                 
                 with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
                     # Submit tasks for this batch
-                    future_to_offset = {executor.submit(fetch_properties, state, property_type, offset): offset for offset in batch_offsets}
+                    future_to_offsets = {executor.submit(fetch_offset_group, state, property_type, group): group for group in offset_groups}
                     
                     # Process results as they complete
-                    for future in as_completed(future_to_offset):
+                    for future in as_completed(future_to_offsets):
                         # Skip if we should already be breaking
                         if should_break:
                             continue
-                            
-                        # Get the properties and stats from this batch
-                        properties, batch_existing, batch_failed = future.result()
                         
-                        # Update total existing count
-                        total_existing_count += batch_existing
+                        for properties, batch_existing, batch_failed in future.result():
+                            # Update total existing count
+                            total_existing_count += batch_existing
+                            
+                            # Check if we found too many existing properties
+                            if total_existing_count >= EXISTING_THRESHOLD:
+                                print(f"⚠️ Found {total_existing_count} existing properties for {state} {property_type}, stopping early")
+                                should_break = True
+                                # Cancel any remaining futures
+                                for f in future_to_offsets:
+                                    if not f.done():
+                                        f.cancel()
+                                break
+                            
+                            # Add valid properties to our list
+                            if properties:
+                                # Add to database in batches
+                                batch_inserted, batch_skipped = db_connector.batch_insert_properties(properties, SOURCE_NAME)
+                                inserted_count += batch_inserted
+                                skipped_count += batch_skipped
+                                # Update existing count with newly skipped items
+                                total_existing_count += batch_skipped
+                            
+                            # Update progress
+                            processed_offsets += 1
+                            print(f"📈 Progress: {processed_offsets}/{len(offsets)} offsets processed, {inserted_count} properties inserted")
                         
-                        # Check if we found too many existing properties
-                        if total_existing_count >= EXISTING_THRESHOLD:
-                            print(f"⚠️ Found {total_existing_count} existing properties for {state} {property_type}, stopping early")
-                            should_break = True
-                            # Cancel any remaining futures
-                            for f in future_to_offset:
-                                if not f.done():
-                                    f.cancel()
+                        if should_break:
                             break
-                        
-                        # Add valid properties to our list
-                        if properties:
-                            # Add to database in batches
-                            batch_inserted, batch_skipped = db_connector.batch_insert_properties(properties, SOURCE_NAME)
-                            inserted_count += batch_inserted
-                            skipped_count += batch_skipped
-                            # Update existing count with newly skipped items
-                            total_existing_count += batch_skipped
-                        
-                        # Update progress
-                        processed_offsets += 1
-                        print(f"📈 Progress: {processed_offsets}/{len(offsets)} offsets processed, {inserted_count} properties inserted")
                 
                 # Break out of the main loop if needed
                 if should_break or total_existing_count >= EXISTING_THRESHOLD:
@@ -401,6 +567,7 @@ def main(states=None):
     # Use provided states or all states if None
     states_to_process = states if states else STATES
     print(f"📋 Will process {len(states_to_process)} states: {', '.join(states_to_process)}")
+    progress_events.set_total(len(states_to_process) * len(PROPERTY_TYPES))
 
     # Process each state sequentially
     for state in states_to_process:
@@ -413,7 +580,9 @@ def main(states=None):
         # Process each property type for this state
         for property_type in PROPERTY_TYPES:
             print(f"Processing {state} - {property_type} ({states_to_process.index(state) + 1} of {len(states_to_process)})")
+            progress_events.message(f"Processing {state} {property_type} ({states_to_process.index(state) + 1} of {len(states_to_process)} states)")
             process_state_and_property_type(state, property_type)
+            progress_events.advance()
         
         print(f"✅ Completed processing for state: {state}")
         
@@ -5,9 +5,21 @@ import random
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import db_connector
+import progress_events
+import json_decoder
 
 # Constants
 SOURCE_NAME = "redfin"  # Source name for database records
+PAYLOAD_PROFILE = "full"  # Request parameters to use, see PAYLOAD_PROFILES
+
+# Extra gis parameters per payload profile. The gis endpoint has no field
+# selection, so "minimal" only stops it from padding results with nearby homes.
+# Those homes can be real listings just outside the region, so "minimal"
+# changes coverage and is opt-in.
+PAYLOAD_PROFILES = {
+    "full": {"include_nearby_homes": "true"},
+    "minimal": {"include_nearby_homes": "false"}
+}
 
 # Dictionary of states with their market and region_id
 states_config = {
@@ -29,6 +41,9 @@ states_config = {
 # Redfin API endpoint
 url = "https://www.redfin.com/stingray/api/gis"
 
+# Prefix Redfin puts in front of its JSON responses
+JSON_PREFIX = b"{}&&"
+
 # Headers to simulate a browser
 headers = {
     "User-Agent": "Mozilla/5.0",
@@ -41,16 +56,10 @@ def load_existing_properties():
     # Since we're not loading from a file anymore, just return an empty list
     return []
 
-def fetch_state_data(state, config):
-    print(f"🔍 Scraping: {state}")
-    
-    # Add random sleep between states (2-4 seconds)
-    sleep_time = random.uniform(2, 4)
-    time.sleep(sleep_time)
-    
+def create_params(config, profile=None):
+    """Build the gis query parameters for a state's region."""
     params = {
         "al": 1,
-        "include_nearby_homes": "true",
         "max_price": 350000,
         "min_listing_approx_size": 750,
         "min_price": 60000,
@@ -69,62 +78,114 @@ def fetch_state_data(state, config):
         "uipt": "1,4",
         "v": 8
     }
+    params.update(PAYLOAD_PROFILES[profile or PAYLOAD_PROFILE])
+    return params
 
+def fetch_state_response(state, config):
+    """Fetch the raw gis response body for a state.
+    
+    Returns the response bytes (still carrying the {}&& prefix), or None if
+    every attempt failed (the failure is recorded in the failed request ledger).
+    """
+    params = create_params(config)
+
+    # Maximum retries
+    max_retries = 3
+    error_class, error_message = None, None
+    for attempt in range(max_retries):
+        try:
+            print(f"➡️ Fetching {state} data (Attempt {attempt+1})")
+            response = requests.get(url, headers=headers, params=params, timeout=30)
+            
+            if response.status_code == 200 and response.content.startswith(JSON_PREFIX):
+                progress_events.emit('pages')
+                return response.content
+            else:
+                print(f"⚠️ Failed at {state}: HTTP {response.status_code}")
+                error_class, error_message = f"HTTP_{response.status_code}", response.text[:500]
+                time.sleep(3 * (attempt + 1))  # Exponential backoff
+        except Exception as e:
+            print(f"❌ Error at {state}: {str(e)}")
+            error_class, error_message = type(e).__name__, str(e)
+            time.sleep(3 * (attempt + 1))  # Exponential backoff
+    
+    print(f"❌ All attempts failed for {state}")
+    db_connector.record_failed_request(SOURCE_NAME, state, '', 0, error_class, error_message)
+    return None
+
+def parse_state_homes(content, state):
+    """Decode a gis response body and parse each home into a property dict."""
+    data = json_decoder.loads(memoryview(content)[len(JSON_PREFIX):])
+    homes = data.get("payload", {}).get("homes", [])
+    
     state_data = []
+    for home in homes:
+        property_type_raw = home.get("propertyType", -1)
+        formatted_type = "Single_Family" if property_type_raw == 6 else "Multi_Family"
+
+        parsed = {
+            "property_id": home.get("propertyId", ""),
+            "State": state,
+            "Formatted Property Type": formatted_type,
+            "Occupied/Vacant": "Unknown",  # Not provided
+            "Address": f"{home.get('streetLine', {}).get('value', '')}, {home.get('city', '')}, {home.get('state', '')} {home.get('zip', '')}",
+            "Zip Code": home.get("zip", ""),
+            "Square Footage": home.get("sqFt", {}).get("value", 0),
+            "Rooms (Beds)": home.get("beds", 0),
+            "Bathrooms": home.get("baths", 0),
+            "Year Built": home.get("yearBuilt", {}).get("value", 0),
+            "After Repair Value": home.get("price", {}).get("value", 0),
+            "URL": f"https://www.redfin.com{home.get('url', '')}"
+        }
+
+        state_data.append(parsed)
+    
+    return state_data
+
+def save_state_response(content, state):
+    """Parse a gis response body and insert its homes.
+    
+    Returns (property_count, inserted, skipped).
+    """
+    state_data = parse_state_homes(content, state)
+    print(f"💾 Retrieved {len(state_data)} properties for {state}")
+    if not state_data:
+        return 0, 0, 0
+    
+    print(f"🗄️ Inserting {len(state_data)} properties from {state} into database...")
+    inserted, skipped = db_connector.batch_insert_properties(state_data, f"{SOURCE_NAME}")
+    print(f"✅ Database insertion complete: {inserted} inserted, {skipped} skipped")
+    return len(state_data), inserted, skipped
 
+def fetch_state_data(state, config):
+    """Fetch a state's gis response body, returns None if it failed.
+    
+    Nothing is inserted here. States are fetched on worker threads and the
+    database connection is shared, so main() saves the responses itself.
+    """
+    print(f"🔍 Scraping: {state}")
+    progress_events.message(f"Scraping {state}")
+    
+    # Add random sleep between states (2-4 seconds)
+    sleep_time = random.uniform(2, 4)
+    time.sleep(sleep_time)
+    
     try:
-        # Maximum retries
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                print(f"➡️ Fetching {state} data (Attempt {attempt+1})")
-                response = requests.get(url, headers=headers, params=params, timeout=30)
-                
-                if response.status_code == 200 and response.text.startswith("{}&&"):
-                    data = json.loads(response.text[4:])
-                    homes = data.get("payload", {}).get("homes", [])
-                    
-                    print(f"💾 Retrieved {len(homes)} properties for {state}")
-                    
-                    for home in homes:
-                        property_type_raw = home.get("propertyType", -1)
-                        formatted_type = "Single_Family" if property_type_raw == 6 else "Multi_Family"
-
-                        parsed = {
-                            "property_id": home.get("propertyId", ""),
-                            "State": state,
-                            "Formatted Property Type": formatted_type,
-                            "Occupied/Vacant": "Unknown",  # Not provided
-                            "Address": f"{home.get('streetLine', {}).get('value', '')}, {home.get('city', '')}, {home.get('state', '')} {home.get('zip', '')}",
-                            "Zip Code": home.get("zip", ""),
-                            "Square Footage": home.get("sqFt", {}).get("value", 0),
-                            "Rooms (Beds)": home.get("beds", 0),
-                            "Bathrooms": home.get("baths", 0),
-                            "Year Built": home.get("yearBuilt", {}).get("value", 0),
-                            "After Repair Value": home.get("price", {}).get("value", 0),
-                            "URL": f"https://www.redfin.com{home.get('url', '')}"
-                        }
-
-                        state_data.append(parsed)
-                    
-                    break  # Success, break the retry loop
-                else:
-                    print(f"⚠️ Failed at {state}: HTTP {response.status_code}")
-                    time.sleep(3 * (attempt + 1))  # Exponential backoff
-            except Exception as e:
-                print(f"❌ Error at {state}: {str(e)}")
-                time.sleep(3 * (attempt + 1))  # Exponential backoff
-        
-        # If state_data contains properties, save to database
-        if state_data:
-            print(f"🗄️ Inserting {len(state_data)} properties from {state} into database...")
-            inserted, skipped = db_connector.batch_insert_properties(state_data, f"{SOURCE_NAME}")
-            print(f"✅ Database insertion complete: {inserted} inserted, {skipped} skipped")
-        
+        return fetch_state_response(state, config)
     except Exception as e:
-        print(f"⚠️ Failed to process {state}: {e}")
+        print(f"⚠️ Failed to fetch {state}: {e}")
+        return None
 
-    return state_data
+def save_state_data(state, content):
+    """Insert the homes of a state's response, returning how many were retrieved."""
+    if content is None:
+        return 0
+    try:
+        property_count, _, _ = save_state_response(content, state)
+        return property_count
+    except Exception as e:
+        print(f"⚠️ Failed to save {state}: {e}")
+        return 0
 
 def main(states=None):
     print("🚀 Starting Redfin data scraper with database support")
@@ -137,8 +198,8 @@ def main(states=None):
         print(f"❌ Database setup failed: {e}")
         return
     
-    # Initialize empty list for tracking
-    all_homes_data = []
+    # Track the number of homes retrieved
+    total_homes = 0
     
     # Use provided states or all states if None
     states_to_process = {}
@@ -154,18 +215,21 @@ def main(states=None):
         states_to_process = states_config
     
     print(f"📋 Will process {len(states_to_process)} states: {', '.join(states_to_process.keys())}")
+    progress_events.set_total(len(states_to_process))
     
     # Process states in a thread pool
     with ThreadPoolExecutor(max_workers=min(2, len(states_to_process))) as executor:
-        futures = [executor.submit(fetch_state_data, state, config) for state, config in states_to_process.items()]
+        future_states = {executor.submit(fetch_state_data, state, config): state for state, config in states_to_process.items()}
         
-        for i, future in enumerate(as_completed(futures)):
-            state_data = future.result()
-            all_homes_data.extend(state_data)
-            print(f"✅ Added {len(state_data)} properties to list")
+        # Inserts stay on this thread, the workers only fetch
+        for i, future in enumerate(as_completed(future_states)):
+            property_count = save_state_data(future_states[future], future.result())
+            total_homes += property_count
+            print(f"✅ Added {property_count} properties to list")
             print(f"Processing {i+1} of {len(states_to_process)} states")
+            progress_events.advance()
 
-    print(f"✅ Done. Total {len(all_homes_data)} properties saved to database")
+    print(f"✅ Done. Total {total_homes} properties saved to database")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
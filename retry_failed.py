@@ -0,0 +1,115 @@
+import argparse
+import random
+import time
+import db_connector
+
+# Import the scraper modules
+import zillow_db
+import realtor_db
+import redfin_db
+
+# Constants
+MAX_ATTEMPTS = 10  # Pages that have failed this many times are left for a full crawl
+BASE_DELAY = 3  # Seconds between ledger entries while requests succeed
+MAX_DELAY = 120  # Upper bound for the backoff delay after repeated failures
+
+# Function to re-fetch a single ledger entry, returns (success, inserted, skipped)
+def retry_request(entry):
+    source = entry['source']
+    state = entry['state']
+    property_type = entry['property_type']
+    page_key = entry['page_key']
+
+    if source == realtor_db.SOURCE_NAME:
+        properties, _, failed = realtor_db.fetch_properties(state, property_type, page_key)
+        if failed:
+            return False, 0, 0
+    elif source == zillow_db.SOURCE_NAME and page_key < 0:
+        # A failed or capped map tile, re-fetch just that tile and split it
+        # deeper if needed. Quadrants that still fail get their own entries.
+        code = zillow_db.page_key_tile(page_key)
+        inserted, skipped, failed_codes = zillow_db.harvest_map_results(
+            state, property_type, [code], zillow_db.MAX_RETRY_TILE_DEPTH
+        )
+        return code not in failed_codes, inserted, skipped
+    elif source == zillow_db.SOURCE_NAME:
+        page_response = zillow_db.fetch_page(state, property_type, page_key)
+        if not page_response:
+            return False, 0, 0
+        properties = zillow_db.extract_page_properties(page_response, state)
+    elif source == redfin_db.SOURCE_NAME:
+        if state not in redfin_db.states_config:
+            print(f"⚠️ Unknown Redfin state in ledger: {state}")
+            return False, 0, 0
+        content = redfin_db.fetch_state_response(state, redfin_db.states_config[state])
+        if content is None:
+            return False, 0, 0
+        _, inserted, skipped = redfin_db.save_state_response(content, state)
+        return True, inserted, skipped
+    else:
+        print(f"⚠️ Unknown source in ledger: {source}")
+        return False, 0, 0
+
+    inserted, skipped = 0, 0
+    if properties:
+        inserted, skipped = db_connector.batch_insert_properties(properties, source)
+    return True, inserted, skipped
+
+def main(source=None, limit=None, max_attempts=MAX_ATTEMPTS):
+    print("🚀 Re-fetching failed scraper pages from the ledger")
+
+    # Ensure database tables exist
+    try:
+        db_connector.create_tables()
+        print("✅ Database tables ready")
+    except Exception as e:
+        print(f"❌ Database setup failed: {e}")
+        return
+
+    realtor_db.load_existing_properties()
+
+    entries = db_connector.get_failed_requests(source, max_attempts, limit)
+    if not entries:
+        print("✅ No failed pages to retry")
+        return
+
+    print(f"📋 Will retry {len(entries)} failed pages")
+
+    recovered = 0
+    total_inserted = 0
+    delay = BASE_DELAY
+
+    for i, entry in enumerate(entries):
+        print(f"Processing {i + 1} of {len(entries)}: {entry['source']} {entry['state']} {entry['property_type']} page/offset {entry['page_key']} (last error: {entry['error_class']}, {entry['attempts']} attempts)")
+
+        try:
+            success, inserted, skipped = retry_request(entry)
+        except Exception as e:
+            print(f"❌ Error retrying ledger entry {entry['id']}: {str(e)}")
+            success, inserted, skipped = False, 0, 0
+
+        if success:
+            db_connector.resolve_failed_request(entry['id'])
+            recovered += 1
+            total_inserted += inserted
+            delay = BASE_DELAY
+            print(f"✓ Recovered: {inserted} properties inserted, {skipped} skipped")
+        else:
+            # The fetch functions already re-recorded the failure; back off before the next one
+            delay = min(delay * 2, MAX_DELAY)
+            print(f"⚠️ Still failing, backing off to {delay}s between requests")
+
+        if i < len(entries) - 1:
+            time.sleep(delay + random.uniform(0, 1))
+
+    print(f"✅ Done. Recovered {recovered} of {len(entries)} failed pages, {total_inserted} properties inserted")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-fetch scraper pages recorded in the failed request ledger")
+    parser.add_argument("--source", type=str, help="Only retry pages from this source (zillow, realtor, redfin)")
+    parser.add_argument("--limit", type=int, help="Maximum number of failed pages to retry")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS,
+                        help=f"Skip pages that have already failed this many times (default: {MAX_ATTEMPTS})")
+    args = parser.parse_args()
+
+    main(args.source, args.limit, args.max_attempts)
@@ -1,13 +1,20 @@
 import mysql.connector
 import os
+import socket
 import sys
 import time
-import random
 import requests
 from dotenv import load_dotenv
 import db_connector
+import circuit_breaker
+import progress_events
+import verification_cache
+import verification_rules
 import logging
 import argparse
+import threading
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 # Configure logging
 logging.basicConfig(
@@ -22,15 +29,8 @@ logger = logging.getLogger("sfr3_checker")
 
 # Counter for API requests
 api_request_counter = 0
-# Counter for consecutive API errors
-consecutive_api_errors = 0
-# Maximum allowed consecutive API errors before stopping
-MAX_CONSECUTIVE_API_ERRORS = 20
-
-# Custom exception for stopping the verification process
-class StopVerificationError(Exception):
-    """Exception raised to halt the verification process due to too many API errors."""
-    pass
+# Lock for the API counter, which is shared by the verification threads
+api_state_lock = threading.Lock()
 
 # Load environment variables from .env file
 load_dotenv()
@@ -40,63 +40,202 @@ DEFAULT_BATCH_SIZE = 1000  # Default batch size
 RECOMMENDED_LIMIT = 5000  # Recommended maximum properties to process at once
 MAX_RETRIES = 3  # Maximum number of retries for db operations
 DB_BATCH_SIZE = 100  # Size of batches for database updates
+DB_FLUSH_INTERVAL = 5.0  # Longest time in seconds a verification result waits before being written
+DEFAULT_THREADS = 4  # Default number of concurrent SFR3 API checks
+PRE_VERIFY_CHUNK_SIZE = 10000  # Primary key range covered by each pre-verification UPDATE
+LEASE_SECONDS = 600  # How long claimed properties stay reserved for this checker
+LEASE_RENEW_INTERVAL = 120  # Seconds between lease extensions of rows still being checked
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"  # Identifies this checker's claims
+MAX_API_ATTEMPTS = 8  # API_ERROR attempts before a property is dead-lettered
+RETRY_BASE_DELAY = 900  # Seconds before the first API_ERROR retry, doubled after each attempt
+RETRY_MAX_DELAY = 86400  # Longest wait between API_ERROR retries
+API_REQUESTS_PER_SECOND = 2.0  # Starting SFR3 API request rate across all threads
+MIN_API_RATE = 0.2  # Slowest request rate the limiter backs off to
+MAX_API_RATE = 10.0  # Fastest request rate the limiter probes up to
+RATE_PROBE_STEP = 0.05  # Requests per second added after each successful call
+RATE_BACKOFF_FACTOR = 0.5  # Rate multiplier when the API throttles a request
+BACKOFF_COOLDOWN = 1.0  # Seconds during which further throttles don't lower the rate again
+MAX_THROTTLE_RETRIES = 5  # Times a throttled request is retried before it counts as an API error
+MAX_SERVER_ERROR_RETRIES = 1  # Times a 5xx without Retry-After is retried, each failure counts towards the circuit breaker
+CIRCUIT_FAILURE_THRESHOLD = 20  # Consecutive API errors that pause verification
+CIRCUIT_COOL_DOWN = 30.0  # Seconds verification pauses before probing the API again
+CIRCUIT_MAX_COOL_DOWN = 300.0  # Longest pause after repeated failed probes, well under LEASE_SECONDS
+CIRCUIT_PROBE_SUCCESSES = 2  # Successful probe calls that resume verification
+STREAM_POLL_INTERVAL = 10.0  # Seconds the streaming verifier waits when the outbox is empty
+PROPERTY_COLUMNS = ("id, property_id, state, property_type, address, square_footage, bedrooms, year_built, "
+                    "after_repair_value, url, source, is_verified, failure_reason")  # Every column the rules read
+SFR3_CHECK_URL = os.getenv("SFR3_CHECK_URL", "http://api.sfr3.com/sfr3/offmarket/check-address")  # Point at benchmarks/sfr3_standin.py for load tests
+
+class ApiRateLimiter:
+    """Adaptive request rate shared by all verification threads.
+    
+    Requests are spaced evenly at the current rate. Each success raises the
+    rate by RATE_PROBE_STEP, and each throttle or server error multiplies
+    it by RATE_BACKOFF_FACTOR (at most once per BACKOFF_COOLDOWN, so a burst
+    of failed in-flight requests only counts once). A Retry-After delay
+    pauses every thread until it has passed.
+    """
+
+    def __init__(self, requests_per_second):
+        self.lock = threading.Lock()
+        self.next_request_time = 0.0
+        self.last_backoff_time = 0.0
+        self.set_rate(requests_per_second)
+
+    def set_rate(self, requests_per_second):
+        self.rate = min(max(requests_per_second, MIN_API_RATE), MAX_API_RATE)
+
+    def acquire(self):
+        """Block until the next request slot."""
+        with self.lock:
+            now = time.time()
+            wait = self.next_request_time - now
+            self.next_request_time = max(now, self.next_request_time) + 1.0 / self.rate
+        progress_events.timing('rate_limit_wait', max(wait, 0.0))
+        if wait > 0:
+            time.sleep(wait)
+
+    def on_success(self):
+        """Probe a little faster after a successful call."""
+        with self.lock:
+            self.rate = min(self.rate + RATE_PROBE_STEP, MAX_API_RATE)
+
+    def back_off(self):
+        """Slow down after a throttled or failed call, returns the new rate."""
+        with self.lock:
+            self._back_off(time.time())
+            return self.rate
+
+    def on_throttle(self, retry_after=None):
+        """Slow down after a throttled call, pausing all threads for retry_after seconds if given."""
+        with self.lock:
+            now = time.time()
+            self._back_off(now)
+            if retry_after:
+                self.next_request_time = max(self.next_request_time, now + retry_after)
+            return self.rate
+
+    def _back_off(self, now):
+        # The caller holds the lock
+        if now - self.last_backoff_time >= BACKOFF_COOLDOWN:
+            self.rate = max(self.rate * RATE_BACKOFF_FACTOR, MIN_API_RATE)
+            self.last_backoff_time = now
+
+# Rate limiter for SFR3 API requests
+api_rate_limiter = ApiRateLimiter(API_REQUESTS_PER_SECOND)
+
+# Circuit breaker pausing SFR3 checks while the API keeps failing
+api_circuit_breaker = circuit_breaker.CircuitBreaker(
+    failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+    cool_down=CIRCUIT_COOL_DOWN,
+    max_cool_down=CIRCUIT_MAX_COOL_DOWN,
+    probe_successes=CIRCUIT_PROBE_SUCCESSES
+)
+
+def log_circuit_state(old_state, new_state, breaker):
+    if new_state == circuit_breaker.OPEN:
+        logger.warning(f"SFR3 API keeps failing, pausing verification for {breaker.cool_down:.0f}s before probing it again")
+    elif new_state == circuit_breaker.HALF_OPEN:
+        logger.info("Probing the SFR3 API")
+    else:
+        logger.info("SFR3 API recovered, resuming verification")
+
+api_circuit_breaker.add_listener(log_circuit_state)
+
+# Number of threads process_verification_batch uses (set from --threads)
+verification_threads = DEFAULT_THREADS
 
-def get_total_properties_to_verify(source=None, include_failed=True, retry_api_only=False):
+def parse_retry_after(response):
+    """Return the Retry-After delay of a response in seconds, or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+def is_throttled(response):
+    """Return True if the SFR3 API rejected a request for load rather than for the address.
+    
+    That is a 429, any response with Retry-After, or the API's own 400
+    "Too many requests". Other 5xx responses are server errors.
+    """
+    if response.status_code == 429 or response.headers.get("Retry-After"):
+        return True
+    if response.status_code == 400:
+        try:
+            return "Too many requests" in response.json().get("message", "")
+        except Exception:
+            return False
+    return False
+
+def check_address(address, property_id):
+    """Call the SFR3 check-address endpoint under the adaptive rate limiter.
+    
+    Throttled responses slow the shared rate down, honour Retry-After and
+    are retried in-process up to MAX_THROTTLE_RETRIES times instead of
+    being recorded as failures. A 5xx also slows the rate down, but is only
+    retried MAX_SERVER_ERROR_RETRIES times, and each failed attempt but the
+    last is reported to the circuit breaker here (the caller reports the
+    last). Returns the last response.
+    """
+    global api_request_counter
+    
+    throttle_retries = 0
+    server_error_retries = 0
+    while True:
+        api_rate_limiter.acquire()
+        with api_state_lock:
+            api_request_counter += 1
+        
+        with progress_events.timed('sfr3_request'):
+            response = requests.get(SFR3_CHECK_URL, params={"address": address}, timeout=10)
+        
+        if is_throttled(response):
+            rate = api_rate_limiter.on_throttle(parse_retry_after(response))
+            if throttle_retries >= MAX_THROTTLE_RETRIES:
+                return response
+            throttle_retries += 1
+            logger.warning(f"SFR3 API throttled property {property_id} (HTTP {response.status_code}), retrying at {rate:.2f} requests/s")
+            continue
+        
+        if response.status_code >= 500:
+            # A failing server is slowed down too, but without the throttle retry budget
+            rate = api_rate_limiter.back_off()
+            if server_error_retries >= MAX_SERVER_ERROR_RETRIES:
+                return response
+            server_error_retries += 1
+            logger.warning(f"SFR3 API returned HTTP {response.status_code} for property {property_id}, retrying once at {rate:.2f} requests/s")
+            api_circuit_breaker.record_failure()
+            # Wait again if that failure paused verification
+            paused = api_circuit_breaker.acquire()
+            if paused > 0.001:
+                progress_events.timing('circuit_open_wait', paused)
+            continue
+        
+        if response.status_code == 200:
+            api_rate_limiter.on_success()
+        return response
+
+def get_total_properties_to_verify(source=None, retry_api_only=False):
     """Get the total count of properties that need verification."""
     connection = db_connector.get_db_connection()
     if not connection:
         logger.error("Cannot count properties: No database connection")
         return 0
     
+    # Use the same conditions as get_properties_to_verify but count only
+    conditions, params = verification_conditions(source, retry_api_only)
+    
     for retry in range(MAX_RETRIES):
         try:
             cursor = connection.cursor()
-            
-            # Use the same query logic as get_properties_to_verify but count only
-            if retry_api_only:
-                # Only count properties with API_ERROR
-                if source:
-                    query = """
-                    SELECT COUNT(*) as total
-                    FROM properties
-                    WHERE failure_reason = 'API_ERROR' AND source LIKE %s
-                    """
-                    cursor.execute(query, (f"%{source}%",))
-                else:
-                    query = """
-                    SELECT COUNT(*) as total
-                    FROM properties
-                    WHERE failure_reason = 'API_ERROR'
-                    """
-                    cursor.execute(query)
-            elif source and include_failed:
-                query = """
-                SELECT COUNT(*) as total
-                FROM properties
-                WHERE (is_verified = FALSE OR failure_reason = 'API_ERROR') AND source LIKE %s
-                """
-                cursor.execute(query, (f"%{source}%",))
-            elif source and not include_failed:
-                query = """
-                SELECT COUNT(*) as total
-                FROM properties
-                WHERE is_verified = FALSE AND (failure_reason IS NULL OR failure_reason = 'API_ERROR') AND source LIKE %s
-                """
-                cursor.execute(query, (f"%{source}%",))
-            elif include_failed:
-                query = """
-                SELECT COUNT(*) as total
-                FROM properties
-                WHERE is_verified = FALSE OR failure_reason = 'API_ERROR'
-                """
-                cursor.execute(query)
-            else:
-                query = """
-                SELECT COUNT(*) as total
-                FROM properties
-                WHERE is_verified = FALSE AND (failure_reason IS NULL OR failure_reason = 'API_ERROR')
-                """
-                cursor.execute(query)
+            cursor.execute(f"SELECT COUNT(*) as total FROM properties WHERE {conditions}", params)
             
             result = cursor.fetchone()
             total_count = result[0] if result else 0
@@ -122,82 +261,93 @@ def get_total_properties_to_verify(source=None, include_failed=True, retry_api_o
     
     return 0
 
-def get_properties_to_verify(batch_size=DEFAULT_BATCH_SIZE, source=None, include_failed=True, retry_api_only=False):
-    """Get a batch of properties from the database."""
+def verification_conditions(source=None, retry_api_only=False):
+    """Return the WHERE conditions and parameters selecting properties to verify.
+    
+    The conditions match exactly the rows the checker processes: unverified
+    properties without a failure reason, or with an API_ERROR whose retry
+    is due (next_attempt_at, see batch_update_verification_status). Listings
+    linked to a canonical listing of the same address (canonical_id, see
+    db_connector.link_duplicate_properties) are never verified. Properties with
+    permanent failure reasons are always skipped.
+    """
+    if retry_api_only:
+        # Only properties with API_ERROR
+        conditions = "is_verified = FALSE AND failure_reason = 'API_ERROR'"
+    else:
+        conditions = "is_verified = FALSE AND (failure_reason IS NULL OR failure_reason = 'API_ERROR')"
+    conditions += " AND (next_attempt_at IS NULL OR next_attempt_at <= NOW()) AND canonical_id IS NULL"
+    
+    params = []
+    if source:
+        conditions += " AND source LIKE %s"
+        params.append(f"%{source}%")
+    return conditions, params
+
+def get_properties_to_verify(batch_size=DEFAULT_BATCH_SIZE, source=None, retry_api_only=False, worker_id=WORKER_ID, after_id=0):
+    """Claim a batch of properties from the database.
+    
+    Rows include every column the verification rules read, so they can be
+    verified without fetching their details.
+    Rows are returned in primary key order, starting after after_id (see
+    iter_properties_to_verify).
+    
+    With a worker_id the rows are leased to it for LEASE_SECONDS: they are
+    picked with SELECT ... FOR UPDATE SKIP LOCKED among unleased or expired
+    rows and stamped with claimed_by/lease_until, so concurrent checkers
+    never get the same rows. Saving a row's verification status releases
+    its lease, and leases of rows that were never saved simply expire.
+    """
     connection = db_connector.get_db_connection()
     if not connection:
         logger.error("Cannot get properties: No database connection")
         return []
     
+    conditions, params = verification_conditions(source, retry_api_only)
+    columns = PROPERTY_COLUMNS
+    
     for retry in range(MAX_RETRIES):
         try:
             cursor = connection.cursor(dictionary=True)
+            logger.info(f"Querying with source={source}, retry_api_only={retry_api_only}")
             
-            # Prepare query based on filters
-            if retry_api_only:
-                # Only get properties with API_ERROR
-                if source:
-                    query = """
-                    SELECT id, property_id, state, property_type, address, url, source, is_verified, failure_reason
-                    FROM properties
-                    WHERE failure_reason = 'API_ERROR' AND source LIKE %s
-                    ORDER BY date_added ASC
-                    LIMIT %s
-                    """
-                    cursor.execute(query, (f"%{source}%", batch_size))
-                    logger.info(f"Querying API errors only with source={source}")
-                else:
-                    query = """
-                    SELECT id, property_id, state, property_type, address, url, source, is_verified, failure_reason
-                    FROM properties
-                    WHERE failure_reason = 'API_ERROR'
-                    ORDER BY date_added ASC
-                    LIMIT %s
-                    """
-                    cursor.execute(query, (batch_size,))
-                    logger.info(f"Querying API errors only, no source filter")
-            elif source and include_failed:
-                query = """
-                SELECT id, property_id, state, property_type, address, url, source, is_verified, failure_reason
-                FROM properties
-                WHERE (is_verified = FALSE OR failure_reason = 'API_ERROR') AND source LIKE %s
-                ORDER BY date_added ASC
-                LIMIT %s
-                """
-                cursor.execute(query, (f"%{source}%", batch_size))
-                logger.info(f"Querying with source={source} and include_failed=True")
-            elif source and not include_failed:
-                query = """
-                SELECT id, property_id, state, property_type, address, url, source, is_verified, failure_reason
+            if worker_id:
+                # Lock unleased rows, skipping any another checker is claiming right now
+                query = f"""
+                SELECT id
                 FROM properties
-                WHERE is_verified = FALSE AND (failure_reason IS NULL OR failure_reason = 'API_ERROR') AND source LIKE %s
-                ORDER BY date_added ASC
+                WHERE {conditions} AND id > %s AND (lease_until IS NULL OR lease_until < NOW())
+                ORDER BY id ASC
                 LIMIT %s
+                FOR UPDATE SKIP LOCKED
                 """
-                cursor.execute(query, (f"%{source}%", batch_size))
-                logger.info(f"Querying with source={source} and include_failed=False")
-            elif include_failed:
-                query = """
-                SELECT id, property_id, state, property_type, address, url, source, is_verified, failure_reason
-                FROM properties
-                WHERE is_verified = FALSE OR failure_reason = 'API_ERROR'
-                ORDER BY date_added ASC
-                LIMIT %s
-                """
-                cursor.execute(query, (batch_size,))
-                logger.info(f"Querying with include_failed=True, no source filter")
+                cursor.execute(query, params + [after_id, batch_size])
+                ids = [row['id'] for row in cursor.fetchall()]
+                
+                if ids:
+                    placeholders = ', '.join(['%s'] * len(ids))
+                    cursor.execute(
+                        f"UPDATE properties SET claimed_by = %s, lease_until = NOW() + INTERVAL %s SECOND WHERE id IN ({placeholders})",
+                        [worker_id, LEASE_SECONDS] + ids
+                    )
+                connection.commit()
+                
+                if ids:
+                    cursor.execute(f"SELECT {columns} FROM properties WHERE id IN ({placeholders}) ORDER BY id ASC", ids)
+                    logger.info(f"Claimed {len(ids)} properties for {worker_id}")
+                    properties = cursor.fetchall()
+                else:
+                    properties = []
             else:
-                query = """
-                SELECT id, property_id, state, property_type, address, url, source, is_verified, failure_reason
+                query = f"""
+                SELECT {columns}
                 FROM properties
-                WHERE is_verified = FALSE AND (failure_reason IS NULL OR failure_reason = 'API_ERROR')
-                ORDER BY date_added ASC
+                WHERE {conditions} AND id > %s
+                ORDER BY id ASC
                 LIMIT %s
                 """
-                cursor.execute(query, (batch_size,))
-                logger.info(f"Querying with include_failed=False, no source filter")
-            
-            properties = cursor.fetchall()
+                cursor.execute(query, params + [after_id, batch_size])
+                properties = cursor.fetchall()
             logger.info(f"Retrieved {len(properties)} properties for checking")
             
             # Debug: If no properties found, let's check how many properties exist at all
@@ -241,425 +391,628 @@ def get_properties_to_verify(batch_size=DEFAULT_BATCH_SIZE, source=None, include
     
     return []
 
-def get_property_details(property_id):
-    """Get detailed information for a specific property."""
+def iter_properties_to_verify(batch_size=DEFAULT_BATCH_SIZE, source=None, retry_api_only=False, limit=None, worker_id=WORKER_ID):
+    """Yield batches of properties to verify, walking the queue once.
+    
+    Each batch starts after the highest id of the previous one (keyset
+    pagination), so a run touches every eligible row at most once. Rows
+    that come back as API_ERROR or are leased by another checker are not
+    fetched again until the next run. Stops after limit rows if given.
+    """
+    last_id = 0
+    fetched = 0
+    while limit is None or fetched < limit:
+        current_batch_size = batch_size if limit is None else min(batch_size, limit - fetched)
+        with progress_events.timed('db_claim'):
+            properties = get_properties_to_verify(current_batch_size, source, retry_api_only, worker_id, last_id)
+        if not properties:
+            return
+        
+        last_id = max(prop['id'] for prop in properties)
+        fetched += len(properties)
+        yield properties
+
+def claim_outbox_properties(batch_size=DEFAULT_BATCH_SIZE, worker_id=WORKER_ID):
+    """Claim properties the scrapers queued in verification_outbox.
+    
+    Takes the oldest outbox entries with FOR UPDATE SKIP LOCKED, so several
+    streaming verifiers split them. In the same transaction it leases the
+    entries' properties that still need verifying (as
+    get_properties_to_verify does) and deletes the entries. A claimed
+    property that isn't verified, for example because the verifier stops,
+    is still in the batch checker's queue once its lease expires.
+    
+    Returns (properties, entries taken), where properties are the claimed
+    rows.
+    """
     connection = db_connector.get_db_connection()
     if not connection:
-        logger.error(f"Cannot get property details for {property_id}: No database connection")
-        return None
+        logger.error("Cannot claim queued properties: No database connection")
+        return [], 0
+    
+    conditions, params = verification_conditions()
     
     for retry in range(MAX_RETRIES):
         try:
             cursor = connection.cursor(dictionary=True)
-            query = """
-            SELECT *
-            FROM properties
-            WHERE property_id = %s
-            """
-            cursor.execute(query, (property_id,))
-            property_data = cursor.fetchone()
+            cursor.execute(
+                "SELECT id, property_row_id FROM verification_outbox ORDER BY id ASC LIMIT %s FOR UPDATE SKIP LOCKED",
+                (batch_size,)
+            )
+            entries = cursor.fetchall()
+            if not entries:
+                connection.commit()
+                return [], 0
+            
+            # Lease the queued properties nobody has verified or claimed in the meantime
+            row_ids = list({entry['property_row_id'] for entry in entries})
+            placeholders = ', '.join(['%s'] * len(row_ids))
+            cursor.execute(f"""
+                SELECT id
+                FROM properties
+                WHERE id IN ({placeholders}) AND {conditions} AND (lease_until IS NULL OR lease_until < NOW())
+                ORDER BY id ASC
+                FOR UPDATE SKIP LOCKED
+                """, row_ids + params)
+            ids = [row['id'] for row in cursor.fetchall()]
+            
+            if ids:
+                id_placeholders = ', '.join(['%s'] * len(ids))
+                cursor.execute(
+                    f"UPDATE properties SET claimed_by = %s, lease_until = NOW() + INTERVAL %s SECOND WHERE id IN ({id_placeholders})",
+                    [worker_id, LEASE_SECONDS] + ids
+                )
+            
+            entry_ids = [entry['id'] for entry in entries]
+            cursor.execute(
+                f"DELETE FROM verification_outbox WHERE id IN ({', '.join(['%s'] * len(entry_ids))})",
+                entry_ids
+            )
+            connection.commit()
+            
+            properties = []
+            if ids:
+                cursor.execute(f"SELECT {PROPERTY_COLUMNS} FROM properties WHERE id IN ({id_placeholders}) ORDER BY id ASC", ids)
+                properties = cursor.fetchall()
+            logger.info(f"Took {len(entries)} outbox entries, claimed {len(properties)} properties for {worker_id}")
             cursor.close()
-            return property_data
+            return properties, len(entries)
         
         except mysql.connector.Error as err:
-            logger.error(f"Error retrieving property details: {err}")
+            logger.error(f"Error claiming queued properties: {err}")
+            connection.rollback()
             if retry < MAX_RETRIES - 1:
                 logger.info(f"Retrying... ({retry + 1}/{MAX_RETRIES})")
                 time.sleep(1)  # Wait before retrying
                 # Try to get a fresh connection
                 connection = db_connector.get_db_connection()
                 if not connection:
-                    return None
+                    return [], 0
             else:
                 logger.error("Max retries reached. Giving up.")
-                return None
+                return [], 0
         finally:
             if 'cursor' in locals() and cursor:
                 cursor.close()
     
-    return None
+    return [], 0
 
-def verify_property(property_data):
-    """
-    Verify a property based on:
-    1. Square footage must be at least 800
-    2. SFR3 API must not return interested=false
-    3. API must return status code 200
+def iter_outbox_properties(batch_size=DEFAULT_BATCH_SIZE, poll_interval=STREAM_POLL_INTERVAL, limit=None, worker_id=WORKER_ID):
+    """Yield batches of newly inserted properties as the scrapers queue them.
     
-    Returns:
-        tuple: (is_verified, failure_reason)
+    Runs until limit properties were yielded, or forever without a limit,
+    polling the outbox every poll_interval seconds while it is empty.
     """
-    global api_request_counter
-    global consecutive_api_errors
-    
-    # First check: square footage must be at least 800
-    if property_data.get('square_footage', 0) < 800:
-        logger.info(f"Property {property_data['property_id']} failed verification: square footage ({property_data.get('square_footage', 0)}) < 800")
-        # Reset consecutive API errors counter on non-API related failures
-        consecutive_api_errors = 0
-        return False, "SQUARE_FOOTAGE"
+    fetched = 0
+    while limit is None or fetched < limit:
+        current_batch_size = batch_size if limit is None else min(batch_size, limit - fetched)
+        with progress_events.timed('db_claim'):
+            properties, taken = claim_outbox_properties(current_batch_size, worker_id)
+        if properties:
+            fetched += len(properties)
+            yield properties
+        elif not taken:
+            # Entries of properties verified elsewhere are taken without a wait
+            time.sleep(poll_interval)
+
+def check_property_with_api(property_data, address):
+    """Check a property's address with the SFR3 API, returning (is_verified, failure_reason)."""
+    # Wait while the circuit breaker has verification paused
+    paused = api_circuit_breaker.acquire()
+    if paused > 0.001:
+        progress_events.timing('circuit_open_wait', paused)
     
-    # Second check: check with SFR3 API
+    # Send request to SFR3 API
+    logger.info(f"Checking property {property_data['property_id']} address with SFR3 API: {address}")
+
     try:
-        address = property_data.get('address', '')
-        if not address:
-            logger.warning(f"Property {property_data['property_id']} has no address, cannot check with API")
-            # Reset consecutive API errors counter on non-API related failures
-            consecutive_api_errors = 0
-            return False, "NO_ADDRESS"
-
-        # API Endpoint
-        url = "http://api.sfr3.com/sfr3/offmarket/check-address"
-
-        # Send request to SFR3 API
-        logger.info(f"Checking property {property_data['property_id']} address with SFR3 API: {address}")
-        
-        try:
-            # Increment API request counter and check if pause needed
-            api_request_counter += 1
-            
-            # Pause after every 10 API requests
-            if api_request_counter % 10 == 0:
-                logger.info(f"Pausing for 10 seconds after {api_request_counter} API requests...")
-                time.sleep(20)  # 10 second pause
-            
-            response = requests.get(url, params={"address": address}, timeout=10)
-            
-            # Handle rate limiting responses
-            if response.status_code == 400:
-                try:
-                    response_data = response.json()
-                    error_message = response_data.get("message", "")
-                    if "Too many requests" in error_message:
-                        logger.warning(f"SFR3 API rate limit exceeded for property {property_data['property_id']}: {error_message}")
-                        # Increment consecutive API errors
-                        consecutive_api_errors += 1
-                        
-                        # Check if we've reached the consecutive error threshold
-                        if consecutive_api_errors >= MAX_CONSECUTIVE_API_ERRORS:
-                            logger.error(f"Stopping verification process: {MAX_CONSECUTIVE_API_ERRORS} consecutive API errors detected. Server may be overloaded.")
-                            raise StopVerificationError(f"Stopping due to {MAX_CONSECUTIVE_API_ERRORS} consecutive API errors. Please try again later.")
-                            
-                        return False, "API_ERROR"
-                except Exception:
-                    # If we can't parse the response, still treat as API error
-                    logger.warning(f"SFR3 API returned status 400 for property {property_data['property_id']}")
-                    # Increment consecutive API errors
-                    consecutive_api_errors += 1
-                    
-                    # Check if we've reached the consecutive error threshold
-                    if consecutive_api_errors >= MAX_CONSECUTIVE_API_ERRORS:
-                        logger.error(f"Stopping verification process: {MAX_CONSECUTIVE_API_ERRORS} consecutive API errors detected. Server may be overloaded.")
-                        raise StopVerificationError(f"Stopping due to {MAX_CONSECUTIVE_API_ERRORS} consecutive API errors. Please try again later.")
-                        
+        # Throttled requests and a first 5xx are retried inside check_address
+        response = check_address(address, property_data['property_id'])
+
+        # Handle rate limiting responses that ran out of retries
+        if response.status_code == 400:
+            try:
+                response_data = response.json()
+                error_message = response_data.get("message", "")
+                if "Too many requests" in error_message:
+                    logger.warning(f"SFR3 API rate limit exceeded for property {property_data['property_id']}: {error_message}")
+                    api_circuit_breaker.record_failure()
+
                     return False, "API_ERROR"
-            
-            if response.status_code == 200:
-                # Reset consecutive API errors on successful API call
-                consecutive_api_errors = 0
-                
-                data = response.json()
-                interested = data.get("interested")
-                reason = data.get("reason", "No reason provided")
-                
-                if interested is False:
-                    logger.info(f"Property {property_data['property_id']} failed SFR3 API check: {reason}")
-                    return False, "NOT_INTERESTED"
-                else:
-                    logger.info(f"Property {property_data['property_id']} passed SFR3 API check with response: {interested}, reason: {reason}")
-                    return True, None
-            else:
-                logger.warning(f"SFR3 API returned non-200 status code {response.status_code} for property {property_data['property_id']}")
-                # Increment consecutive API errors
-                consecutive_api_errors += 1
-                
-                # Check if we've reached the consecutive error threshold
-                if consecutive_api_errors >= MAX_CONSECUTIVE_API_ERRORS:
-                    logger.error(f"Stopping verification process: {MAX_CONSECUTIVE_API_ERRORS} consecutive API errors detected. Server may be overloaded.")
-                    raise StopVerificationError(f"Stopping due to {MAX_CONSECUTIVE_API_ERRORS} consecutive API errors. Please try again later.")
-                    
+            except Exception:
+                # If we can't parse the response, still treat as API error
+                logger.warning(f"SFR3 API returned status 400 for property {property_data['property_id']}")
+                api_circuit_breaker.record_failure()
+
                 return False, "API_ERROR"
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error making request to SFR3 API for property {property_data['property_id']}: {str(e)}")
-            # Increment consecutive API errors
-            consecutive_api_errors += 1
-            
-            # Check if we've reached the consecutive error threshold
-            if consecutive_api_errors >= MAX_CONSECUTIVE_API_ERRORS:
-                logger.error(f"Stopping verification process: {MAX_CONSECUTIVE_API_ERRORS} consecutive API errors detected. Server may be overloaded.")
-                raise StopVerificationError(f"Stopping due to {MAX_CONSECUTIVE_API_ERRORS} consecutive API errors. Please try again later.")
-                
+
+        if response.status_code == 200:
+            api_circuit_breaker.record_success()
+
+            data = response.json()
+            interested = data.get("interested")
+            reason = data.get("reason", "No reason provided")
+
+            if interested is False:
+                logger.info(f"Property {property_data['property_id']} failed SFR3 API check: {reason}")
+                return False, "NOT_INTERESTED"
+            else:
+                logger.info(f"Property {property_data['property_id']} passed SFR3 API check with response: {interested}, reason: {reason}")
+                return True, None
+        else:
+            logger.warning(f"SFR3 API returned non-200 status code {response.status_code} for property {property_data['property_id']}")
+            api_circuit_breaker.record_failure()
+
             return False, "API_ERROR"
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error making request to SFR3 API for property {property_data['property_id']}: {str(e)}")
+        api_circuit_breaker.record_failure()
+
+        return False, "API_ERROR"
+
+def check_with_sfr3(property_data):
+    """Remote rule: return None if SFR3 is interested in the property, otherwise the failure reason."""
+    address = property_data['address']
+    # Check with the SFR3 API, unless this address already has a cached result
+    is_verified, failure_reason = verification_cache.get_or_check(address, lambda: check_property_with_api(property_data, address))
+    return None if is_verified else failure_reason
+
+def build_rule_pipeline(path=verification_rules.RULES_FILE):
+    """Build the verification pipeline: the buy box rules from path, then the SFR3 API."""
+    rules = verification_rules.build_local_rules(verification_rules.load_config(path))
+    rules.append(verification_rules.Rule(
+        "sfr3_api", None, cost=verification_rules.REMOTE_RULE_COST, remote=True, evaluate=check_with_sfr3
+    ))
+    pipeline = verification_rules.RulePipeline(rules)
+    logger.info(f"Verification rules: {pipeline.rules}")
+    return pipeline
+
+# Rules every property is verified against (see verification_rules)
+rule_pipeline = build_rule_pipeline()
+
+def verify_property(property_data, check_local=True):
+    """
+    Verify a property against rule_pipeline: the local buy box rules
+    (square footage, address, and any configured price, bedroom, year built
+    or property type limits), then the SFR3 API, which must not return
+    interested=false.
+    
+    Pass check_local=False for properties that already went through
+    rule_pipeline.reject_locally.
+    
+    Returns:
+        tuple: (is_verified, failure_reason)
+    """
+    if check_local:
+        failure_reason = rule_pipeline.check_local(property_data)
+        if failure_reason:
+            logger.info(f"Property {property_data['property_id']} failed verification: {failure_reason}")
+            return False, failure_reason
+    
+    try:
+        failure_reason = rule_pipeline.check_remote(property_data)
+        return failure_reason is None, failure_reason
             
-    except StopVerificationError:
-        # Re-raise StopVerificationError to be caught by the caller
-        raise
     except Exception as e:
         logger.error(f"Error checking property {property_data['property_id']} with SFR3 API: {str(e)}")
-        # Increment consecutive API errors
-        consecutive_api_errors += 1
+        api_circuit_breaker.record_failure()
         
-        # Check if we've reached the consecutive error threshold
-        if consecutive_api_errors >= MAX_CONSECUTIVE_API_ERRORS:
-            logger.error(f"Stopping verification process: {MAX_CONSECUTIVE_API_ERRORS} consecutive API errors detected. Server may be overloaded.")
-            raise StopVerificationError(f"Stopping due to {MAX_CONSECUTIVE_API_ERRORS} consecutive API errors. Please try again later.")
-            
         return False, "API_ERROR"
+
+def pre_verify_local_rules(source=None, retry_api_only=False):
+    """Apply the local rules of rule_pipeline as set-based UPDATEs.
+    
+    Each rule's SQL condition fails the rows it rejects with its failure
+    reason, cheapest rule first, in the same order verify_property applies
+    them. The UPDATEs run in primary key ranges of PRE_VERIFY_CHUNK_SIZE so
+    no single statement locks the whole table. Only rows that need the SFR3
+    API are left for the per-property checks.
+    
+    Returns a dict of rejected row counts by rule counter (e.g.
+    'square_footage', 'no_address').
+    """
+    rules = [rule for rule in rule_pipeline.local_rules if rule.sql]
+    counts = {rule.name: 0 for rule in rules}
+    
+    connection = db_connector.get_db_connection()
+    if not connection:
+        logger.error("Cannot pre-verify properties: No database connection")
+        return counts
+    
+    # Same rows the per-property checks would verify
+    conditions, params = verification_conditions(source, retry_api_only=retry_api_only)
+    
+    cursor = None
+    started = time.perf_counter()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT MIN(id), MAX(id) FROM properties WHERE {conditions}", params)
+        min_id, max_id = cursor.fetchone()
+        if min_id is None:
+            return counts
+        
+        for start_id in range(min_id, max_id + 1, PRE_VERIFY_CHUNK_SIZE):
+            end_id = start_id + PRE_VERIFY_CHUNK_SIZE - 1
+            for rule in rules:
+                query = f"""
+                UPDATE properties
+                SET is_verified = FALSE, failure_reason = %s
+                WHERE id BETWEEN %s AND %s AND {conditions} AND {rule.sql}
+                """
+                cursor.execute(query, [rule.failure_reason, start_id, end_id] + params + rule.sql_params)
+                counts[rule.name] += cursor.rowcount
+            connection.commit()
+        
+        logger.info(f"Pre-verified properties: {describe_counts(counts)}")
+        
+    except mysql.connector.Error as err:
+        logger.error(f"Error pre-verifying properties: {err}")
+        connection.rollback()
+    finally:
+        if cursor:
+            cursor.close()
+        progress_events.timing('db_pre_verify', time.perf_counter() - started)
     
-    # If we get here, the property passed all checks
-    return True, None
+    return counts
 
 def update_verification_status(property_id, is_verified, failure_reason=None):
     """Update verification status for a single property."""
+    updated, failed = batch_update_verification_status([{
+        'property_id': property_id,
+        'is_verified': is_verified,
+        'failure_reason': failure_reason
+    }])
+    
+    if updated:
+        logger.info(f"Updated verification status for property {property_id}: verified={is_verified}, reason={failure_reason}")
+    return updated > 0
+
+def batch_update_verification_status(update_batch):
+    """Update verification status for multiple properties in a single statement.
+    
+    Per-property values are picked with CASE property_id expressions, so
+    one UPDATE writes every outcome of the batch. Every result releases the
+    row's lease. An API_ERROR schedules the next attempt with exponential
+    backoff (RETRY_BASE_DELAY doubled per attempt, capped at
+    RETRY_MAX_DELAY), and the MAX_API_ATTEMPTS-th one moves the row to the
+    DEAD_LETTER failure reason so it is no longer retried.
+    
+    Returns (updated_count, failed_count).
+    """
+    if not update_batch:
+        return 0, 0
+    
     connection = db_connector.get_db_connection()
     if not connection:
-        logger.error(f"Cannot update verification status for {property_id}: No database connection")
-        return False
-        
+        logger.error("Cannot update verification status: No database connection")
+        return 0, len(update_batch)
+    
+    verified_cases, verified_params = [], []
+    reason_cases, reason_params = [], []
+    for item in update_batch:
+        verified_cases.append("WHEN %s THEN %s")
+        verified_params += [item['property_id'], bool(item['is_verified'])]
+        if not item['is_verified'] and item['failure_reason'] == 'API_ERROR':
+            reason_cases.append("WHEN %s THEN IF(attempt_count + 1 >= %s, 'DEAD_LETTER', 'API_ERROR')")
+            reason_params += [item['property_id'], MAX_API_ATTEMPTS]
+        else:
+            reason_cases.append("WHEN %s THEN %s")
+            reason_params += [item['property_id'], None if item['is_verified'] else item['failure_reason']]
+    property_ids = [item['property_id'] for item in update_batch]
+    
+    # MySQL applies single-table assignments left to right, so next_attempt_at
+    # and attempt_count see the new failure_reason and the old attempt_count
+    query = f"""
+    UPDATE properties
+    SET is_verified = CASE property_id {' '.join(verified_cases)} END,
+        failure_reason = CASE property_id {' '.join(reason_cases)} END,
+        next_attempt_at = IF(failure_reason = 'API_ERROR', NOW() + INTERVAL LEAST(%s * POW(2, attempt_count), %s) SECOND, NULL),
+        attempt_count = attempt_count + IF(failure_reason IN ('API_ERROR', 'DEAD_LETTER'), 1, 0),
+        claimed_by = NULL,
+        lease_until = NULL
+    WHERE property_id IN ({', '.join(['%s'] * len(property_ids))})
+    """
+    params = verified_params + reason_params + [RETRY_BASE_DELAY, RETRY_MAX_DELAY] + property_ids
+    
     for retry in range(MAX_RETRIES):
+        cursor = None
         try:
             cursor = connection.cursor()
-            
-            # Update the property status
-            if is_verified:
-                query = "UPDATE properties SET is_verified = TRUE, failure_reason = NULL WHERE property_id = %s"
-                cursor.execute(query, (property_id,))
-            else:
-                if failure_reason:
-                    query = "UPDATE properties SET is_verified = FALSE, failure_reason = %s WHERE property_id = %s"
-                    cursor.execute(query, (failure_reason, property_id))
-                else:
-                    query = "UPDATE properties SET is_verified = FALSE, failure_reason = NULL WHERE property_id = %s"
-                    cursor.execute(query, (property_id,))
+            cursor.execute(query, params)
             
             # Commit the transaction
             connection.commit()
             
-            if cursor.rowcount > 0:
-                logger.info(f"Updated verification status for property {property_id}: verified={is_verified}, reason={failure_reason}")
-                cursor.close()
-                return True
-            else:
-                logger.warning(f"Property {property_id} not found in database")
-                cursor.close()
-                return False
+            # rowcount only counts rows whose values changed, so a row that
+            # already held this result would look missing. The statement
+            # covers every id sent, so once it commits the whole batch is written.
+            updated_count = len(update_batch)
+            logger.info(f"Batch updated {updated_count} properties successfully")
+            return updated_count, 0
                 
         except mysql.connector.Error as err:
-            logger.error(f"Error updating verification status for property {property_id}: {err}")
+            logger.error(f"Error in batch update: {err}")
             if retry < MAX_RETRIES - 1:
                 logger.info(f"Retrying... ({retry + 1}/{MAX_RETRIES})")
                 time.sleep(1)  # Wait before retrying
                 # Try to get a fresh connection
                 connection = db_connector.get_db_connection()
                 if not connection:
-                    return False
+                    return 0, len(update_batch)
             else:
                 logger.error("Max retries reached. Giving up.")
-                return False
         finally:
-            if 'cursor' in locals() and cursor:
+            if cursor:
                 cursor.close()
     
-    return False
+    return 0, len(update_batch)
 
-def batch_update_verification_status(update_batch):
-    """Update verification status for multiple properties in a single batch."""
-    if not update_batch:
-        return 0, 0
+def renew_leases(property_ids, worker_id=WORKER_ID):
+    """Extend the leases this checker holds on property_ids by LEASE_SECONDS, returns the rows renewed."""
+    if not property_ids:
+        return 0
     
     connection = db_connector.get_db_connection()
     if not connection:
-        logger.error("Cannot update verification status: No database connection")
-        return 0, len(update_batch)
-        
-    # Separate the data for verified and non-verified properties
-    verified_ids = [item['property_id'] for item in update_batch if item['is_verified']]
-    
-    # Group non-verified properties by failure reason
-    failure_groups = {}
-    for item in update_batch:
-        if not item['is_verified']:
-            reason = item['failure_reason']
-            if reason not in failure_groups:
-                failure_groups[reason] = []
-            failure_groups[reason].append(item['property_id'])
-    
-    updated_count = 0
-    failed_count = 0
+        logger.error("Cannot renew leases: No database connection")
+        return 0
     
+    cursor = None
     try:
         cursor = connection.cursor()
-        
-        # Update verified properties in one query
-        if verified_ids:
-            verified_placeholders = ', '.join(['%s'] * len(verified_ids))
-            verified_query = f"UPDATE properties SET is_verified = TRUE, failure_reason = NULL WHERE property_id IN ({verified_placeholders})"
-            cursor.execute(verified_query, verified_ids)
-            updated_count += cursor.rowcount
-            
-        # Update each group of non-verified properties with the same failure reason
-        for reason, ids in failure_groups.items():
-            if ids:
-                failure_placeholders = ', '.join(['%s'] * len(ids))
-                if reason is None:
-                    failure_query = f"UPDATE properties SET is_verified = FALSE, failure_reason = NULL WHERE property_id IN ({failure_placeholders})"
-                    cursor.execute(failure_query, ids)
-                else:
-                    failure_query = f"UPDATE properties SET is_verified = FALSE, failure_reason = %s WHERE property_id IN ({failure_placeholders})"
-                    cursor.execute(failure_query, [reason] + ids)
-                updated_count += cursor.rowcount
-        
-        # Commit the transaction
+        placeholders = ', '.join(['%s'] * len(property_ids))
+        cursor.execute(
+            f"UPDATE properties SET lease_until = NOW() + INTERVAL %s SECOND WHERE claimed_by = %s AND property_id IN ({placeholders})",
+            [LEASE_SECONDS, worker_id] + list(property_ids)
+        )
+        renewed = cursor.rowcount
         connection.commit()
-        logger.info(f"Batch updated {updated_count} properties successfully")
-        
-        # Count any missing property IDs
-        total_in_batch = len(update_batch)
-        if updated_count < total_in_batch:
-            failed_count = total_in_batch - updated_count
-            logger.warning(f"Failed to update {failed_count} properties (not found in database)")
-            
+        logger.info(f"Renewed leases of {renewed} properties still being checked")
+        return renewed
+    
     except mysql.connector.Error as err:
-        logger.error(f"Error in batch update: {err}")
+        logger.error(f"Error renewing leases: {err}")
         connection.rollback()
-        failed_count = len(update_batch)
+        return 0
     finally:
-        cursor.close()
+        if cursor:
+            cursor.close()
+
+class VerificationResultWriter:
+    """Buffers verification results and writes them with batch_update_verification_status.
+    
+    A flush happens once DB_BATCH_SIZE results are buffered or the oldest
+    buffered result is DB_FLUSH_INTERVAL seconds old, so results aren't held
+    in memory through slow stretches of API calls. Only call it from the
+    thread that owns the database connection.
     
-    return updated_count, failed_count
+    Rows passed to hold() are claimed rows still waiting for a result. Their
+    leases are renewed every LEASE_RENEW_INTERVAL seconds until their result
+    is added, so a batch slowed down by the rate limiter or the circuit
+    breaker isn't reclaimed by another checker halfway through.
+    """
 
-def process_single_property(prop, update_batch):
-    """Process a single property for verification."""
+    def __init__(self, batch_size=None, flush_interval=None, worker_id=WORKER_ID):
+        self.batch_size = batch_size or DB_BATCH_SIZE
+        self.flush_interval = flush_interval or DB_FLUSH_INTERVAL
+        self.worker_id = worker_id
+        self.results = []
+        self.first_added = None
+        self.held = set()
+        self.last_renewal = None
+        self.updated = 0
+        self.failed = 0
+
+    def hold(self, property_ids):
+        """Keep renewing the leases of claimed rows until their results are added."""
+        if not self.held:
+            self.last_renewal = time.time()
+        self.held.update(property_ids)
+
+    def add(self, property_id, is_verified, failure_reason):
+        """Buffer a result, flushing if the batch is full or due."""
+        if not self.results:
+            self.first_added = time.time()
+        self.results.append({
+            'property_id': property_id,
+            'is_verified': is_verified,
+            'failure_reason': failure_reason
+        })
+        self.held.discard(property_id)
+        self.flush_if_due()
+
+    def seconds_until_due(self):
+        """Seconds until results must be flushed or leases renewed, or None if neither is pending."""
+        deadlines = []
+        if self.results:
+            deadlines.append(self.first_added + self.flush_interval)
+        if self.held:
+            deadlines.append(self.last_renewal + LEASE_RENEW_INTERVAL)
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.time(), 0)
+
+    def flush_if_due(self):
+        now = time.time()
+        if len(self.results) >= self.batch_size or (self.results and self.first_added + self.flush_interval <= now):
+            self.flush()
+        if self.held and self.last_renewal + LEASE_RENEW_INTERVAL <= now:
+            self.renew()
+
+    def renew(self):
+        """Extend the leases of the held rows."""
+        self.last_renewal = time.time()
+        with progress_events.timed('db_write'):
+            renew_leases(sorted(self.held), self.worker_id)
+
+    def flush(self):
+        """Write all buffered results, returning (updated, failed) for this flush."""
+        if not self.results:
+            return 0, 0
+        results, self.results = self.results, []
+        with progress_events.timed('db_write'):
+            updated, failed = batch_update_verification_status(results)
+        self.updated += updated
+        self.failed += failed
+        logger.info(f"Processed batch update of {updated} properties")
+        return updated, failed
+
+def empty_verification_counts():
+    """Return a zeroed result counts dict."""
+    counts = {'verified': 0, 'failed': 0, 'api_error': 0, 'not_interested': 0}
+    counts.update((counter, 0) for counter in verification_rules.LOCAL_COUNTERS)
+    return counts
+
+def count_verification_result(result, is_verified, failure_reason):
+    """Add a verification outcome to a result counts dict."""
+    if is_verified:
+        result['verified'] += 1
+    else:
+        result['failed'] += 1
+        
+        # Count by failure reason
+        if failure_reason:
+            counter = verification_rules.failure_counter(failure_reason)
+            result[counter] = result.get(counter, 0) + 1
+
+def describe_counts(counts):
+    """Format the non-zero failure counters of a counts dict, e.g. "12 square footage, 3 no address"."""
+    skip = ('verified', 'failed')
+    parts = [f"{count} {counter.replace('_', ' ')}" for counter, count in counts.items() if counter not in skip and count]
+    return ", ".join(parts) or "none"
+
+def load_property_for_verification(prop):
+    """Return the property's row if it needs verifying, otherwise None.
+    
+    Rows from get_properties_to_verify already carry the columns
+    verify_property needs, so they are passed straight through.
+    """
     property_id = prop['property_id']
-    result = {
-        'verified': 0,
-        'failed': 0,
-        'api_error': 0,
-        'square_footage': 0,
-        'not_interested': 0,
-        'no_address': 0
-    }
     
     # Skip already verified properties
     if prop.get('is_verified'):
         logger.info(f"Skipping already verified property {property_id}")
-        return result
+        return None
         
     # For properties with API_ERROR, we want to retry
     # For other failure reasons, skip them
     if prop.get('failure_reason') and prop.get('failure_reason') != 'API_ERROR':
         logger.info(f"Skipping property {property_id} with permanent failure reason: {prop.get('failure_reason')}")
-        return result
+        return None
     
-    # Get detailed property information
-    property_details = get_property_details(property_id)
+    return prop
+
+def process_single_property(prop, update_batch):
+    """Process a single property for verification."""
+    result = empty_verification_counts()
     
+    property_details = load_property_for_verification(prop)
     if not property_details:
-        logger.warning(f"Could not retrieve details for property {property_id}")
         return result
     
-    # Add a small random delay to avoid overloading the system and API rate limits
-    time.sleep(random.uniform(0.1, 0.3))
-    
-    # Verify the property
+    # Verify the property (verify_property waits for the API rate limiter)
     is_verified, failure_reason = verify_property(property_details)
     
     # Add to update batch instead of updating immediately
     update_batch.append({
-        'property_id': property_id,
+        'property_id': prop['property_id'],
         'is_verified': is_verified,
         'failure_reason': failure_reason
     })
     
     # Update result counts
-    if is_verified:
-        result['verified'] = 1
-    else:
-        result['failed'] = 1
-        
-        # Count by failure reason
-        if failure_reason == 'API_ERROR':
-            result['api_error'] = 1
-        elif failure_reason == 'SQUARE_FOOTAGE':
-            result['square_footage'] = 1
-        elif failure_reason == 'NOT_INTERESTED':
-            result['not_interested'] = 1
-        elif failure_reason == 'NO_ADDRESS':
-            result['no_address'] = 1
+    count_verification_result(result, is_verified, failure_reason)
     
     return result
 
-def process_verification_batch(properties):
-    """Process a batch of properties for verification sequentially."""
+def process_verification_batch(properties, threads=None):
+    """Process a batch of properties for verification concurrently.
+    
+    SFR3 API checks run in a pool of threads (verification_threads by
+    default) under the shared api_rate_limiter. Database reads and the
+    batched status updates stay on the calling thread, since the app-wide
+    connection can't be shared between threads.
+    """
+    total_results = empty_verification_counts()
+    
     if not db_connector.get_db_connection():
         logger.error("Cannot process verification batch: No database connection")
-        return {
-            'verified': 0,
-            'failed': 0,
-            'api_error': 0,
-            'square_footage': 0,
-            'not_interested': 0,
-            'no_address': 0
-        }
-    
-    total_results = {
-        'verified': 0,
-        'failed': 0,
-        'api_error': 0,
-        'square_footage': 0,
-        'not_interested': 0,
-        'no_address': 0
-    }
-    
-    # Batch for database updates
-    update_batch = []
-    updates_processed = 0
+        return total_results
+    
+    threads = max(1, threads or verification_threads)
+    
+    # Results are written in bulk as they come in
+    writer = VerificationResultWriter()
         
     try:
+        # Load the properties that need verifying
+        pending = []
         for prop in properties:
             try:
-                result = process_single_property(prop, update_batch)
-                # Update total counts
-                for key in total_results:
-                    total_results[key] += result.get(key, 0)
-                
-                # Check if we need to process a batch of updates
-                if len(update_batch) >= DB_BATCH_SIZE:
-                    updated, failed = batch_update_verification_status(update_batch)
-                    updates_processed += updated
-                    update_batch = []  # Clear the batch
-                    logger.info(f"Processed batch update of {updated} properties")
-            except StopVerificationError as stop_err:
-                # Halting verification process due to too many API errors
-                # Log the warning and break out of the loop
-                property_id = prop.get('property_id', 'unknown')
-                logger.warning(f"Verification process stopped at property {property_id}: {str(stop_err)}")
-                
-                # Process any remaining updates before exiting
-                if update_batch:
-                    updated, failed = batch_update_verification_status(update_batch)
-                    updates_processed += updated
-                
-                # Add special "server_overload" key to the results to indicate we stopped due to API errors
-                total_results['server_overload'] = True
-                total_results['stop_message'] = str(stop_err)
-                
-                # Exit the loop
-                break
+                property_details = load_property_for_verification(prop)
+                if property_details:
+                    pending.append(property_details)
             except Exception as exc:
-                property_id = prop.get('property_id', 'unknown')
-                logger.error(f"Property {property_id} generated an exception: {exc}")
+                logger.error(f"Property {prop.get('property_id', 'unknown')} generated an exception: {exc}")
         
-        # Process any remaining updates
-        if update_batch:
-            updated, failed = batch_update_verification_status(update_batch)
-            updates_processed += updated
-            logger.info(f"Processed final batch update of {updated} properties")
+        # Keep the claimed rows leased however long their API checks take
+        writer.hold(details['property_id'] for details in pending)
+        
+        # Fail what the local rules reject across the whole batch, only the rest need the API
+        pending, rejected = rule_pipeline.reject_locally(pending)
+        for details, failure_reason in rejected:
+            writer.add(details['property_id'], False, failure_reason)
+            count_verification_result(total_results, False, failure_reason)
+        
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            futures = {executor.submit(verify_property, details, False): details for details in pending}
+            not_done = set(futures)
+            
+            while not_done:
+                # Wake up when a check finishes or the buffered results are due for a flush
+                done, not_done = wait(not_done, timeout=writer.seconds_until_due(), return_when=FIRST_COMPLETED)
+                
+                for future in done:
+                    property_id = futures[future].get('property_id', 'unknown')
+                    try:
+                        is_verified, failure_reason = future.result()
+                    except Exception as exc:
+                        logger.error(f"Property {property_id} generated an exception: {exc}")
+                        continue
+                    
+                    writer.add(property_id, is_verified, failure_reason)
+                    count_verification_result(total_results, is_verified, failure_reason)
+                
+                writer.flush_if_due()
     
     except Exception as e:
         logger.error(f"Error processing verification batch: {e}")
     
+    finally:
+        # Write the remaining results, including those checked before an error
+        writer.flush()
+    
     return total_results
 
 def add_failure_reason_column():
@@ -710,9 +1063,11 @@ def parse_arguments():
     parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
                         help=f"Number of properties to process in each batch (default: {DEFAULT_BATCH_SIZE})")
     
-    # Keep the threads parameter for backward compatibility but ignore it
-    parser.add_argument("--threads", type=int, 
-                        help="Ignored - for backward compatibility only. Processing is now sequential.")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADS,
+                        help=f"Number of concurrent SFR3 API checks (default: {DEFAULT_THREADS})")
+    
+    parser.add_argument("--rate", type=float, default=API_REQUESTS_PER_SECOND,
+                        help=f"Starting SFR3 API requests per second across all threads, adjusted to the server's responses (default: {API_REQUESTS_PER_SECOND})")
     
     parser.add_argument("--source", type=str, 
                         help="Filter properties by source (e.g., 'realtor', 'zillow')")
@@ -724,11 +1079,20 @@ def parse_arguments():
                         help="Only process properties that failed with API_ERROR")
     
     parser.add_argument("--skip-failed", action="store_true",
-                        help="Skip properties that have failed for reasons other than API_ERROR")
+                        help="Deprecated, has no effect: properties with permanent failure reasons are always skipped")
     
     parser.add_argument("--db-batch-size", type=int, default=DB_BATCH_SIZE,
                         help=f"Size of database update batches (default: {DB_BATCH_SIZE})")
     
+    parser.add_argument("--rules", type=str, default=verification_rules.RULES_FILE,
+                        help="JSON file with the buy box thresholds (default: verification_rules.json)")
+    
+    parser.add_argument("--stream", action="store_true",
+                        help="Keep running and verify new listings as the scrapers insert them, instead of working through the backlog")
+    
+    parser.add_argument("--poll-interval", type=float, default=STREAM_POLL_INTERVAL,
+                        help=f"Seconds between checks for new listings with --stream (default: {STREAM_POLL_INTERVAL})")
+    
     # Handle legacy command-line format for backward compatibility
     args, unknown = parser.parse_known_args()
     
@@ -740,7 +1104,7 @@ def parse_arguments():
         elif sys.argv[1].lower() == '--skip-failed' and not args.skip_failed:
             args.skip_failed = True
         elif sys.argv[1].lower().startswith('--threads'):
-            # Ignore --threads argument in old-style format
+            # --threads is handled by the parser above
             pass
         elif sys.argv[1].isdigit() and not args.limit:
             args.limit = int(sys.argv[1])
@@ -753,31 +1117,48 @@ def parse_arguments():
     
     return args
 
+def print_circuit_state(old_state, new_state, breaker):
+    if new_state == circuit_breaker.OPEN:
+        print(f"⏸️ SFR3 API keeps failing, pausing verification for {breaker.cool_down:.0f}s")
+    elif new_state == circuit_breaker.CLOSED:
+        print("▶️ SFR3 API recovered, resuming verification")
+
 def main():
     print("🔍 Starting SFR3 Property Verification Process")
     
     # Parse command-line arguments
     args = parse_arguments()
+    if args.skip_failed:
+        print("⚠️ --skip-failed is deprecated and has no effect: properties with permanent failure reasons are always skipped")
     
     # Extract arguments
     batch_size = args.batch_size
     source = args.source
     total_properties = args.limit
-    include_failed = not args.skip_failed
     retry_api_only = args.retry_api_only
+    stream = args.stream
     
     # Update the global DB_BATCH_SIZE if specified
     global DB_BATCH_SIZE
     if args.db_batch_size and args.db_batch_size != DB_BATCH_SIZE:
         DB_BATCH_SIZE = args.db_batch_size
     
+    # Configure concurrent verification
+    global verification_threads
+    verification_threads = max(1, args.threads or DEFAULT_THREADS)
+    api_rate_limiter.set_rate(args.rate)
+    
+    # Load the buy box
+    global rule_pipeline
+    if args.rules != verification_rules.RULES_FILE:
+        rule_pipeline = build_rule_pipeline(args.rules)
+    
     # Reset API counter at start
     global api_request_counter
     api_request_counter = 0
     
-    # Reset consecutive API errors counter
-    global consecutive_api_errors
-    consecutive_api_errors = 0
+    # Start with a closed circuit breaker
+    api_circuit_breaker.reset()
     
     # Ensure we have a valid database connection
     if not db_connector.get_db_connection():
@@ -787,76 +1168,71 @@ def main():
     # Display configuration
     print(f"⚙️ Configuration:")
     print(f"   Batch Size: {batch_size} properties")
-    print(f"   Sequential processing (shared app-wide connection)")
+    print(f"   Threads: {verification_threads} concurrent SFR3 API checks")
     print(f"   DB Update Batch Size: {DB_BATCH_SIZE}")
-    print(f"   API Rate Limits: Pause for 10s every 10 requests")
+    print(f"   API Rate: starting at {api_rate_limiter.rate} requests per second ({MIN_API_RATE}-{MAX_API_RATE}, adaptive)")
+    print(f"   Rules: {', '.join(rule.name for rule in rule_pipeline.rules)}")
     if source:
         print(f"   Source Filter: {source}")
     if total_properties:
         print(f"   Property Limit: {total_properties}")
-    if retry_api_only:
+    if stream:
+        print(f"   Streaming new listings from the verification outbox, polling every {args.poll_interval}s")
+        if source or retry_api_only:
+            print("   --source and --retry-api-only don't apply to --stream, every new listing is verified")
+    elif retry_api_only:
         print("   Processing only properties with API errors")
-    elif not include_failed:
-        print("   Skipping properties with permanent failure reasons")
     
     # Debug parameter info
-    logger.info(f"Running with parameters: batch_size={batch_size}, source={source}, limit={total_properties}, include_failed={include_failed}, retry_api_only={retry_api_only}")
+    logger.info(f"Running with parameters: batch_size={batch_size}, source={source}, limit={total_properties}, retry_api_only={retry_api_only}")
     
     # Show warning for large property limits
     if total_properties and total_properties > RECOMMENDED_LIMIT:
         print(f"⚠️ Warning: Processing more than {RECOMMENDED_LIMIT} properties at once may take a long time.")
         print(f"   Consider using a smaller limit for better performance and to avoid API rate limits.")
     
+    # Announce pauses and resumes of the circuit breaker
+    api_circuit_breaker.add_listener(print_circuit_state)
+    
     try:
         # Add failure_reason column if it doesn't exist
         add_failure_reason_column()
         
         properties_verified = 0
-        total_counts = {
-            'verified': 0,
-            'failed': 0,
-            'api_error': 0,
-            'square_footage': 0,
-            'not_interested': 0,
-            'no_address': 0
-        }
-        
-        server_overload_detected = False
-        overload_message = ""
+        total_counts = empty_verification_counts()
         
-        # Process properties in batches
-        while True:
-            # If we have a total limit, adjust the batch size for the last batch
-            if total_properties is not None:
-                remaining = total_properties - properties_verified
-                if remaining <= 0:
-                    print(f"✅ Reached the limit of {total_properties} properties. Process complete.")
-                    break
-                    
-                # Adjust batch size for last batch if needed
-                current_batch_size = min(batch_size, remaining)
-            else:
-                current_batch_size = batch_size
+        if stream:
+            # New listings arrive through the outbox, the backlog is left to batch runs
+            batches = iter_outbox_properties(batch_size, args.poll_interval, total_properties)
+            print("📡 Waiting for new listings...")
+        else:
+            # Key properties inserted before duplicate detection, so duplicates leave the queue
+            linked = db_connector.backfill_address_keys()
+            if linked:
+                print(f"🔗 Linked {linked} duplicate listings to their canonical property")
             
-            properties = get_properties_to_verify(current_batch_size, source, include_failed, retry_api_only)
+            # Classify properties that fail without an API call in a few set-based UPDATEs
+            pre_verified = pre_verify_local_rules(source, retry_api_only)
+            pre_verified_count = sum(pre_verified.values())
+            if pre_verified_count:
+                print(f"⚡ Pre-verified {pre_verified_count} properties without the API: {describe_counts(pre_verified)}")
+                total_counts['failed'] += pre_verified_count
+                for counter, count in pre_verified.items():
+                    total_counts[counter] += count
             
-            if not properties:
-                print("✅ No more properties to verify. Process complete.")
-                break
+            # Listings that failed for missing data hand the verification to a duplicate
+            promoted = db_connector.relink_failed_canonicals()
+            if promoted:
+                print(f"🔗 Relinked {promoted} duplicate listings whose canonical listing failed a local rule")
             
-            print(f"🔄 Processing batch of {len(properties)} properties sequentially...")
+            # Walk the queue once
+            batches = iter_properties_to_verify(batch_size, source, retry_api_only=retry_api_only, limit=total_properties)
+        
+        # Process properties in batches
+        for properties in batches:
+            print(f"🔄 Processing batch of {len(properties)} properties with {verification_threads} threads...")
             batch_counts = process_verification_batch(properties)
             
-            # Check if verification was stopped due to too many API errors
-            if batch_counts.get('server_overload', False):
-                server_overload_detected = True
-                overload_message = batch_counts.get('stop_message', "Too many consecutive API errors")
-                # Remove these special keys before updating the counts
-                batch_counts.pop('server_overload', None)
-                batch_counts.pop('stop_message', None)
-                print(f"⚠️ Warning: {overload_message}")
-                print(f"❌ Verification process stopped due to server overload. Please try again later.")
-            
             properties_verified += len(properties)
             
             # Update total counts
@@ -865,35 +1241,32 @@ def main():
             
             print(f"📊 Batch results: {batch_counts['verified']} verified, {batch_counts['failed']} failed verification")
             print(f"📊 Total progress: {properties_verified} / {total_properties if total_properties else 'all'} properties processed")
-            print(f"   Failure breakdown: {batch_counts['square_footage']} square footage, "
-                 f"{batch_counts['not_interested']} not interested, "
-                 f"{batch_counts['no_address']} no address, "
-                 f"{batch_counts['api_error']} API errors")
-            
-            # Stop processing if server overload was detected
-            if server_overload_detected:
-                break
-                
-                # Add a smaller delay between batches
-                time.sleep(1)
+            print(f"   Failure breakdown: {describe_counts(batch_counts)}")
+        
+        if not stream:
+            # Queued listings this run verified no longer need the streaming verifier
+            db_connector.prune_verification_outbox()
+        
+        if total_properties is not None and properties_verified >= total_properties:
+            print(f"✅ Reached the limit of {total_properties} properties. Process complete.")
+        else:
+            print("✅ No more properties to verify. Process complete.")
     
     except KeyboardInterrupt:
         print("\n⚠️ Verification process interrupted by user.")
     except Exception as e:
         logger.error(f"Error during verification process: {e}")
         print(f"❌ An error occurred: {e}")
+    finally:
+        api_circuit_breaker.remove_listener(print_circuit_state)
     
     print(f"📈 Summary: {total_counts['verified']} verified, {total_counts['failed']} failed verification")
     print(f"📊 Total properties processed: {properties_verified} / {total_properties if total_properties else 'all'}")
-    print(f"   Failure breakdown: {total_counts['square_footage']} square footage, "
-         f"{total_counts['not_interested']} not interested, "
-         f"{total_counts['no_address']} no address, "
-         f"{total_counts['api_error']} API errors")
-    
-    if server_overload_detected:
-        print(f"\n❌ IMPORTANT: Verification stopped early due to server overload.")
-        print(f"   {overload_message}")
-        print(f"   Please wait for some time before trying again.")
+    print(f"   Failure breakdown: {describe_counts(total_counts)}")
+    
+    times_paused = api_circuit_breaker.snapshot()['times_opened']
+    if times_paused:
+        print(f"⏸️ Verification paused {times_paused} times while the SFR3 API was failing")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
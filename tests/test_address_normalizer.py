@@ -0,0 +1,39 @@
+import pytest
+
+import address_normalizer
+
+# Address -> expected canonical form
+KNOWN_CASES = {
+    "123 North Main Street Apt 4, Columbus, OH 43215": "123 n main st unit 4|columbus|oh|43215",
+    "123 N. Main St #4, Columbus, OH 43215-1234": "123 n main st unit 4|columbus|oh|43215",
+    "45 Stevens Rd apt4b, Atlanta, GA 30303": "45 stevens rd unit 4b|atlanta|ga|30303",
+    "100 Main St Suite 200, Columbus, OH 43215": "100 main st unit 200|columbus|oh|43215",
+    "100 Main St N Ste 2, Columbus, OH 43215": "100 main st n unit 2|columbus|oh|43215",
+    "PO Box 12345, Dayton, OH 45402": "po box 12345|dayton|oh|45402",
+    # Street names that are also unit designators
+    "1 Suite Rd, X, CA 90001": "1 suite rd|x|ca|90001",
+    "5 Lot Ln #3, a, TX 78701": "5 lot ln unit 3|a|tx|78701",
+    "7 Space Way, Atlanta, GA 30303": "7 space way|atlanta|ga|30303",
+    "9 Floor St Room 12, Dayton, OH 45402": "9 floor st unit 12|dayton|oh|45402",
+    # Spelled-out states
+    "123 Main St, Columbus, Ohio 43215": "123 main st|columbus|oh|43215",
+    "1 Main St, Charleston, West Virginia 25301-1234": "1 main st|charleston|wv|25301",
+    "12 A St, New York, New York 10001": "12 a st|new york|ny|10001",
+    "5 Elm St, Kansas City, Missouri": "5 elm st|kansas city|mo|",
+    # Placeholder street lines
+    "None, Columbus, OH 43215": "|columbus|oh|43215",
+    "Undisclosed address, Columbus, OH 43215": "|columbus|oh|43215",
+    "Address Not Disclosed, Columbus, Ohio 43215": "|columbus|oh|43215"
+}
+
+@pytest.mark.parametrize("address, expected", KNOWN_CASES.items())
+def test_canonical_address(address, expected):
+    assert address_normalizer.canonical_address(address) == expected
+
+def test_state_name_and_code_share_a_key():
+    assert address_normalizer.address_key("123 Main St, Columbus, Ohio 43215") == \
+        address_normalizer.address_key("123 Main Street, Columbus, OH 43215-1234")
+
+@pytest.mark.parametrize("address", ["None, Columbus, OH 43215", "Undisclosed address, Columbus, OH 43215", "None", ""])
+def test_placeholder_has_no_street(address):
+    assert address_normalizer.canonicalize(address).street == ""
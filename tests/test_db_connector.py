@@ -0,0 +1,39 @@
+import pytest
+
+import db_connector
+
+class RecordingCursor:
+    """Cursor that records the statements it is given."""
+
+    def __init__(self):
+        self.statements = []
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.statements.append((query, params))
+
+@pytest.mark.parametrize("first, second", [
+    ("None, Columbus, OH 43215", "None, Columbus, OH 43215"),
+    ("Undisclosed address, Columbus, OH 43215", "Address not disclosed, Columbus, OH 43215"),
+    ("Main St, Columbus, OH 43215", "Main Street, Columbus, OH 43215"),
+    ("", "")
+])
+def test_listings_without_house_number_stay_unlinked(first, second):
+    keys = [db_connector.property_address_key(first), db_connector.property_address_key(second)]
+    assert keys == [db_connector.NO_STREET_KEY, db_connector.NO_STREET_KEY]
+
+    cursor = RecordingCursor()
+    assert db_connector.link_duplicate_properties(cursor, keys) == 0
+    assert cursor.statements == []
+
+def test_same_house_from_two_sources_is_linked():
+    keys = [
+        db_connector.property_address_key("123 North Main Street, Columbus, Ohio 43215"),
+        db_connector.property_address_key("123 N Main St, Columbus, OH 43215-1234")
+    ]
+    assert keys[0] == keys[1] != db_connector.NO_STREET_KEY
+
+    cursor = RecordingCursor()
+    db_connector.link_duplicate_properties(cursor, keys)
+    assert len(cursor.statements) == 1
+    assert cursor.statements[0][1][-1:] == [keys[0]]
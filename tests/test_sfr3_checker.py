@@ -0,0 +1,87 @@
+import pytest
+
+import sfr3_checker
+
+class FakeResponse:
+    def __init__(self, status_code, message="", headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.message = message
+
+    def json(self):
+        return {"message": self.message, "interested": True}
+
+@pytest.fixture
+def api(monkeypatch):
+    """Serve check-address calls from a list of responses, with a fresh rate limiter and circuit breaker."""
+    responses = []
+    monkeypatch.setattr(sfr3_checker.requests, "get", lambda *args, **kwargs: responses.pop(0))
+    monkeypatch.setattr(sfr3_checker, "api_rate_limiter", sfr3_checker.ApiRateLimiter(5.0))
+    sfr3_checker.api_circuit_breaker.reset()
+    yield responses
+    sfr3_checker.api_circuit_breaker.reset()
+
+def test_server_error_lowers_the_rate(api):
+    api.extend([FakeResponse(500), FakeResponse(500)])
+    response = sfr3_checker.check_address("1 Main St, Columbus, OH 43215", 1)
+    assert response.status_code == 500
+    assert sfr3_checker.api_rate_limiter.rate < 5.0
+    # Retried once, and the failure before the retry already counts towards the breaker
+    assert api == []
+    assert sfr3_checker.api_circuit_breaker.consecutive_failures == 1
+
+def test_server_error_is_retried_once(api):
+    api.extend([FakeResponse(502), FakeResponse(200)])
+    assert sfr3_checker.check_address("1 Main St, Columbus, OH 43215", 1).status_code == 200
+
+@pytest.mark.parametrize("throttled", [
+    FakeResponse(429),
+    FakeResponse(400, "Too many requests"),
+    FakeResponse(503, headers={"Retry-After": "0"})
+])
+def test_throttled_response_is_retried(api, throttled):
+    api.extend([throttled, FakeResponse(200)])
+    assert sfr3_checker.check_address("1 Main St, Columbus, OH 43215", 1).status_code == 200
+    assert sfr3_checker.api_circuit_breaker.consecutive_failures == 0
+
+def test_batch_flushes_results_checked_before_an_error(monkeypatch):
+    written = []
+    def record(results):
+        written.extend(results)
+        return len(results), 0
+    def fail_counting(*args):
+        raise RuntimeError("counting failed")
+    monkeypatch.setattr(sfr3_checker.db_connector, "get_db_connection", lambda: object())
+    monkeypatch.setattr(sfr3_checker, "load_property_for_verification", dict)
+    monkeypatch.setattr(sfr3_checker.rule_pipeline, "reject_locally", lambda pending: (pending, []))
+    monkeypatch.setattr(sfr3_checker, "verify_property", lambda details, _: (True, None))
+    monkeypatch.setattr(sfr3_checker, "count_verification_result", fail_counting)
+    monkeypatch.setattr(sfr3_checker, "batch_update_verification_status", record)
+    sfr3_checker.process_verification_batch([{"property_id": 7}], threads=1)
+    assert [result["property_id"] for result in written] == [7]
+
+class UnchangedRowsConnection:
+    """Connection whose UPDATEs match every row but change none of them."""
+
+    class Cursor:
+        rowcount = 0
+
+        def execute(self, query, params=None):
+            pass
+
+        def close(self):
+            pass
+
+    def cursor(self):
+        return self.Cursor()
+
+    def commit(self):
+        pass
+
+def test_batch_update_counts_rows_that_already_held_the_result(monkeypatch):
+    monkeypatch.setattr(sfr3_checker.db_connector, "get_db_connection", UnchangedRowsConnection)
+    results = [
+        {"property_id": 1, "is_verified": True, "failure_reason": None},
+        {"property_id": 2, "is_verified": False, "failure_reason": "NOT_INTERESTED"}
+    ]
+    assert sfr3_checker.batch_update_verification_status(results) == (2, 0)
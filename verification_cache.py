@@ -0,0 +1,101 @@
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import Future
+import address_normalizer
+import db_connector
+import progress_events
+
+logger = logging.getLogger("verification_cache")
+
+# Constants
+LRU_SIZE = 10000  # Addresses kept in the in-process cache
+OUTCOME_TTLS = {
+    "NOT_INTERESTED": 30 * 24 * 3600,  # SFR3 rarely changes its mind about a house it passed on
+    "VERIFIED": 7 * 24 * 3600  # Interest can lapse, so re-check interested houses sooner
+}
+
+# In-process LRU of address_key -> (outcome, expires_at)
+lru = collections.OrderedDict()
+# Lookups in progress, address_key -> Future shared by every caller of that address
+in_flight = {}
+lock = threading.Lock()
+
+def address_key(address):
+    """Return the cache key of an address, the hex of its 64-bit canonical key."""
+    return f"{address_normalizer.address_key(address):016x}"
+
+def _get_local(key):
+    with lock:
+        entry = lru.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del lru[key]
+            return None
+        lru.move_to_end(key)
+        return entry[0]
+
+def _put_local(key, outcome, ttl_seconds):
+    with lock:
+        lru[key] = (outcome, time.time() + ttl_seconds)
+        lru.move_to_end(key)
+        while len(lru) > LRU_SIZE:
+            lru.popitem(last=False)
+
+def _to_result(outcome):
+    return (True, None) if outcome == "VERIFIED" else (False, outcome)
+
+def get_or_check(address, check):
+    """Return the cached (is_verified, failure_reason) for an address, calling check() on a miss.
+    
+    Looks in the local LRU, then the verification_cache table. Concurrent
+    calls for the same address share one check() call. Only final SFR3
+    outcomes (verified or NOT_INTERESTED) are cached, each with its own TTL;
+    anything else, such as API_ERROR, is returned without being stored, and
+    addresses without a street are never cached.
+    """
+    # Placeholder addresses ("None, Columbus, OH") have no street and would all share one entry
+    if not address_normalizer.canonicalize(address).street:
+        return check()
+    
+    key = address_key(address)
+    outcome = _get_local(key)
+    if outcome is not None:
+        logger.info(f"Verification cache hit (memory) for {address}")
+        return _to_result(outcome)
+    
+    with lock:
+        future = in_flight.get(key)
+        leader = future is None
+        if leader:
+            future = in_flight[key] = Future()
+    
+    # Another thread is already looking this address up
+    if not leader:
+        return future.result()
+    
+    try:
+        with progress_events.timed('db_cache_lookup'):
+            cached = db_connector.get_cached_verification(key)
+        if cached:
+            outcome, seconds_left = cached
+            logger.info(f"Verification cache hit (database) for {address}")
+            _put_local(key, outcome, seconds_left)
+            result = _to_result(outcome)
+        else:
+            result = check()
+            is_verified, failure_reason = result
+            outcome = "VERIFIED" if is_verified else failure_reason
+            if outcome in OUTCOME_TTLS:
+                _put_local(key, outcome, OUTCOME_TTLS[outcome])
+                db_connector.save_cached_verification(key, address, outcome, OUTCOME_TTLS[outcome])
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with lock:
+            in_flight.pop(key, None)
@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+
+logger = logging.getLogger("verification_rules")
+
+# Constants
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "verification_rules.json")  # Buy box thresholds
+LOCAL_RULE_COST = 1  # Cost of a rule that compares columns of the row
+REMOTE_RULE_COST = 1000  # Cost of a rule that calls an external API
+
+# Buy box used when RULES_FILE is missing, None disables a rule
+DEFAULT_CONFIG = {
+    "min_square_footage": 800,
+    "min_bedrooms": None,
+    "min_price": None,
+    "max_price": None,
+    "min_year_built": None,
+    "property_types": None
+}
+
+class Rule:
+    """One verification check.
+
+    Local rules look only at the property row. They carry a SQL condition
+    matching the rows they reject, so a whole queue can be failed with one
+    UPDATE, and an equivalent Python predicate for rows already in memory.
+    Remote rules call an external service and only ever see rows that passed
+    every local rule.
+
+    evaluate(prop) returns None if the property passes, otherwise its
+    failure reason. Rules run in order of (remote, cost).
+    """
+
+    def __init__(self, name, failure_reason, cost=LOCAL_RULE_COST, remote=False, sql=None, sql_params=(), rejects=None, evaluate=None):
+        self.name = name  # Also the progress/result counter of the failure reason
+        self.failure_reason = failure_reason
+        self.cost = cost
+        self.remote = remote
+        self.sql = sql
+        self.sql_params = list(sql_params)
+        self._rejects = rejects
+        self._evaluate = evaluate
+
+    def evaluate(self, prop):
+        if self._evaluate is not None:
+            return self._evaluate(prop)
+        return self.failure_reason if self._rejects(prop) else None
+
+    def __repr__(self):
+        kind = "remote" if self.remote else "local"
+        return f"Rule({self.name}, {kind}, cost={self.cost})"
+
+def failure_counter(failure_reason):
+    """Return the result counter of a failure reason, e.g. SQUARE_FOOTAGE -> square_footage."""
+    return failure_reason.lower()
+
+def _number(value):
+    """Coerce a column value to a number, NULL and bad values count as 0."""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+def min_rule(name, failure_reason, column, minimum, unknown_fails=False):
+    """Reject rows whose column is below minimum.
+
+    A NULL or 0 value means the source didn't report it. It fails only with
+    unknown_fails, otherwise such rows are left for the next rule.
+    """
+    if unknown_fails:
+        sql = f"COALESCE({column}, 0) < %s"
+        rejects = lambda prop: _number(prop.get(column)) < minimum
+    else:
+        sql = f"{column} > 0 AND {column} < %s"
+        rejects = lambda prop: 0 < _number(prop.get(column)) < minimum
+    return Rule(name, failure_reason, sql=sql, sql_params=[minimum], rejects=rejects)
+
+def max_rule(name, failure_reason, column, maximum):
+    """Reject rows whose column is above maximum."""
+    return Rule(
+        name, failure_reason,
+        sql=f"{column} > %s", sql_params=[maximum],
+        rejects=lambda prop: _number(prop.get(column)) > maximum
+    )
+
+def property_type_rule(property_types):
+    """Reject rows whose property_type isn't one of property_types."""
+    allowed = list(property_types)
+    placeholders = ', '.join(['%s'] * len(allowed))
+    return Rule(
+        "property_type", "PROPERTY_TYPE",
+        sql=f"property_type NOT IN ({placeholders})", sql_params=allowed,
+        rejects=lambda prop: prop.get('property_type') is not None and prop.get('property_type') not in allowed
+    )
+
+def no_address_rule():
+    """Reject rows without an address, which no remote check can look up."""
+    return Rule(
+        "no_address", "NO_ADDRESS", cost=LOCAL_RULE_COST + 1,
+        sql="(address IS NULL OR address = '')",
+        rejects=lambda prop: not prop.get('address')
+    )
+
+def load_config(path=RULES_FILE):
+    """Load buy box thresholds from a JSON file over DEFAULT_CONFIG.
+
+    Keys missing from the file keep their default, and null turns a rule
+    off. A missing file means the defaults.
+    """
+    config = dict(DEFAULT_CONFIG)
+    try:
+        with open(path, encoding="utf-8") as f:
+            overrides = json.load(f)
+    except FileNotFoundError:
+        return config
+    except ValueError as e:
+        logger.error(f"Could not read verification rules {path}: {e}")
+        return config
+
+    unknown = set(overrides) - set(DEFAULT_CONFIG)
+    if unknown:
+        logger.warning(f"Ignoring unknown verification rule settings: {', '.join(sorted(unknown))}")
+    config.update({key: value for key, value in overrides.items() if key in DEFAULT_CONFIG})
+    return config
+
+def build_local_rules(config):
+    """Return the local rules enabled by a config dict."""
+    rules = []
+    if config.get("min_square_footage") is not None:
+        # Missing square footage has always failed this check
+        rules.append(min_rule("square_footage", "SQUARE_FOOTAGE", "square_footage", config["min_square_footage"], unknown_fails=True))
+    if config.get("min_bedrooms") is not None:
+        rules.append(min_rule("bedrooms", "BEDROOMS", "bedrooms", config["min_bedrooms"]))
+    if config.get("min_price") is not None:
+        rules.append(min_rule("price", "PRICE", "after_repair_value", config["min_price"]))
+    if config.get("max_price") is not None:
+        rules.append(max_rule("price", "PRICE", "after_repair_value", config["max_price"]))
+    if config.get("min_year_built") is not None:
+        rules.append(min_rule("year_built", "YEAR_BUILT", "year_built", config["min_year_built"]))
+    if config.get("property_types"):
+        rules.append(property_type_rule(config["property_types"]))
+    rules.append(no_address_rule())
+    return rules
+
+# Result counters of every local rule build_local_rules can create
+LOCAL_COUNTERS = ('square_footage', 'bedrooms', 'price', 'year_built', 'property_type', 'no_address')
+
+class RulePipeline:
+    """Runs rules cheapest first, local rules before remote ones."""
+
+    def __init__(self, rules):
+        # sorted() is stable, so rules of equal cost keep their given order
+        self.rules = sorted(rules, key=lambda rule: (rule.remote, rule.cost))
+        self.local_rules = [rule for rule in self.rules if not rule.remote]
+        self.remote_rules = [rule for rule in self.rules if rule.remote]
+
+    def reject_locally(self, properties):
+        """Apply the local rules to a whole batch, one rule at a time.
+
+        Returns (survivors, rejected) where rejected is a list of
+        (prop, failure_reason). Each rule only sees the rows the cheaper
+        rules let through.
+        """
+        survivors = list(properties)
+        rejected = []
+        for rule in self.local_rules:
+            kept = []
+            for prop in survivors:
+                failure_reason = rule.evaluate(prop)
+                if failure_reason:
+                    rejected.append((prop, failure_reason))
+                else:
+                    kept.append(prop)
+            survivors = kept
+        return survivors, rejected
+
+    def check_local(self, prop):
+        """Return the failure reason of the first local rule rejecting prop, or None."""
+        for rule in self.local_rules:
+            failure_reason = rule.evaluate(prop)
+            if failure_reason:
+                return failure_reason
+        return None
+
+    def check_remote(self, prop):
+        """Return the failure reason of the first remote rule rejecting prop, or None."""
+        for rule in self.remote_rules:
+            failure_reason = rule.evaluate(prop)
+            if failure_reason:
+                return failure_reason
+        return None
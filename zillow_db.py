@@ -6,12 +6,30 @@ import os
 import random
 from concurrent.futures import ThreadPoolExecutor
 import db_connector
+import progress_events
+import json_decoder
 
 # Constants
 OUTPUT_DIR = "zillow_properties"
 MAX_WORKERS = 10  # Limit concurrent requests to avoid rate limiting
 PROPERTY_TYPES = ["single_family", "multi_family"]
 SOURCE_NAME = "zillow"  # Source name for database records
+PAYLOAD_PROFILE = "minimal"  # Result categories to request, see PAYLOAD_PROFILES
+HARVEST_MODE = "map"  # "map" harvests mapResults by bounds tiles, "list" paginates listResults
+MAP_RESULTS_CAP = 500  # Zillow returns at most this many mapResults per request
+MAX_TILE_DEPTH = 5  # Maximum number of times a capped map tile is split into quadrants
+MAX_RETRY_TILE_DEPTH = 10  # Split depth allowed when retrying a failed or capped tile, keeps tile keys within INT
+ROOT_TILE = 1  # Tile code of a state's full map bounds, see tile_bounds()
+TILE_CAPPED = "TILE_CAPPED"  # Ledger error class of a tile still capped at the maximum depth
+
+# Result categories requested per payload profile. List mode only reads
+# listResults (and the cat1 total in categoryTotals), so "minimal" drops
+# mapResults and cat2. Map mode only reads mapResults.
+PAYLOAD_PROFILES = {
+    "full": {"cat1": ["listResults", "mapResults"], "cat2": ["total"]},
+    "minimal": {"cat1": ["listResults"]},
+    "map": {"cat1": ["mapResults"]}
+}
 
 # Create output directory if it doesn't exist
 if not os.path.exists(OUTPUT_DIR):
@@ -157,17 +175,18 @@ BASE_FILTER_STATE = {
     "isComingSoon": {"value": False}
 }
 
-# Function to create payload for a state, property type, and page number
-def create_payload(state_name, property_type, page_num=1):
+# Function to create payload for a state, property type, and page number.
+# bounds and map_zoom override the state's map bounds and zoom (used for map tiles).
+def create_payload(state_name, property_type, page_num=1, profile=None, bounds=None, map_zoom=None):
     # Create the search query state
     search_query = {
         "pagination": {"currentPage": page_num},
-        "isMapVisible": False,
-        "mapBounds": MAP_BOUNDS[state_name],
+        "isMapVisible": bounds is not None,
+        "mapBounds": bounds or MAP_BOUNDS[state_name],
         "regionSelection": REGION_SELECTION[state_name],
         "filterState": dict(BASE_FILTER_STATE),  # Make a copy to avoid modifying the original
         "isListVisible": True,
-        "mapZoom": STATE_INFO[state_name]["mapZoom"],
+        "mapZoom": map_zoom or STATE_INFO[state_name]["mapZoom"],
         "usersSearchTerm": STATE_INFO[state_name]["searchTerm"]
     }
     
@@ -189,10 +208,7 @@ def create_payload(state_name, property_type, page_num=1):
     # Create the full payload
     payload = {
         "searchQueryState": search_query,
-        "wants": {
-            "cat1": ["listResults", "mapResults"],
-            "cat2": ["total"]
-        },
+        "wants": {category: list(results) for category, results in PAYLOAD_PROFILES[profile or PAYLOAD_PROFILE].items()},
         "requestId": page_num,
         "isDebugRequest": False
     }
@@ -244,37 +260,251 @@ def format_property(home, state_name):
         
     return parsed
 
-# Function to fetch a specific page of results
-def fetch_page(state_name, property_type, page_num):
+# Function to send a search request with retries, returns (data, error_class, error_message)
+def send_search_request(payload, description):
     url = "https://www.zillow.com/async-create-search-page-state"
-    payload = create_payload(state_name, property_type, page_num)
     
     # Add random sleep between requests (2-4 seconds)
     sleep_time = random.uniform(2, 4)
     time.sleep(sleep_time)
     
     max_retries = 3
+    error_class, error_message = None, None
     for attempt in range(max_retries):
         try:
-            print(f"➡️ Fetching {state_name} {property_type} page {page_num} (Attempt {attempt+1})")
+            print(f"➡️ Fetching {description} (Attempt {attempt+1})")
             response = requests.put(url, headers=headers, json=payload, timeout=30)
             
             if response.status_code == 200:
-                data = response.json()
-                print(f"✓ Retrieved page {page_num} for {state_name} {property_type}")
-                return data
+                data = json_decoder.decode_response(response)
+                print(f"✓ Retrieved {description}")
+                progress_events.emit('pages')
+                return data, None, None
             else:
-                print(f"⚠️ Failed at {state_name} {property_type} page {page_num}: HTTP {response.status_code}")
+                print(f"⚠️ Failed at {description}: HTTP {response.status_code}")
+                error_class, error_message = f"HTTP_{response.status_code}", response.text[:500]
                 time.sleep(3 * (attempt + 1))  # Exponential backoff
         except Exception as e:
-            print(f"❌ Error at {state_name} {property_type} page {page_num}: {str(e)}")
+            print(f"❌ Error at {description}: {str(e)}")
+            error_class, error_message = type(e).__name__, str(e)
             time.sleep(3 * (attempt + 1))  # Exponential backoff
     
-    print(f"❌ All attempts failed for {state_name} {property_type} page {page_num}")
-    return None
+    print(f"❌ All attempts failed for {description}")
+    return None, error_class, error_message
+
+# Function to fetch a specific page of results
+def fetch_page(state_name, property_type, page_num):
+    payload = create_payload(state_name, property_type, page_num)
+    data, error_class, error_message = send_search_request(payload, f"{state_name} {property_type} page {page_num}")
+    
+    if data is None:
+        db_connector.record_failed_request(SOURCE_NAME, state_name, property_type, page_num, error_class, error_message)
+    return data
+
+# Function to extract formatted properties from a page response
+def extract_page_properties(page_response, state_name):
+    page_properties = []
+    if 'cat1' in page_response and 'searchResults' in page_response['cat1']:
+        results = page_response['cat1']['searchResults'].get('listResults', [])
+        for home in results:
+            # Transform each property
+            property_data = format_property(home, state_name)
+            if property_data:
+                page_properties.append(property_data)
+    return page_properties
+
+# Function to parse a number from a value like 250000, "250000" or "$250,000"
+def parse_number(value):
+    if isinstance(value, (int, float)):
+        return value
+    digits = "".join(c for c in str(value or "") if c.isdigit() or c == ".")
+    try:
+        return float(digits) if "." in digits else int(digits)
+    except ValueError:
+        return 0
+
+# Function to format a mapResults home. Map results carry the same hdpData as
+# listResults when Zillow includes it, otherwise the top level fields are used.
+def format_map_result(home, state_name, property_type):
+    hdp_info = home.get("hdpData", {}).get("homeInfo", {})
+    zpid = str(home.get("zpid") or hdp_info.get("zpid") or "")
+    
+    # Skip grouped building markers, which don't have a zpid
+    if not zpid:
+        return None
+    
+    # Format property type, falling back to the type that was searched for
+    property_type_raw = hdp_info.get("homeType", "")
+    if property_type_raw == "SINGLE_FAMILY" or (not property_type_raw and property_type == "single_family"):
+        formatted_type = "Single_Family"
+    elif property_type_raw == "MULTI_FAMILY" or (not property_type_raw and property_type == "multi_family"):
+        formatted_type = "Multi_Family"
+    else:
+        formatted_type = property_type_raw
+    
+    if hdp_info.get("streetAddress"):
+        zip_code = hdp_info.get("zipcode", "")
+        address = f"{hdp_info.get('streetAddress', '')}, {hdp_info.get('city', '')}, {hdp_info.get('state', '')} {zip_code}"
+    else:
+        # Top level address is "123 Main St, City, ST 12345"
+        address = home.get("address", "")
+        zip_code = address.rsplit(" ", 1)[-1] if address else ""
+    
+    bathroom_value = hdp_info.get("bathrooms", home.get("baths", 0))
+    try:
+        bathroom_value = float(bathroom_value)
+    except (ValueError, TypeError):
+        bathroom_value = 0.0
+    
+    parsed = {
+        "property_id": zpid,
+        "State": state_name,
+        "Formatted Property Type": formatted_type,
+        "Occupied/Vacant": "Unknown",  # Not available
+        "Address": address,
+        "Zip Code": zip_code,
+        "Square Footage": hdp_info.get("livingArea") or home.get("area") or 0,
+        "Rooms (Beds)": hdp_info.get("bedrooms") or home.get("beds") or 0,
+        "Bathrooms": bathroom_value,
+        "Year Built": hdp_info.get("yearBuilt", 0),
+        "After Repair Value": hdp_info.get("price") or parse_number(home.get("unformattedPrice") or home.get("price")),
+        "URL": home.get("detailUrl", "")
+    }
+    
+    # Fix URL to include domain if it's just a path
+    if parsed["URL"] and not parsed["URL"].startswith("http"):
+        parsed["URL"] = "https://www.zillow.com" + parsed["URL"]
+    
+    return parsed
+
+# Function to split map bounds into four quadrant tiles
+def split_bounds(bounds):
+    mid_lat = (bounds["north"] + bounds["south"]) / 2
+    mid_lng = (bounds["east"] + bounds["west"]) / 2
+    return [
+        {"north": bounds["north"], "south": mid_lat, "west": bounds["west"], "east": mid_lng},
+        {"north": bounds["north"], "south": mid_lat, "west": mid_lng, "east": bounds["east"]},
+        {"north": mid_lat, "south": bounds["south"], "west": bounds["west"], "east": mid_lng},
+        {"north": mid_lat, "south": bounds["south"], "west": mid_lng, "east": bounds["east"]}
+    ]
+
+# Map tiles are identified by a quadtree code: ROOT_TILE for the state's
+# bounds, and code * 4 + quadrant for each split_bounds() quadrant. The
+# ledger stores a tile as page_key -code, so it can't clash with list pages.
+
+# Function to return the ledger page key of a tile code
+def tile_page_key(code):
+    return -code
+
+# Function to return the tile code of a ledger page key, or None for a list page
+def page_key_tile(page_key):
+    return -page_key if page_key < 0 else None
+
+# Function to return the bounds and depth of a tile code
+def tile_bounds(state_name, code):
+    quadrants = []
+    while code > ROOT_TILE:
+        code, quadrant = divmod(code, 4)
+        quadrants.append(quadrant)
+    bounds = MAP_BOUNDS[state_name]
+    for quadrant in reversed(quadrants):
+        bounds = split_bounds(bounds)[quadrant]
+    return bounds, len(quadrants)
+
+# Function to fetch the mapResults of one bounds tile, returns (homes, total, error_class, error_message)
+def fetch_map_tile(state_name, property_type, bounds, depth, code=ROOT_TILE):
+    payload = create_payload(
+        state_name, property_type, profile="map",
+        bounds=bounds, map_zoom=STATE_INFO[state_name]["mapZoom"] + depth
+    )
+    description = f"{state_name} {property_type} map tile {code} (depth {depth})"
+    data, error_class, error_message = send_search_request(payload, description)
+    
+    if data is None:
+        return None, 0, error_class, error_message
+    
+    homes = data.get("cat1", {}).get("searchResults", {}).get("mapResults", [])
+    total = data.get("categoryTotals", {}).get("cat1", {}).get("totalResultCount", len(homes))
+    return homes, total, None, None
+
+# Function to harvest a state and property type from mapResults.
+# Starts from the given tile codes (the state's bounds by default) and splits
+# any tile that hits the map cap into quadrants, so each tile returns up to
+# MAP_RESULTS_CAP homes in one request instead of 40 per list page. Tiles that
+# fail, or are still capped at max_depth, are recorded in the failed request
+# ledger by tile code so retry_failed.py can re-fetch just those tiles.
+# Returns (inserted, skipped, failed_codes).
+def harvest_map_results(state_name, property_type, codes=(ROOT_TILE,), max_depth=MAX_TILE_DEPTH):
+    print(f"🗺️ Harvesting {state_name} - {property_type} from map results")
+    
+    inserted_count = 0
+    skipped_count = 0
+    failed_codes = []
+    seen_ids = set()  # Tiles share edges, so a home can be returned twice
+    
+    tiles = [(code,) + tile_bounds(state_name, code) for code in codes]
+    while tiles:
+        next_tiles = []
+        
+        # Fetch this level's tiles in parallel
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {executor.submit(fetch_map_tile, state_name, property_type, bounds, depth, code): (code, bounds, depth) for code, bounds, depth in tiles}
+            
+            for future in futures:
+                code, bounds, depth = futures[future]
+                try:
+                    homes, total, tile_error_class, tile_error_message = future.result()
+                except Exception as e:
+                    homes, total, tile_error_class, tile_error_message = None, 0, type(e).__name__, str(e)
+                
+                if homes is None:
+                    failed_codes.append(code)
+                    db_connector.record_failed_request(SOURCE_NAME, state_name, property_type, tile_page_key(code), tile_error_class, tile_error_message)
+                    continue
+                
+                # Split the tile if the map capped its results
+                capped = len(homes) >= MAP_RESULTS_CAP or total > len(homes)
+                if capped and depth < max_depth:
+                    print(f"🔀 Tile {code} capped at {len(homes)} of {total} homes, splitting into quadrants")
+                    next_tiles.extend((code * 4 + quadrant, quadrant_bounds, depth + 1) for quadrant, quadrant_bounds in enumerate(split_bounds(bounds)))
+                    continue
+                
+                if capped:
+                    # Keep what the tile returned, but record the homes it left out
+                    print(f"⚠️ Tile {code} still capped at {len(homes)} of {total} homes at depth {depth}, {total - len(homes)} homes not harvested")
+                    failed_codes.append(code)
+                    db_connector.record_failed_request(SOURCE_NAME, state_name, property_type, tile_page_key(code), TILE_CAPPED, f"{len(homes)} of {total} homes at depth {depth}")
+                
+                tile_properties = []
+                for home in homes:
+                    property_data = format_map_result(home, state_name, property_type)
+                    if property_data and property_data["property_id"] not in seen_ids:
+                        seen_ids.add(property_data["property_id"])
+                        tile_properties.append(property_data)
+                
+                if tile_properties:
+                    tile_inserted, tile_skipped = db_connector.batch_insert_properties(tile_properties, SOURCE_NAME)
+                    inserted_count += tile_inserted
+                    skipped_count += tile_skipped
+                    print(f"✓ Processed map tile: {tile_inserted} properties inserted, {tile_skipped} skipped")
+        
+        tiles = next_tiles
+    
+    if failed_codes:
+        print(f"⚠️ {len(failed_codes)} map tiles failed or were capped for {state_name} {property_type}")
+    
+    print(f"✅ Completed {state_name} {property_type}: {inserted_count} properties inserted, {skipped_count} skipped")
+    return inserted_count, skipped_count, failed_codes
 
 # Function to process a single state and property type
 def process_state_property_type(state_name, property_type):
+    if HARVEST_MODE == "map":
+        try:
+            harvest_map_results(state_name, property_type)
+        except Exception as e:
+            print(f"❌ Error processing {state_name} {property_type}: {str(e)}")
+        return
+    
     print(f"🔍 Processing {state_name} - {property_type}")
     
     # Initialize counters
@@ -308,14 +538,7 @@ def process_state_property_type(state_name, property_type):
         print(f"📊 Found {total_results} {property_type} properties in {state_name} (will fetch {total_pages} pages)")
         
         # Extract and process properties from first page
-        first_page_properties = []
-        if 'cat1' in first_page_response and 'searchResults' in first_page_response['cat1']:
-            results = first_page_response['cat1']['searchResults'].get('listResults', [])
-            for home in results:
-                # Transform each property
-                property_data = format_property(home, state_name)
-                if property_data:
-                    first_page_properties.append(property_data)
+        first_page_properties = extract_page_properties(first_page_response, state_name)
         
         # Save first page properties
         if first_page_properties:
@@ -353,14 +576,7 @@ def process_state_property_type(state_name, property_type):
                                 continue
                             
                             # Extract and process properties
-                            page_properties = []
-                            if 'cat1' in page_response and 'searchResults' in page_response['cat1']:
-                                results = page_response['cat1']['searchResults'].get('listResults', [])
-                                for home in results:
-                                    # Transform each property
-                                    property_data = format_property(home, state_name)
-                                    if property_data:
-                                        page_properties.append(property_data)
+                            page_properties = extract_page_properties(page_response, state_name)
                             
                             # Save page properties
                             if page_properties:
@@ -402,6 +618,7 @@ def main(states=None):
     # Use provided states or all states if None
     states_to_process = states if states else list(STATE_INFO.keys())
     print(f"📋 Will process {len(states_to_process)} states: {', '.join(states_to_process)}")
+    progress_events.set_total(len(states_to_process) * len(PROPERTY_TYPES))
     
     # Process each state
     for state_name in states_to_process:
@@ -414,7 +631,9 @@ def main(states=None):
         # First process single_family, then multi_family
         for property_type in PROPERTY_TYPES:
             print(f"Processing {state_name} - {property_type} ({states_to_process.index(state_name) + 1} of {len(states_to_process)})")
+            progress_events.message(f"Processing {state_name} {property_type} ({states_to_process.index(state_name) + 1} of {len(states_to_process)} states)")
             process_state_property_type(state_name, property_type)
+            progress_events.advance()
             
             # Add random sleep between property types if not the last property type
             if property_type != PROPERTY_TYPES[-1]: